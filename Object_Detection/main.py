@@ -1,51 +1,241 @@
-from src.pipeline.stage_05_data_loader import DataLoaderPipeline
-from src.pipeline.stage_04_dataset import DatasetPipeline
-from src.pipeline.stage_03_data_transformation import DataTransformationPipeline
+import argparse
+import json
+import os
+from functools import partial
+from src.pipeline.runner import PipelineRunner, Stage
+from src.utils.distributed import cleanup, init_distributed, main_process_first
+from src.utils.instrumentation import instrumentation
 from src.utils.logging_setup import logger
 from src.config.configuration import ConfigurationManager
-from src.pipeline.stage_01_data_ingestion import DataIngestionPipeline
-from src.pipeline.stage_02_data_validation import DataValidationPipeline
+
+
+# Stage functions are module level so the runner can ship them to worker processes.
+# Pipeline modules are imported inside them (and listed in Stage.imports), so only the
+# stages that actually run are imported.
+
+def run_data_ingestion(config_manager: ConfigurationManager) -> str:
+    from src.pipeline.stage_01_data_ingestion import DataIngestionPipeline
+    return DataIngestionPipeline(config=config_manager).run_pipeline()
+
+def load_data_ingestion(config_manager: ConfigurationManager) -> str:
+    return config_manager.get_data_ingestion_config().download_location
+
+def run_data_validation(config_manager: ConfigurationManager, data_dir: str) -> bool:
+    from src.pipeline.stage_02_data_validation import DataValidationPipeline
+    return DataValidationPipeline(config=config_manager).run_pipeline()
+
+def load_data_validation(config_manager: ConfigurationManager, data_dir: str) -> bool:
+    with open(config_manager.get_data_validation_config().report_file, 'r') as f:
+        return json.load(f)["status"]
+
+def run_data_transformation(config_manager: ConfigurationManager) -> dict:
+    from src.pipeline.stage_03_data_transformation import DataTransformationPipeline
+    data_transformation_pipeline = DataTransformationPipeline(config=config_manager)
+    train_transforms, valid_transforms = data_transformation_pipeline.run_pipeline()
+    train_batch_transforms, valid_batch_transforms = data_transformation_pipeline.get_batch_transforms()
+    return {
+        "train": train_transforms,
+        "valid": valid_transforms,
+        "train_batch": train_batch_transforms,
+        "valid_batch": valid_batch_transforms,
+    }
+
+def run_preprocessing_cache(config_manager: ConfigurationManager, validation_status: bool, subset: str):
+    from src.pipeline.stage_03_preprocessing_cache import PreprocessingCachePipeline
+    return PreprocessingCachePipeline(config=config_manager).run_pipeline(subset=subset)
+
+def run_dataset(config_manager: ConfigurationManager, transforms: dict, image_store, subset: str):
+    from src.pipeline.stage_04_dataset import DatasetPipeline
+    return DatasetPipeline(config=config_manager).run_pipeline(subset=subset, transforms=transforms[subset], image_store=image_store)
+
+def run_data_loader(config_manager: ConfigurationManager, transforms: dict, dataset, subset: str):
+    from src.pipeline.stage_05_data_loader import DataLoaderPipeline
+    return DataLoaderPipeline(config=config_manager).run_pipeline(
+        dataset, shuffle=subset == "train", batch_transform=transforms[f"{subset}_batch"]
+    )
+
+def run_model_trainer(config_manager: ConfigurationManager, train_loader) -> str:
+    from src.pipeline.stage_04_model_trainer import ModelTrainerPipeline
+    return ModelTrainerPipeline(config=config_manager).run_pipeline(train_loader)
+
+def load_model_trainer(config_manager: ConfigurationManager, train_loader) -> str:
+    return str(config_manager.get_model_trainer_config().model_path)
+
+def run_model_evaluation(config_manager: ConfigurationManager, model_path: str, valid_loader) -> dict:
+    from src.pipeline.stage_05_model_evaluation import ModelEvaluationPipeline
+    return ModelEvaluationPipeline(config=config_manager).run_pipeline(model_path, valid_loader)
+
+def load_model_evaluation(config_manager: ConfigurationManager, model_path: str, valid_loader) -> dict:
+    with open(config_manager.get_model_evaluation_config().metrics_file, 'r') as f:
+        return json.load(f)
+
+def run_model_export(config_manager: ConfigurationManager, model_path: str, valid_loader) -> dict:
+    from src.pipeline.stage_06_model_export import ModelExportPipeline
+    return ModelExportPipeline(config=config_manager).run_pipeline(model_path, valid_loader)
+
+def load_model_export(config_manager: ConfigurationManager, model_path: str, valid_loader) -> dict:
+    with open(config_manager.get_model_export_config().report_file, 'r') as f:
+        return json.load(f)
+
+def run_quantization(config_manager: ConfigurationManager, model_path: str, valid_loader) -> dict:
+    from src.pipeline.stage_07_quantization import QuantizationPipeline
+    return QuantizationPipeline(config=config_manager).run_pipeline(model_path, valid_loader)
+
+def load_quantization(config_manager: ConfigurationManager, model_path: str, valid_loader) -> dict:
+    with open(config_manager.get_quantization_config().report_file, 'r') as f:
+        return json.load(f)
+
+
+def build_stages(config_manager: ConfigurationManager) -> list:
+    """The pipeline DAG; the train and valid branches are independent of each other."""
+    ingestion_config = config_manager.get_data_ingestion_config()
+    validation_config = config_manager.get_data_validation_config()
+    trainer_config = config_manager.get_model_trainer_config()
+    evaluation_config = config_manager.get_model_evaluation_config()
+    export_config = config_manager.get_model_export_config()
+    quantization_config = config_manager.get_quantization_config()
+
+    stages = [
+        Stage(
+            name="data_ingestion",
+            run=run_data_ingestion,
+            imports=["src.pipeline.stage_01_data_ingestion"],
+            config=lambda cm: cm.get_data_ingestion_config(),
+            outputs=[ingestion_config.manifest_file],
+            load=load_data_ingestion,
+        ),
+        Stage(
+            name="data_validation",
+            run=run_data_validation,
+            imports=["src.pipeline.stage_02_data_validation"],
+            depends_on=["data_ingestion"],
+            config=lambda cm: cm.get_data_validation_config(),
+            inputs=[os.path.join(validation_config.data_dir, name) for name in validation_config.required_files],
+            input_suffixes=[".jpg", ".xml"],
+            outputs=[validation_config.report_file],
+            load=load_data_validation,
+        ),
+        Stage(
+            name="data_transformation",
+            run=run_data_transformation,
+            imports=["src.pipeline.stage_03_data_transformation"],
+        ),
+    ]
+    for subset in ("train", "valid"):
+        stages += [
+            # Always runs: with the cache warm it only opens the packed store
+            Stage(
+                name=f"preprocessing_cache_{subset}",
+                run=partial(run_preprocessing_cache, subset=subset),
+                imports=["src.pipeline.stage_03_preprocessing_cache"],
+                depends_on=["data_validation"],
+                parallel=True,
+            ),
+            Stage(
+                name=f"dataset_{subset}",
+                run=partial(run_dataset, subset=subset),
+                imports=["src.pipeline.stage_04_dataset"],
+                depends_on=["data_transformation", f"preprocessing_cache_{subset}"],
+                parallel=True,
+            ),
+            Stage(
+                name=f"data_loader_{subset}",
+                run=partial(run_data_loader, subset=subset),
+                imports=["src.pipeline.stage_05_data_loader"],
+                depends_on=["data_transformation", f"dataset_{subset}"],
+            ),
+        ]
+    stages.append(
+        # The loaders carry no fingerprint of their own, so the data settings are part of the config slice
+        Stage(
+            name="model_trainer",
+            run=run_model_trainer,
+            imports=["src.pipeline.stage_04_model_trainer"],
+            depends_on=["data_loader_train"],
+            config=lambda cm: {
+                "model_trainer": cm.get_model_trainer_config(),
+                "ssd_targets": cm.get_ssd_targets_config(),
+                "dataset": cm.get_dataset_config(),
+                "data_transformation": cm.get_data_transformation_config(),
+                "data_loader": cm.get_data_loader_config(),
+            },
+            outputs=[trainer_config.model_path],
+            load=load_model_trainer,
+        )
+    )
+    stages.append(
+        Stage(
+            name="model_evaluation",
+            run=run_model_evaluation,
+            imports=["src.pipeline.stage_05_model_evaluation"],
+            depends_on=["model_trainer", "data_loader_valid"],
+            config=lambda cm: {
+                "model_evaluation": cm.get_model_evaluation_config(),
+                "dataset": cm.get_dataset_config(),
+                "data_transformation": cm.get_data_transformation_config(),
+            },
+            inputs=[trainer_config.model_path],
+            outputs=[evaluation_config.metrics_file],
+            load=load_model_evaluation,
+        )
+    )
+    stages.append(
+        Stage(
+            name="model_export",
+            run=run_model_export,
+            imports=["src.pipeline.stage_06_model_export"],
+            depends_on=["model_trainer", "data_loader_valid"],
+            config=lambda cm: {
+                "model_export": cm.get_model_export_config(),
+                "dataset": cm.get_dataset_config(),
+                "data_transformation": cm.get_data_transformation_config(),
+            },
+            inputs=[trainer_config.model_path],
+            outputs=[export_config.report_file],
+            load=load_model_export,
+        )
+    )
+    stages.append(
+        Stage(
+            name="quantization",
+            run=run_quantization,
+            imports=["src.pipeline.stage_07_quantization"],
+            depends_on=["model_trainer", "data_loader_valid"],
+            config=lambda cm: {
+                "quantization": cm.get_quantization_config(),
+                "dataset": cm.get_dataset_config(),
+                "data_transformation": cm.get_data_transformation_config(),
+            },
+            inputs=[trainer_config.model_path],
+            outputs=[quantization_config.report_file],
+            load=load_quantization,
+        )
+    )
+    return stages
+
+
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run the object detection pipeline.")
+    parser.add_argument("--stages", nargs="+", help="Stages (or groups such as 'dataset') to run, with their dependencies. Defaults to all.")
+    parser.add_argument("--force", nargs="+", default=[], help="Stages to rerun even if they are up to date.")
+    args = parser.parse_args()
+
     try:
         config_manager = ConfigurationManager()
-        
-        # --- Data Ingestion Stage ---
-        STAGE_NAME = "Data Ingestion Stage"
-        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-        data_ingestion_pipeline = DataIngestionPipeline(config=config_manager)
-        data_ingestion_pipeline.run_pipeline()
-        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-
-        # --- Data Validation Stage ---
-        STAGE_NAME = "Data Validation Stage"
-        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-        data_validation_pipeline = DataValidationPipeline(config=config_manager)
-        data_validation_pipeline.run_pipeline()
-        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-
-        # --- Data Transformation Stage ---
-        STAGE_NAME = "Data Transformation Stage"
-        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-        data_transformation_pipeline = DataTransformationPipeline(config=config_manager)
-        train_transforms, valid_transforms = data_transformation_pipeline.run_pipeline()
-        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-
-
-        STAGE_NAME = "Dataset Stage"
-        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-        dataset_pipeline = DatasetPipeline(config=config_manager)
-        train_dataset = dataset_pipeline.run_pipeline(subset="train", transforms=train_transforms)
-        valid_dataset = dataset_pipeline.run_pipeline(subset="valid", transforms=valid_transforms)
-        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
-
-
-        STAGE_NAME = "Data Loader Stage"
-        logger.info(f">>>>>> stage {STAGE_NAME} started <<<<<<")
-        data_loader_pipeline = DataLoaderPipeline(config=config_manager)
-        train_loader = data_loader_pipeline.run_pipeline(train_dataset, shuffle=True)
-        valid_loader = data_loader_pipeline.run_pipeline(valid_dataset, shuffle=False)
-        logger.info(f">>>>>> stage {STAGE_NAME} completed <<<<<<\n\nx==========x")
+        instrumentation.configure(config_manager.get_instrumentation_config())
+
+        # Launched with torchrun, every rank runs the pipeline and the model trainer trains with DDP
+        distributed = init_distributed(config_manager.get_distributed_config())
+
+        runner = PipelineRunner(config_manager, build_stages(config_manager), config_manager.get_pipeline_runner_config())
+        if distributed:
+            # Rank 0 downloads and builds the caches first; the other ranks then find them up to date
+            data_stages = [name for name in runner.select(args.stages or list(runner.stages)) if name not in ("model_trainer", "model_evaluation", "model_export", "quantization")]
+            with main_process_first():
+                runner.run(targets=data_stages, force=args.force)
+        runner.run(targets=args.stages, force=args.force)
+        cleanup()
 
     except Exception as e:
-        logger.error(f"Error occurred during {STAGE_NAME} stage: {e}")
-        raise e
\ No newline at end of file
+        logger.error(f"Error occurred while running the pipeline: {e}")
+        raise e
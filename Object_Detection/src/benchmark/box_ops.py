@@ -0,0 +1,153 @@
+import argparse
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+import numpy as np
+import torch
+from src.core import box_ops
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def random_boxes(rng: np.random.Generator, n: int, image_size: float = 1000.0, clustered: bool = True) -> np.ndarray:
+    """
+    Random float32 xyxy boxes. Clustered boxes are jittered copies of a few "objects", like
+    the raw detections a model produces before NMS.
+    """
+    if clustered:
+        centers = rng.uniform(0, image_size, (max(n // 20, 1), 2))
+        sizes = rng.uniform(20, image_size / 4, (len(centers), 2))
+        index = rng.integers(0, len(centers), n)
+        xy = centers[index] + rng.normal(0, 0.1, (n, 2)) * sizes[index]
+        wh = sizes[index] * rng.uniform(0.8, 1.2, (n, 2))
+    else:
+        xy = rng.uniform(0, image_size, (n, 2))
+        wh = rng.uniform(5, image_size / 4, (n, 2))
+    return np.concatenate([xy - wh / 2, xy + wh / 2], axis=1).astype(np.float32)
+
+
+def _time(fn: Callable, repeats: int) -> float:
+    """Median wall time of `fn` in milliseconds."""
+    fn()
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return float(np.median(times))
+
+
+def _offset_nms(boxes, scores, labels, iou_threshold: float):
+    """`batched_nms` with the coordinate-offset trick regardless of the number of boxes."""
+    offsets = labels.astype(boxes.dtype) if isinstance(boxes, np.ndarray) else labels.to(boxes.dtype)
+    return box_ops.nms(boxes + offsets[:, None] * (boxes.max() + 1), scores, iou_threshold)
+
+
+def _column_scale_flip(boxes: torch.Tensor, sx: float, sy: float, width: float) -> torch.Tensor:
+    """The per-column in-place updates `MyTransform` used for resize and flip."""
+    boxes = boxes.clone()
+    boxes[:, 0] = boxes[:, 0] * sx
+    boxes[:, 2] = boxes[:, 2] * sx
+    boxes[:, 1] = boxes[:, 1] * sy
+    boxes[:, 3] = boxes[:, 3] * sy
+    xmin_old = boxes[:, 0].clone()
+    xmax_old = boxes[:, 2].clone()
+    boxes[:, 0] = width - xmax_old
+    boxes[:, 2] = width - xmin_old
+    return boxes
+
+
+def run(n: int, num_classes: int, iou_threshold: float, repeats: int, tolerance: float, seed: int) -> Dict:
+    """Times every op with NumPy and torch inputs on `n` boxes and checks that both agree."""
+    rng = np.random.default_rng(seed)
+    boxes_np = random_boxes(rng, n)
+    other_np = random_boxes(rng, max(n // 10, 1), clustered=False)
+    scores_np = rng.random(n).astype(np.float32)
+    labels_np = rng.integers(1, num_classes, n)
+    deltas_np = rng.normal(0, 0.5, (n, 4)).astype(np.float32)
+    boxes_t, other_t, scores_t, labels_t, deltas_t = (torch.from_numpy(a) for a in (boxes_np, other_np, scores_np, labels_np, deltas_np))
+
+    ops = {
+        "box_convert": lambda b, o, s, l, d: box_ops.box_convert(b, "xyxy", "cxcywh"),
+        "box_iou": lambda b, o, s, l, d: box_ops.box_iou(b, o),
+        "generalized_box_iou": lambda b, o, s, l, d: box_ops.generalized_box_iou(b, o),
+        "clip_boxes": lambda b, o, s, l, d: box_ops.clip_boxes(b, (800, 600)),
+        "encode_boxes": lambda b, o, s, l, d: box_ops.encode_boxes(b, b[::-1].copy() if isinstance(b, np.ndarray) else b.flip(0)),
+        "decode_boxes": lambda b, o, s, l, d: box_ops.decode_boxes(d, b),
+        "batched_nms": lambda b, o, s, l, d: box_ops.batched_nms(b, s, l, iou_threshold),
+    }
+    results: Dict = {"num_boxes": n, "ops": {}}
+    mismatches: List[str] = []
+    for name, op in ops.items():
+        out_np = op(boxes_np, other_np, scores_np, labels_np, deltas_np)
+        out_t = op(boxes_t, other_t, scores_t, labels_t, deltas_t)
+        if name == "batched_nms":
+            match = np.array_equal(out_np, out_t.numpy())
+        else:
+            match = np.allclose(out_np, out_t.numpy(), rtol=tolerance, atol=tolerance)
+        if not match:
+            mismatches.append(f"{name} with {n} boxes: NumPy and torch results differ")
+        results["ops"][name] = {
+            "numpy_ms": _time(lambda: op(boxes_np, other_np, scores_np, labels_np, deltas_np), repeats),
+            "torch_ms": _time(lambda: op(boxes_t, other_t, scores_t, labels_t, deltas_t), repeats),
+            "match": bool(match),
+        }
+
+    # Both class-aware NMS strategies on the same input, whichever `batched_nms` picks for this size
+    for strategy, fn in (("offset", _offset_nms), ("per_class", box_ops._batched_nms_per_class)):
+        keep = fn(boxes_t, scores_t, labels_t, iou_threshold)
+        if not torch.equal(keep, box_ops.batched_nms(boxes_t, scores_t, labels_t, iou_threshold)):
+            mismatches.append(f"{strategy} NMS with {n} boxes: differs from batched_nms")
+        results[f"{strategy}_nms"] = {"numpy_ms": _time(lambda: fn(boxes_np, scores_np, labels_np, iou_threshold), repeats),
+                                      "torch_ms": _time(lambda: fn(boxes_t, scores_t, labels_t, iou_threshold), repeats)}
+    results["kept_after_nms"] = len(keep)
+
+    # The transform box updates against the per-column assignments they replaced
+    def vectorized() -> torch.Tensor:
+        return box_ops.hflip_boxes(box_ops.scale_boxes(boxes_t, (0.5, 0.75)), 500.0)
+
+    if not torch.allclose(vectorized(), _column_scale_flip(boxes_t, 0.5, 0.75, 500.0)):
+        mismatches.append(f"scale_boxes/hflip_boxes with {n} boxes: differ from per-column updates")
+    results["scale_flip"] = {"box_ops_ms": _time(vectorized, repeats),
+                             "per_column_ms": _time(lambda: _column_scale_flip(boxes_t, 0.5, 0.75, 500.0), repeats)}
+    results["mismatches"] = mismatches
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Micro-benchmark of src/core/box_ops with NumPy and torch inputs, checking that both agree.")
+    parser.add_argument("--num-boxes", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--num-classes", type=int, default=21, help="Including the background class.")
+    parser.add_argument("--iou-threshold", type=float, default=0.5)
+    parser.add_argument("--repeats", type=int, default=20)
+    parser.add_argument("--tolerance", type=float, default=1e-4)
+    parser.add_argument("--threads", type=int, default=1, help="torch intra-op threads.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="artifacts/benchmarks/box_ops.json")
+    args = parser.parse_args()
+
+    torch.set_num_threads(args.threads)
+    results: Dict = {"meta": vars(args), "runs": []}
+    failures: List[str] = []
+    for n in args.num_boxes:
+        result = run(n, args.num_classes, args.iou_threshold, args.repeats, args.tolerance, args.seed)
+        results["runs"].append(result)
+        failures.extend(result["mismatches"])
+        for name, timing in result["ops"].items():
+            logger.info(f"{n} boxes, {name}: numpy {timing['numpy_ms']:.3f}ms, torch {timing['torch_ms']:.3f}ms, match={timing['match']}")
+        for strategy in ("offset", "per_class"):
+            timing = result[f"{strategy}_nms"]
+            logger.info(f"{n} boxes, {strategy} NMS: numpy {timing['numpy_ms']:.3f}ms, torch {timing['torch_ms']:.3f}ms")
+        logger.info(f"{n} boxes: {result['kept_after_nms']} kept after NMS; scale+flip {result['scale_flip']['box_ops_ms']:.3f}ms vs per-column {result['scale_flip']['per_column_ms']:.3f}ms")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    if failures:
+        logger.error("Box op checks failed:\n" + "\n".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,219 @@
+import argparse
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List
+import numpy as np
+from src.benchmark.synthetic_voc import DEFAULT_CLASSES, generate_voc_split
+from src.components.data_loader import MyDataloader
+from src.components.data_transformation import MyTransform
+from src.components.dataset import MyDataset
+from src.config.configuration import ConfigurationManager
+from src.utils.helpers import collate_fn, save_json
+from src.utils.instrumentation import instrumentation
+from src.utils.logging_setup import logger
+
+
+def latency_stats(latencies_s: List[float], samples: int) -> Dict[str, float]:
+    """Throughput and latency percentiles (in milliseconds) of a list of timings."""
+    latencies_ms = np.asarray(latencies_s) * 1000.0
+    total_s = float(np.sum(latencies_s))
+    return {
+        "samples_per_s": samples / total_s if total_s else 0.0,
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def mirror_split(src_dir: str, dst_dir: str, skip: List[str]) -> None:
+    """
+    Mirrors a split directory with one symlink per entry (except `skip`), so the indexes
+    MyDataset persists are written to `dst_dir` and the source dataset is left untouched.
+    """
+    os.makedirs(dst_dir)
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            if entry.name not in skip:
+                os.symlink(os.path.abspath(entry.path), os.path.join(dst_dir, entry.name))
+
+
+def bench_stages(dataset_config, transformation_config, subset: str, batch_size: int, max_samples: int) -> Dict[str, Dict[str, float]]:
+    """
+    Measures each data-path stage in isolation, in the current process. `dataset_config`
+    must point at a data directory without persisted ids or annotation index yet.
+    """
+    results = {}
+
+    # Indexing: cold (no persisted ids / annotation index) and warm
+    dataset, cold_s = _timed(MyDataset, dataset_config, subset)
+    dataset, warm_s = _timed(MyDataset, dataset_config, subset)
+    results["index_cold"] = latency_stats([cold_s], len(dataset))
+    results["index_warm"] = latency_stats([warm_s], len(dataset))
+
+    indices = range(min(len(dataset), max_samples))
+    transforms = MyTransform(transformation_config, train=True)
+    decode_s, parse_s, transform_s, samples = [], [], [], []
+    for idx in indices:
+        path = os.path.join(dataset.root_dir, f"{dataset.ids[idx]}.jpg")
+        (image, _), seconds = _timed(dataset.decoder.decode, path)
+        decode_s.append(seconds)
+        (boxes, labels, _), seconds = _timed(dataset.get_annotation, idx)
+        parse_s.append(seconds)
+        target = {"boxes": boxes, "labels": labels}
+        sample, seconds = _timed(transforms, image, target)
+        transform_s.append(seconds)
+        samples.append(sample)
+
+    results["decode"] = latency_stats(decode_s, len(decode_s))
+    results["parse"] = latency_stats(parse_s, len(parse_s))
+    results["transform"] = latency_stats(transform_s, len(transform_s))
+
+    batches = [samples[i:i + batch_size] for i in range(0, len(samples), batch_size)]
+    collate_s = [_timed(collate_fn, batch)[1] for batch in batches]
+    results["collate"] = latency_stats(collate_s, len(samples))
+    return results
+
+
+def bench_loader(dataset: MyDataset, loader_config, epochs: int) -> Dict[str, float]:
+    """Measures the full MyDataloader: startup (first batch) and steady-state batch latency."""
+    data_loader = MyDataloader(config=loader_config, dataset=dataset, shuffle=True).get_loader()
+    startup_s, batch_s, samples = [], [], 0
+    for _ in range(epochs):
+        last = time.perf_counter()
+        for i, batch in enumerate(data_loader):
+            now = time.perf_counter()
+            (startup_s if i == 0 else batch_s).append(now - last)
+            # batch[0] holds the images for both the default and the padded collate
+            samples += len(batch[0]) if i else 0
+            last = now
+    stats = latency_stats(batch_s, samples) if batch_s else {}
+    stats["startup_ms"] = float(np.mean(startup_s) * 1000.0)
+    return stats
+
+
+def check_instrumentation(dataset: MyDataset, loader_config, epochs: int) -> List[str]:
+    """
+    Runs a worker-backed loader and checks that every epoch's data-path summary counted
+    each sample of the dataset exactly once, i.e. no worker metrics were lost.
+    """
+    config = replace(loader_config, num_workers=max(loader_config.num_workers, 2), train_batch_size=1, drop_last=False)
+    data_loader = MyDataloader(config=config, dataset=dataset, shuffle=True).get_loader()
+    errors = []
+    for epoch in range(1, epochs + 1):
+        for _ in data_loader:
+            pass
+        counted = data_loader.last_counters.get("samples", 0)
+        logger.info(f"Instrumentation epoch {epoch}: {counted} of {len(dataset)} samples counted")
+        if counted != len(dataset):
+            errors.append(f"epoch {epoch}: summary counted {counted} samples, dataset has {len(dataset)}")
+    return errors
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Returns a message for every throughput that dropped more than `tolerance` below the baseline."""
+    regressions = []
+    for section in ("stages", "loader"):
+        for name, base in baseline.get(section, {}).items():
+            current = results.get(section, {}).get(name)
+            if current is None or "samples_per_s" not in base:
+                continue
+            floor = base["samples_per_s"] * (1.0 - tolerance)
+            status = "REGRESSION" if current["samples_per_s"] < floor else "ok"
+            logger.info(f"{section}/{name}: {current['samples_per_s']:.1f} samples/s (baseline {base['samples_per_s']:.1f}) {status}")
+            if current["samples_per_s"] < floor:
+                regressions.append(f"{section}/{name}: {current['samples_per_s']:.1f} < {floor:.1f} samples/s")
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark MyDataset + MyTransform + MyDataloader throughput.")
+    parser.add_argument("--data-dir", help="Existing VOC dataset directory. A synthetic one is generated if omitted.")
+    parser.add_argument("--subset", default="train")
+    parser.add_argument("--num-images", type=int, default=512)
+    parser.add_argument("--min-size", type=int, nargs=2, default=[320, 240], metavar=("W", "H"))
+    parser.add_argument("--max-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    parser.add_argument("--max-objects", type=int, default=5)
+    parser.add_argument("--image-size", type=int, nargs=2, default=None, metavar=("H", "W"))
+    parser.add_argument("--num-workers", type=int, nargs="+", default=[0, 2, 4])
+    parser.add_argument("--batch-size", type=int, nargs="+", default=[8])
+    parser.add_argument("--pin-memory", choices=["true", "false"], nargs="+", default=["false"])
+    parser.add_argument("--epochs", type=int, default=2)
+    parser.add_argument("--max-stage-samples", type=int, default=256)
+    parser.add_argument("--output", default="artifacts/benchmarks/data_pipeline.json")
+    parser.add_argument("--compare", help="Baseline JSON; exit with status 1 on a throughput regression.")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Allowed relative throughput drop.")
+    args = parser.parse_args()
+
+    config_manager = ConfigurationManager()
+    transformation_config = config_manager.get_data_transformation_config()
+    if args.image_size:
+        transformation_config = replace(transformation_config, image_size=list(args.image_size))
+    loader_config = config_manager.get_data_loader_config()
+
+    # The benchmark only ever writes into this temporary data directory
+    tmp_dir = tempfile.mkdtemp(prefix="data_pipeline_")
+    dataset_config = replace(config_manager.get_dataset_config(), data_dir=tmp_dir, train_dir=args.subset, valid_dir=args.subset)
+    if args.data_dir is None:
+        generate_voc_split(os.path.join(tmp_dir, args.subset), args.num_images, tuple(args.min_size),
+                           tuple(args.max_size), args.max_objects)
+        dataset_config = replace(dataset_config, class_map={name: label for label, name in enumerate(DEFAULT_CLASSES, start=1)})
+    else:
+        mirror_split(os.path.join(args.data_dir, args.subset), os.path.join(tmp_dir, args.subset), skip=[dataset_config.index_file])
+
+    try:
+        results = {
+            "meta": {
+                "data_dir": args.data_dir,
+                "synthetic": args.data_dir is None,
+                "num_images": args.num_images,
+                "image_size": list(transformation_config.image_size),
+                "cpu_count": os.cpu_count(),
+                "python": sys.version.split()[0],
+            },
+            "stages": bench_stages(dataset_config, transformation_config, args.subset, args.batch_size[0], args.max_stage_samples),
+            "loader": {},
+        }
+
+        dataset = MyDataset(dataset_config, args.subset, MyTransform(transformation_config, train=True))
+        for num_workers, batch_size, pin_memory in itertools.product(args.num_workers, args.batch_size, args.pin_memory):
+            config = replace(loader_config, num_workers=num_workers, train_batch_size=batch_size, pin_memory=pin_memory == "true")
+            name = f"workers={num_workers},batch={batch_size},pin={pin_memory}"
+            results["loader"][name] = bench_loader(dataset, config, args.epochs)
+            logger.info(f"{name}: {results['loader'][name]}")
+        instrumentation_errors = check_instrumentation(dataset, loader_config, args.epochs) if instrumentation.enabled else []
+        results["instrumentation_ok"] = not instrumentation_errors
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    if instrumentation_errors:
+        logger.error("Data-path instrumentation lost worker metrics:\n" + "\n".join(instrumentation_errors))
+        return 1
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            logger.error("Throughput regressions:\n" + "\n".join(regressions))
+            return 1
+        logger.info("No throughput regressions against baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,121 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List
+import torch
+from src.benchmark.data_pipeline import latency_stats
+from src.benchmark.synthetic_voc import generate_voc_split
+from src.components.annotation_index import parse_voc_xml
+from src.components.data_transformation import MyTransform
+from src.components.image_decoders import DECODERS, get_decoder, scale_boxes
+from src.config.configuration import ConfigurationManager
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def _list_samples(root_dir: str, max_images: int) -> List[str]:
+    ids = sorted(name[:-4] for name in os.listdir(root_dir) if name.endswith(".jpg"))
+    return [os.path.join(root_dir, base_id) for base_id in ids[:max_images]]
+
+
+def bench_decoder(name: str, samples: List[str], transformation_config, repeats: int) -> Dict[str, float]:
+    """
+    Times one decode backend alone and followed by `MyTransform` (resize + to tensor),
+    and reports the decoded pixel fraction and the largest box deviation from the
+    full-resolution PIL reference.
+    """
+    decode_size = transformation_config.image_size if transformation_config.resize else None
+    decoder = get_decoder(name, decode_size)
+    reference = get_decoder("pil")
+    transforms = MyTransform(transformation_config, train=False)
+
+    decode_s, total_s, decoded_pixels, orig_pixels, box_error = [], [], 0, 0, 0.0
+    for repeat in range(repeats):
+        for sample in samples:
+            _, raw_boxes, _, _ = parse_voc_xml(f"{sample}.xml")
+            boxes = torch.tensor(raw_boxes or [[0, 0, 1, 1]], dtype=torch.float32)
+
+            start = time.perf_counter()
+            image, orig_size = decoder.decode(f"{sample}.jpg")
+            decoded = time.perf_counter()
+            if repeat == 0:
+                w, h = (image.shape[-1], image.shape[-2]) if isinstance(image, torch.Tensor) else image.size
+                decoded_pixels += w * h
+                orig_pixels += orig_size[0] * orig_size[1]
+            image, target = transforms(image, {"boxes": scale_boxes(boxes, image, orig_size)})
+            done = time.perf_counter()
+            decode_s.append(decoded - start)
+            total_s.append(done - start)
+
+            if repeat == 0:
+                ref_image, ref_size = reference.decode(f"{sample}.jpg")
+                _, ref_target = transforms(ref_image, {"boxes": scale_boxes(boxes, ref_image, ref_size)})
+                box_error = max(box_error, float((target["boxes"] - ref_target["boxes"]).abs().max()))
+
+    return {
+        "decode": latency_stats(decode_s, len(decode_s)),
+        "decode_transform": latency_stats(total_s, len(total_s)),
+        "decoded_pixel_fraction": decoded_pixels / max(orig_pixels, 1),
+        "max_box_error_px": box_error,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare image decode backends (decode and decode + MyTransform).")
+    parser.add_argument("--data-dir", help="Existing VOC dataset directory. A synthetic one is generated if omitted.")
+    parser.add_argument("--subset", default="train")
+    parser.add_argument("--num-images", type=int, default=128)
+    parser.add_argument("--min-size", type=int, nargs=2, default=[800, 600], metavar=("W", "H"))
+    parser.add_argument("--max-size", type=int, nargs=2, default=[1600, 1200], metavar=("W", "H"))
+    parser.add_argument("--image-size", type=int, nargs=2, default=None, metavar=("H", "W"))
+    parser.add_argument("--decoders", nargs="+", choices=list(DECODERS), default=list(DECODERS))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--output", default="artifacts/benchmarks/decoders.json")
+    args = parser.parse_args()
+
+    transformation_config = replace(ConfigurationManager().get_data_transformation_config(), resize=True)
+    if args.image_size:
+        transformation_config = replace(transformation_config, image_size=list(args.image_size))
+
+    tmp_dir = None
+    data_dir = args.data_dir
+    if data_dir is None:
+        tmp_dir = data_dir = tempfile.mkdtemp(prefix="synthetic_voc_")
+        generate_voc_split(os.path.join(data_dir, args.subset), args.num_images, tuple(args.min_size), tuple(args.max_size))
+
+    try:
+        samples = _list_samples(os.path.join(data_dir, args.subset), args.num_images)
+        results = {
+            "meta": {
+                "data_dir": None if tmp_dir else data_dir,
+                "synthetic": bool(tmp_dir),
+                "num_images": len(samples),
+                "image_size": list(transformation_config.image_size),
+                "repeats": args.repeats,
+                "cpu_count": os.cpu_count(),
+            },
+            "decoders": {},
+        }
+        for name in args.decoders:
+            results["decoders"][name] = bench_decoder(name, samples, transformation_config, args.repeats)
+            stats = results["decoders"][name]
+            logger.info(
+                f"{name}: decode {stats['decode']['samples_per_s']:.1f} img/s, "
+                f"decode+transform {stats['decode_transform']['samples_per_s']:.1f} img/s, "
+                f"{stats['decoded_pixel_fraction']:.1%} of pixels decoded, max box error {stats['max_box_error_px']:.2f}px"
+            )
+    finally:
+        if tmp_dir:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+import argparse
+import json
+import os
+import shutil
+import socket
+import sys
+import tempfile
+from dataclasses import replace
+from typing import Dict, List
+import torch
+import torch.multiprocessing as mp
+from src.benchmark.synthetic_voc import DEFAULT_CLASSES, generate_voc_split
+from src.components.data_loader import MyDataloader
+from src.components.data_transformation import MyTransform
+from src.components.dataset import MyDataset
+from src.components.model_trainer import ModelTrainer, build_model
+from src.components.samplers import ShardedSampler
+from src.config.configuration import ConfigurationManager
+from src.utils.distributed import all_gather_object, cleanup, init_distributed, is_main_process
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _worker(rank: int, world_size: int, port: int, args: argparse.Namespace, data_dir: str, out_dir: str) -> None:
+    """One rank: trains on its shard of the synthetic data and checks the sampler and the replicas."""
+    os.environ.update(RANK=str(rank), LOCAL_RANK=str(rank), WORLD_SIZE=str(world_size), LOCAL_WORLD_SIZE=str(world_size),
+                      MASTER_ADDR="127.0.0.1", MASTER_PORT=str(port))
+    config_manager = ConfigurationManager()
+    distributed_config = replace(config_manager.get_distributed_config(), enabled=True, threads_per_rank=args.threads_per_rank)
+    init_distributed(distributed_config)
+    if world_size == 1:
+        torch.set_num_threads(args.threads_per_rank or os.cpu_count() or 1)
+
+    class_map = {name: label for label, name in enumerate(DEFAULT_CLASSES, start=1)}
+    dataset_config = replace(config_manager.get_dataset_config(), data_dir=data_dir, train_dir="train", valid_dir="train",
+                             class_map=class_map, image_backend="jpeg", mode="map")
+    dataset = MyDataset(dataset_config, "train", MyTransform(config_manager.get_data_transformation_config(), train=True))
+    loader_config = replace(config_manager.get_data_loader_config(), num_workers=args.num_workers, train_batch_size=args.batch_size,
+                            batch_sampler="random", collate="default", drop_last=True)
+    loader = MyDataloader(loader_config, dataset, shuffle=True).get_loader()
+
+    # The ranks' shards must be disjoint and of equal size
+    shards = all_gather_object(list(ShardedSampler(len(dataset))))
+    seen = [index for shard in shards for index in shard]
+    sampler_ok = len(set(seen)) == len(seen) and len({len(shard) for shard in shards}) == 1
+
+    torch.manual_seed(rank)  # DDP must make the replicas identical regardless
+    trainer_config = replace(config_manager.get_model_trainer_config(), model_name=args.model, weights=None, weights_backbone=None,
+                             epochs=args.epochs, accumulation_steps=args.accumulation_steps, compile=False,
+                             model_path=os.path.join(out_dir, "model.pt"), history_file=os.path.join(out_dir, "history.json"),
+                             log_every_n_steps=10 ** 9)
+    model = build_model(args.model, num_classes=len(class_map) + 1, image_size=(224, 224))
+    trainer = ModelTrainer(trainer_config, model, distributed_config)
+    trainer.train(loader)
+
+    checksum = float(sum(p.detach().double().sum() for p in trainer.module.parameters()))
+    checksums = all_gather_object(checksum)
+    if is_main_process():
+        result = dict(trainer.history[-1], sampler_ok=sampler_ok, replicas_in_sync=max(checksums) - min(checksums) < 1e-6 * max(1.0, abs(checksum)))
+        with open(os.path.join(out_dir, "result.json"), 'w') as f:
+            json.dump(result, f)
+    cleanup()
+
+
+def run(world_size: int, args: argparse.Namespace, data_dir: str) -> Dict:
+    """Trains with `world_size` local processes on the gloo backend and returns rank 0's epoch summary."""
+    out_dir = tempfile.mkdtemp(prefix=f"ddp_{world_size}_")
+    try:
+        mp.start_processes(_worker, args=(world_size, _free_port(), args, data_dir, out_dir), nprocs=world_size, start_method="spawn")
+        with open(os.path.join(out_dir, "result.json"), 'r') as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(out_dir, ignore_errors=True)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Smoke test and scaling benchmark of DDP training with local CPU processes.")
+    parser.add_argument("--nproc", type=int, nargs="+", default=[1, 2], help="Process counts to run; the first is the scaling baseline.")
+    parser.add_argument("--num-images", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=4)
+    parser.add_argument("--num-workers", type=int, default=0)
+    parser.add_argument("--model", default="ssdlite320_mobilenet_v3_large")
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--accumulation-steps", type=int, default=2)
+    parser.add_argument("--threads-per-rank", type=int, default=0, help="0 = cores / processes.")
+    parser.add_argument("--output", default="artifacts/benchmarks/distributed_training.json")
+    args = parser.parse_args()
+
+    data_dir = tempfile.mkdtemp(prefix="synthetic_voc_")
+    results: Dict[str, Dict] = {}
+    failures: List[str] = []
+    try:
+        generate_voc_split(os.path.join(data_dir, "train"), args.num_images)
+        for world_size in args.nproc:
+            result = run(world_size, args, data_dir)
+            results[str(world_size)] = result
+            logger.info(f"{world_size} processes: {result['images_per_s']:.1f} images/s, sampler_ok={result['sampler_ok']}, replicas_in_sync={result['replicas_in_sync']}")
+            if not result["sampler_ok"]:
+                failures.append(f"{world_size} processes: sampler shards overlap or differ in size")
+            if not result["replicas_in_sync"]:
+                failures.append(f"{world_size} processes: model replicas diverged")
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    baseline = results[str(args.nproc[0])]["images_per_s"] / args.nproc[0]
+    for world_size, result in results.items():
+        result["scaling_efficiency"] = result["images_per_s"] / (int(world_size) * baseline) if baseline else 0.0
+    results["meta"] = {"cpu_count": os.cpu_count(), "model": args.model, "num_images": args.num_images, "batch_size": args.batch_size}
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    if failures:
+        logger.error("Distributed training checks failed:\n" + "\n".join(failures))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
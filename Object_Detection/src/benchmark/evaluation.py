@@ -0,0 +1,204 @@
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+from src.components.model_evaluation import COCO_IOU_THRESHOLDS, DetectionEvaluator
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def synthetic_detections(num_images: int, num_classes: int, max_objects: int, detections_per_image: int,
+                         difficult_rate: float, seed: int = 0) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Random ground truth and detections: jittered copies of the ground truth boxes (some of
+    them duplicates or with the wrong class) plus random false positives, with random scores.
+    """
+    rng = np.random.default_rng(seed)
+    predictions, targets = [], []
+    for _ in range(num_images):
+        n = int(rng.integers(0, max_objects + 1))
+        xy = rng.uniform(0, 400, (n, 2))
+        gt_boxes = np.concatenate([xy, xy + rng.uniform(20, 200, (n, 2))], axis=1)
+        gt_labels = rng.integers(1, num_classes, n)
+        targets.append({"boxes": gt_boxes, "labels": gt_labels, "difficult": rng.random(n) < difficult_rate})
+
+        hits = rng.integers(0, n, min(n * 2, detections_per_image)) if n else np.zeros(0, dtype=np.int64)
+        hit_boxes = gt_boxes[hits] + rng.normal(0, 8, (len(hits), 4))
+        hit_labels = np.where(rng.random(len(hits)) < 0.9, gt_labels[hits], rng.integers(1, num_classes, len(hits)))
+        m = detections_per_image - len(hits)
+        xy = rng.uniform(0, 400, (m, 2))
+        boxes = np.concatenate([hit_boxes, np.concatenate([xy, xy + rng.uniform(10, 200, (m, 2))], axis=1)])
+        labels = np.concatenate([hit_labels, rng.integers(1, num_classes, m)])
+        scores = np.concatenate([rng.uniform(0.3, 1.0, len(hits)), rng.uniform(0.0, 0.7, m)])
+        predictions.append({"boxes": boxes, "labels": labels, "scores": scores})
+    return predictions, targets
+
+
+def _iou(a: Sequence[float], b: Sequence[float]) -> float:
+    iw = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    ih = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = iw * ih
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def naive_evaluate(predictions: List[Dict], targets: List[Dict], num_classes: int, iou_thresholds: Sequence[float],
+                   max_detections: int = 100) -> Dict[str, float]:
+    """
+    Reference implementation with per-class, per-threshold, per-detection Python loops,
+    following the COCO matching rules for COCO AP, the VOC devkit matching rules for
+    VOC07/VOC12 AP, and the AP definitions literally.
+    """
+    def ap_at_points(recall: List[float], precision: List[float], points: Sequence[float]) -> float:
+        total = 0.0
+        for point in points:
+            candidates = [p for r, p in zip(recall, precision) if r >= point]
+            total += max(candidates) if candidates else 0.0
+        return total / len(points)
+
+    def ap_all_points(recall: List[float], precision: List[float]) -> float:
+        mrec, mpre = [0.0] + recall + [1.0], [0.0] + precision + [0.0]
+        for i in range(len(mpre) - 2, -1, -1):
+            mpre[i] = max(mpre[i], mpre[i + 1])
+        return sum((mrec[i + 1] - mrec[i]) * mpre[i + 1] for i in range(len(mrec) - 1))
+
+    kept = []
+    for prediction in predictions:
+        order = sorted(range(len(prediction["scores"])), key=lambda i: -prediction["scores"][i])[:max_detections]
+        kept.append(order)
+
+    def precision_recall(records: List[Tuple[float, int]], num_gt: int) -> Tuple[List[float], List[float]]:
+        records = sorted(records, key=lambda r: -r[0])
+        tp = fp = 0
+        recall, precision = [], []
+        for _, match in records:
+            if match == -1:
+                continue
+            tp += match == 1
+            fp += match == 0
+            recall.append(tp / num_gt)
+            precision.append(tp / (tp + fp))
+        return recall, precision
+
+    per_class = {"ap": [], "ap_50": [], "ap_75": [], "voc07_ap": [], "voc12_ap": []}
+    for label in range(1, num_classes):
+        num_gt = sum(int(((t["labels"] == label) & ~t["difficult"]).sum()) for t in targets)
+        if num_gt == 0:
+            continue
+        coco = []
+        for threshold in iou_thresholds:
+            records = []  # (score, match) with match 1 / 0 / -1
+            for image, (prediction, target) in enumerate(zip(predictions, targets)):
+                gts = [g for g in range(len(target["labels"])) if target["labels"][g] == label]
+                gts.sort(key=lambda g: target["difficult"][g])
+                taken = set()
+                for d in kept[image]:
+                    if prediction["labels"][d] != label:
+                        continue
+                    best, best_iou = None, threshold
+                    for g in gts:
+                        if g in taken:
+                            continue
+                        if best is not None and not target["difficult"][best] and target["difficult"][g]:
+                            break
+                        iou = _iou(prediction["boxes"][d], target["boxes"][g])
+                        # The first of equally good boxes wins
+                        if iou < best_iou or (best is not None and iou == best_iou):
+                            continue
+                        best, best_iou = g, iou
+                    if best is None:
+                        records.append((prediction["scores"][d], 0))
+                    else:
+                        taken.add(best)
+                        records.append((prediction["scores"][d], -1 if target["difficult"][best] else 1))
+            coco.append(ap_at_points(*precision_recall(records, num_gt), np.linspace(0, 1, 101)))
+
+        # VOC devkit: only the most overlapping box of the class counts, matched or not
+        records = []
+        for image, (prediction, target) in enumerate(zip(predictions, targets)):
+            gts = [g for g in range(len(target["labels"])) if target["labels"][g] == label]
+            detected = set()
+            for d in kept[image]:
+                if prediction["labels"][d] != label:
+                    continue
+                best, best_iou = None, 0.0
+                for g in gts:
+                    iou = _iou(prediction["boxes"][d], target["boxes"][g])
+                    if iou > best_iou:
+                        best, best_iou = g, iou
+                if best is None or best_iou <= 0.5:
+                    records.append((prediction["scores"][d], 0))
+                elif target["difficult"][best]:
+                    records.append((prediction["scores"][d], -1))
+                elif best in detected:
+                    records.append((prediction["scores"][d], 0))
+                else:
+                    detected.add(best)
+                    records.append((prediction["scores"][d], 1))
+        recall, precision = precision_recall(records, num_gt)
+        voc07 = ap_at_points(recall, precision, np.linspace(0, 1, 11))
+        voc12 = ap_all_points(recall, precision)
+        per_class["ap"].append(float(np.mean(coco)))
+        per_class["ap_50"].append(coco[0])
+        per_class["ap_75"].append(coco[int(np.argmin(np.abs(np.asarray(iou_thresholds) - 0.75)))])
+        per_class["voc07_ap"].append(voc07)
+        per_class["voc12_ap"].append(voc12)
+    names = {"ap": "map", "ap_50": "map_50", "ap_75": "map_75", "voc07_ap": "voc07_map", "voc12_ap": "voc12_map"}
+    return {names[key]: float(np.mean(values)) for key, values in per_class.items()}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare DetectionEvaluator with a naive reference: equal metrics and speedup.")
+    parser.add_argument("--num-images", type=int, default=500)
+    parser.add_argument("--num-classes", type=int, default=21, help="Including the background class.")
+    parser.add_argument("--max-objects", type=int, default=8)
+    parser.add_argument("--detections-per-image", type=int, default=100)
+    parser.add_argument("--difficult-rate", type=float, default=0.1)
+    parser.add_argument("--batch-size", type=int, default=8, help="Images per update() call.")
+    parser.add_argument("--tolerance", type=float, default=1e-9)
+    parser.add_argument("--skip-naive", action="store_true", help="Only time the evaluator, e.g. for large --num-images.")
+    parser.add_argument("--output", default="artifacts/benchmarks/evaluation.json")
+    args = parser.parse_args()
+
+    predictions, targets = synthetic_detections(args.num_images, args.num_classes, args.max_objects,
+                                                args.detections_per_image, args.difficult_rate)
+
+    start = time.perf_counter()
+    evaluator = DetectionEvaluator(args.num_classes, COCO_IOU_THRESHOLDS)
+    for i in range(0, args.num_images, args.batch_size):
+        evaluator.update(predictions[i:i + args.batch_size], targets[i:i + args.batch_size])
+    update_s = time.perf_counter() - start
+    metrics = evaluator.compute()
+    fast_s = time.perf_counter() - start
+    results = {
+        "meta": vars(args),
+        "evaluator": {"seconds": fast_s, "update_seconds": update_s, "images_per_s": args.num_images / fast_s},
+        "metrics": {key: value for key, value in metrics.items() if key != "per_class"},
+    }
+    logger.info(f"Evaluator: {fast_s:.3f}s ({update_s:.3f}s in update) for {args.num_images} images")
+
+    mismatches = []
+    if not args.skip_naive:
+        start = time.perf_counter()
+        reference = naive_evaluate(predictions, targets, args.num_classes, COCO_IOU_THRESHOLDS)
+        naive_s = time.perf_counter() - start
+        results["naive"] = {"seconds": naive_s, "metrics": reference}
+        results["speedup"] = naive_s / fast_s
+        logger.info(f"Naive reference: {naive_s:.3f}s, speedup {results['speedup']:.1f}x")
+        mismatches = [
+            f"{key}: evaluator {metrics[key]:.12f} vs reference {value:.12f}"
+            for key, value in reference.items() if abs(metrics[key] - value) > args.tolerance
+        ]
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    if mismatches:
+        logger.error("Evaluator disagrees with the reference:\n" + "\n".join(mismatches))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,185 @@
+import argparse
+import io
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List
+import numpy as np
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+BACKENDS = ("eager", "torchscript", "onnx")
+
+
+def cold_start(backend: str, path: str, model_name: str, num_classes: int, image_size: List[int], threads: int) -> Dict[str, float]:
+    """
+    Runs in a fresh process: time to import the runtime, load the model and answer the
+    first image, as a server (re)start pays it.
+    """
+    start = time.perf_counter()
+    import torch
+    from src.components import model_export
+    if backend == "onnx":
+        import onnxruntime  # noqa: F401
+    import_s = time.perf_counter() - start
+
+    torch.set_num_threads(threads)
+    start = time.perf_counter()
+    if backend == "eager":
+        from src.components.model_trainer import build_model
+
+        model = build_model(model_name, num_classes=num_classes, image_size=tuple(image_size)).eval()
+        model.load_state_dict(torch.load(path, map_location="cpu"))
+        forward = model
+    elif backend == "torchscript":
+        module = model_export.load_torchscript(path)
+        forward = lambda images: model_export.torchscript_forward(module, images)  # noqa: E731
+    else:
+        session = model_export.load_onnx_session(path, threads)
+        forward = lambda images: model_export.onnx_forward(session, images)  # noqa: E731
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with torch.inference_mode():
+        forward([torch.rand((3, *image_size))])
+    first_inference_s = time.perf_counter() - start
+    return {"import_s": import_s, "load_s": load_s, "first_inference_s": first_inference_s,
+            "total_s": import_s + load_s + first_inference_s}
+
+
+def _time_batches(forward: Callable, images: List, batch_size: int, repeats: int) -> List[float]:
+    """Wall time in milliseconds of each batch of `images`, over `repeats` passes."""
+    times = []
+    for _ in range(repeats):
+        for i in range(0, len(images) - batch_size + 1, batch_size):
+            start = time.perf_counter()
+            forward(images[i:i + batch_size])
+            times.append((time.perf_counter() - start) * 1000.0)
+    return times
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cold start, per-image latency and throughput of the eager, TorchScript and ONNX Runtime detectors.")
+    parser.add_argument("--model-path", default=None, help="Trained weights (default: the model trainer's; random weights if missing).")
+    parser.add_argument("--backends", nargs="+", default=list(BACKENDS), choices=BACKENDS)
+    parser.add_argument("--num-images", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=4, help="Images per forward for the throughput measurement.")
+    parser.add_argument("--repeats", type=int, default=3, help="Passes over the images per measurement.")
+    parser.add_argument("--threads", type=int, default=1, help="Intra-op threads of torch and ONNX Runtime.")
+    parser.add_argument("--score-atol", type=float, default=1e-3)
+    parser.add_argument("--box-atol", type=float, default=0.01)
+    parser.add_argument("--output", default="artifacts/benchmarks/export_latency.json")
+    parser.add_argument("--cold-start", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    parser.add_argument("--model-name", help=argparse.SUPPRESS)
+    parser.add_argument("--num-classes", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--image-size", type=int, nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start:
+        # Child process of the cold start measurement
+        print(json.dumps(cold_start(*args.cold_start, args.model_name, args.num_classes, args.image_size, args.threads)))
+        return 0
+
+    import torch
+    from PIL import Image
+    from torchvision.transforms import functional as F
+    from src.benchmark.inference_load import synthetic_jpegs
+    from src.components import model_export
+    from src.components.model_trainer import build_model
+    from src.config.configuration import ConfigurationManager
+
+    torch.set_num_threads(args.threads)
+    config_manager = ConfigurationManager()
+    trainer_config = config_manager.get_model_trainer_config()
+    num_classes = len(config_manager.get_dataset_config().class_map) + 1
+    image_size = list(config_manager.get_data_transformation_config().image_size)
+    model = build_model(trainer_config.model_name, num_classes=num_classes, image_size=tuple(image_size)).eval()
+    model_path = args.model_path or str(trainer_config.model_path)
+    trained = os.path.exists(model_path)
+    if trained:
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    else:
+        logger.warning(f"No checkpoint at {model_path}; benchmarking {trainer_config.model_name} with random weights")
+
+    # Validation-like inputs: decoded JPEGs at the size the data pipeline resizes to
+    images = [F.to_tensor(Image.open(io.BytesIO(data)).convert("RGB").resize(tuple(image_size[::-1])))
+              for data in synthetic_jpegs(args.num_images, tuple(image_size[::-1]))]
+
+    work_dir = tempfile.mkdtemp(prefix="export_latency_")
+    try:
+        paths = {"eager": os.path.join(work_dir, "model.pt"), "torchscript": os.path.join(work_dir, "model.torchscript.pt"),
+                 "onnx": os.path.join(work_dir, "model.onnx")}
+        torch.save(model.state_dict(), paths["eager"])
+        if "torchscript" in args.backends:
+            model_export.export_torchscript(model, paths["torchscript"])
+        if "onnx" in args.backends:
+            model_export.export_onnx(model, images[0], paths["onnx"])
+
+        # The ONNX graph is traced at images[0]'s size; parity is also checked at a second size
+        resized = [model_export.rescale_image(image, model_export.SECOND_SIZE_SCALE) for image in images]
+        with torch.inference_mode():
+            reference = model(images)
+            reference_resized = model(resized)
+        results: Dict = {"meta": dict(vars(args), model=trainer_config.model_name, trained=trained, image_size=image_size,
+                                      cpu_count=os.cpu_count()), "backends": {}}
+        for backend in args.backends:
+            command = [sys.executable, "-m", "src.benchmark.export_latency", "--cold-start", backend, paths[backend],
+                       "--model-name", trainer_config.model_name, "--num-classes", str(num_classes),
+                       "--image-size", *map(str, image_size), "--threads", str(args.threads)]
+            child = subprocess.run(command, capture_output=True, text=True, check=True)
+            cold = json.loads(child.stdout.strip().splitlines()[-1])
+
+            if backend == "eager":
+                forward = model
+            elif backend == "torchscript":
+                module = model_export.load_torchscript(paths[backend])
+                forward = lambda batch: model_export.torchscript_forward(module, batch)  # noqa: E731
+            else:
+                session = model_export.load_onnx_session(paths[backend], args.threads)
+                forward = lambda batch: model_export.onnx_forward(session, batch)  # noqa: E731
+
+            with torch.inference_mode():
+                forward(images[:1])  # warm up
+                per_image = _time_batches(forward, images, 1, args.repeats)
+                per_batch = _time_batches(forward, images, args.batch_size, args.repeats)
+                outputs = forward(images)
+                outputs_resized = forward(resized)
+            parity = model_export.compare_detections(reference, outputs, args.box_atol, args.score_atol)
+            parity_resized = model_export.compare_detections(reference_resized, outputs_resized, args.box_atol, args.score_atol)
+            results["backends"][backend] = {
+                "size_mb": os.path.getsize(paths[backend]) / 2**20,
+                "cold_start": cold,
+                "latency_ms": {"p50": float(np.percentile(per_image, 50)), "p95": float(np.percentile(per_image, 95)),
+                               "mean": float(np.mean(per_image))},
+                "throughput_images_per_s": args.batch_size * 1000.0 / float(np.mean(per_batch)),
+                "parity": parity,
+                "parity_second_size": parity_resized,
+            }
+            if not (parity["validated"] and parity_resized["validated"]):
+                logger.warning(f"{backend} parity is NOT validated: no eager detections to compare at one of the input sizes")
+
+        eager_ms = results["backends"].get("eager", {}).get("latency_ms", {}).get("p50")
+        logger.info(f"{trainer_config.model_name} at {image_size[0]}x{image_size[1]}, {args.threads} thread(s):")
+        for backend, result in results["backends"].items():
+            speedup = f", {eager_ms / result['latency_ms']['p50']:.2f}x eager" if eager_ms else ""
+            logger.info(f"  {backend:<12} cold start {result['cold_start']['total_s']:.2f}s "
+                        f"(import {result['cold_start']['import_s']:.2f}s, load {result['cold_start']['load_s']:.2f}s, "
+                        f"first image {result['cold_start']['first_inference_s']:.2f}s), "
+                        f"p50 {result['latency_ms']['p50']:.1f}ms/image{speedup}, "
+                        f"{result['throughput_images_per_s']:.1f} images/s at batch {args.batch_size}, "
+                        f"{result['parity']['matched']}/{result['parity']['compared']} detections match eager "
+                        f"({result['parity_second_size']['matched']}/{result['parity_second_size']['compared']} at the second size)")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
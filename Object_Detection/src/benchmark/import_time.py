@@ -0,0 +1,109 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+HEAVY_MODULES = ["torch", "torchvision", "requests", "roboflow", "cv2"]
+
+# Entry point -> (cumulative import time budget in ms, modules it must not import)
+BUDGETS = {
+    "main": (400, HEAVY_MODULES),
+    "src.config.configuration": (300, HEAVY_MODULES),
+    "src.utils.helpers": (150, HEAVY_MODULES),
+    "src.pipeline.runner": (300, HEAVY_MODULES),
+    "src.components.data_ingestion": (300, HEAVY_MODULES),
+    "src.pipeline.stage_02_data_validation": (600, ["torch", "torchvision", "requests", "roboflow"]),
+}
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """Parses `-X importtime` output into (module, self_us, cumulative_us) tuples."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str, repeats: int) -> Dict:
+    """Imports `module` in `repeats` fresh interpreters and returns its import time and imported modules."""
+    totals, rows = [], []
+    for _ in range(repeats):
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            capture_output=True, text=True, cwd=os.getcwd(),
+        )
+        if result.returncode != 0:
+            raise RuntimeError(f"Importing {module} failed:\n{result.stderr[-2000:]}")
+        rows = parse_importtime(result.stderr)
+        totals.append(next(cumulative for name, _, cumulative in rows if name == module))
+
+    heaviest = sorted(rows, key=lambda row: row[1], reverse=True)[:10]
+    return {
+        "median_ms": statistics.median(totals) / 1000.0,
+        "min_ms": min(totals) / 1000.0,
+        "modules": sorted({name for name, _, _ in rows}),
+        "heaviest_self_ms": {name: self_us / 1000.0 for name, self_us, _ in heaviest},
+    }
+
+
+def check(module: str, stats: Dict, budget_ms: float, forbidden: List[str]) -> List[str]:
+    """Returns a message for every budget or forbidden-import violation of `module`."""
+    violations = []
+    if stats["median_ms"] > budget_ms:
+        violations.append(f"{module}: import takes {stats['median_ms']:.0f}ms, budget {budget_ms:.0f}ms")
+    imported = set(stats["modules"])
+    for name in forbidden:
+        if name in imported:
+            violations.append(f"{module}: imports {name} at module import time")
+    return violations
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Measure import time of the pipeline entry points against a budget.")
+    parser.add_argument("--modules", nargs="+", default=list(BUDGETS), help="Entry points to measure.")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--budget-file", help="JSON of {module: budget_ms} overriding the built-in budgets.")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Multiplier for all budgets, e.g. for slow CI machines.")
+    parser.add_argument("--output", default="artifacts/benchmarks/import_time.json")
+    args = parser.parse_args()
+
+    budgets = {module: budget for module, (budget, _) in BUDGETS.items()}
+    if args.budget_file:
+        with open(args.budget_file, 'r') as f:
+            budgets.update(json.load(f))
+
+    results, violations = {}, []
+    for module in args.modules:
+        stats = measure(module, args.repeats)
+        budget_ms = budgets.get(module, float("inf")) * args.budget_scale
+        forbidden = BUDGETS.get(module, (None, HEAVY_MODULES))[1]
+        module_violations = check(module, stats, budget_ms, forbidden)
+        violations.extend(module_violations)
+        results[module] = {
+            "median_ms": stats["median_ms"],
+            "min_ms": stats["min_ms"],
+            "budget_ms": budget_ms,
+            "num_modules": len(stats["modules"]),
+            "heaviest_self_ms": stats["heaviest_self_ms"],
+            "ok": not module_violations,
+        }
+        logger.info(f"{module}: {stats['median_ms']:.0f}ms (budget {budget_ms:.0f}ms), {len(stats['modules'])} modules {'ok' if not module_violations else 'FAILED'}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    if violations:
+        logger.error("Import time budget exceeded:\n" + "\n".join(violations))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
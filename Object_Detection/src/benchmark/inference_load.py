@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from PIL import Image, ImageDraw
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def synthetic_jpegs(num_images: int, size: Tuple[int, int] = (640, 480), seed: int = 0, quality: int = 90) -> List[bytes]:
+    """Encoded noise images with random rectangles, like `synthetic_voc` writes to disk."""
+    rng = random.Random(seed)
+    images = []
+    for _ in range(num_images):
+        image = Image.effect_noise(size, 64).convert("RGB")
+        draw = ImageDraw.Draw(image)
+        for _ in range(rng.randint(1, 5)):
+            x, y = rng.randint(0, size[0] // 2), rng.randint(0, size[1] // 2)
+            draw.rectangle((x, y, x + rng.randint(20, size[0] // 2), y + rng.randint(20, size[1] // 2)),
+                           fill=tuple(rng.randint(0, 255) for _ in range(3)))
+        buffer = io.BytesIO()
+        image.save(buffer, format="JPEG", quality=quality)
+        images.append(buffer.getvalue())
+    return images
+
+
+class HttpClient:
+    """One keep-alive HTTP/1.1 connection to the inference server."""
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self.reader: Optional[asyncio.StreamReader] = None
+        self.writer: Optional[asyncio.StreamWriter] = None
+
+    async def request(self, method: str, path: str, body: bytes = b"") -> Tuple[int, Dict]:
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    async def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def run_level(host: str, port: int, images: List[bytes], concurrency: int, num_requests: int) -> Dict:
+    """
+    Closed loop: `concurrency` clients each send their next request as soon as the previous
+    one is answered, until `num_requests` are done. Returns the client-side latencies and
+    throughput together with the server's metrics for the same requests.
+    """
+    control = HttpClient(host, port)
+    await control.request("POST", "/metrics/reset")
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(num_requests))
+
+    async def client() -> None:
+        nonlocal errors
+        connection = HttpClient(host, port)
+        try:
+            for i in counter:
+                start = time.perf_counter()
+                status, _ = await connection.request("POST", "/predict", images[i % len(images)])
+                latencies.append((time.perf_counter() - start) * 1000.0)
+                errors += status != 200
+        finally:
+            await connection.close()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    _, server = await control.request("GET", "/metrics")
+    await control.close()
+
+    p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "latency_ms": {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(latencies))},
+        "server": server,
+    }
+
+
+class InProcessServer:
+    """Runs the inference server on its own event loop thread, so the load generator can sweep its settings."""
+    def __init__(self, config, predictor):
+        from src.models.predict_model import InferenceServer
+
+        self.server = InferenceServer(config, predictor)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="inference-server", daemon=True)
+
+    def __enter__(self) -> "InProcessServer":
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.server.start(), self.loop).result()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        asyncio.run_coroutine_threadsafe(self.server.stop(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Load generator for the inference server: throughput versus latency per concurrency level.")
+    parser.add_argument("--url", default=None, help="host:port of a running server; by default a server is started in-process "
+                                                    "for every --max-batch-size / --max-wait-ms combination.")
+    parser.add_argument("--model-path", default=None, help="In-process server: checkpoint to load instead of the configured one.")
+    parser.add_argument("--backend", default=None, help="In-process server: eager, torchscript or onnx (default: configured).")
+    parser.add_argument("--max-batch-size", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--max-wait-ms", type=float, nargs="+", default=[10.0])
+    parser.add_argument("--num-workers", type=int, default=None, help="In-process server: model threads (default: configured).")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16])
+    parser.add_argument("--requests-per-level", type=int, default=64)
+    parser.add_argument("--warmup", type=int, default=4, help="Requests sent before each sweep, not measured.")
+    parser.add_argument("--num-images", type=int, default=16)
+    parser.add_argument("--image-size", type=int, nargs=2, default=[640, 480], metavar=("WIDTH", "HEIGHT"))
+    parser.add_argument("--output", default="artifacts/benchmarks/inference_load.json")
+    args = parser.parse_args()
+
+    images = synthetic_jpegs(args.num_images, tuple(args.image_size))
+
+    def sweep(host: str, port: int) -> List[Dict]:
+        asyncio.run(run_level(host, port, images, 1, args.warmup))
+        levels = []
+        for concurrency in args.concurrency:
+            result = asyncio.run(run_level(host, port, images, concurrency, args.requests_per_level))
+            levels.append(result)
+            logger.info(f"concurrency={concurrency}: {result['throughput_rps']:.1f} req/s, p50={result['latency_ms']['p50']:.0f}ms "
+                        f"p95={result['latency_ms']['p95']:.0f}ms p99={result['latency_ms']['p99']:.0f}ms, "
+                        f"mean batch {result['server']['mean_batch_size']:.2f} (fill {result['server']['batch_fill']:.0%})")
+        return levels
+
+    results: Dict = {"meta": dict(vars(args), cpu_count=os.cpu_count()), "runs": []}
+    if args.url:
+        host, port = args.url.rsplit(":", 1)
+        results["runs"].append({"server": args.url, "levels": sweep(host, int(port))})
+    else:
+        from src.config.configuration import ConfigurationManager
+        from src.models.predict_model import load_predictor
+
+        config_manager = ConfigurationManager()
+        predictor = load_predictor(config_manager, args.model_path, args.backend)
+        base_config = replace(config_manager.get_inference_config(), host="127.0.0.1", port=0)
+        if args.num_workers is not None:
+            base_config = replace(base_config, num_workers=args.num_workers)
+        for max_batch_size in args.max_batch_size:
+            for max_wait_ms in args.max_wait_ms:
+                config = replace(base_config, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+                logger.info(f"Server with max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}")
+                with InProcessServer(config, predictor) as server:
+                    levels = sweep("127.0.0.1", server.server.port)
+                results["runs"].append({"max_batch_size": max_batch_size, "max_wait_ms": max_wait_ms,
+                                        "num_workers": config.num_workers, "levels": levels})
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, results)
+    failed = sum(level["errors"] for run in results["runs"] for level in run["levels"])
+    if failed:
+        logger.error(f"{failed} requests failed")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import argparse
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List
+from src.benchmark.synthetic_voc import generate_voc_split
+from src.components.data_ingestion import RoboflowDatasetDownloader
+from src.entity.config_entity import DataIngestionConfig
+from src.utils.helpers import download_file, save_json
+from src.utils.logging_setup import logger
+
+EXPORT_PATH = "/export.zip"
+
+
+class ExportServer:
+    """
+    Local stand-in for the Roboflow API and its export storage, on `http.server`.
+
+    `GET /<workspace>/<project>/<version>/<format>` returns the export link and
+    `GET /export.zip` serves the archive, honouring single byte ranges. With `truncate`
+    set, range responses stop halfway and drop the connection, like an interrupted
+    download. Every archive request is logged with its range and the bytes sent.
+    """
+    def __init__(self, archive: bytes):
+        self.archive = archive
+        self.truncate = False
+        self.requests: List[Dict] = []
+        self.lock = threading.Lock()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self) -> "ExportServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def reset(self) -> None:
+        with self.lock:
+            self.requests = []
+
+    def archive_requests(self) -> List[Dict]:
+        """Archive requests, without the one-byte size probes."""
+        return [r for r in self.requests if r["path"] == EXPORT_PATH and r["range"] != "bytes=0-0"]
+
+    def _handler(self) -> type:
+        state = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args) -> None:
+                pass
+
+            def _send(self, status: int, body: bytes, headers: Dict[str, str], limit: int = None) -> int:
+                self.send_response(status)
+                for name, value in dict(headers, **{"Content-Length": str(len(body))}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                sent = body if limit is None else body[:limit]
+                self.wfile.write(sent)
+                return len(sent)
+
+            def do_GET(self) -> None:
+                path = self.path.split("?", 1)[0]
+                if path != EXPORT_PATH:
+                    body = json.dumps({"export": {"link": f"{state.url}{EXPORT_PATH}"}}).encode()
+                    self._send(200, body, {"Content-Type": "application/json"})
+                    with state.lock:
+                        state.requests.append({"path": path, "range": None, "bytes": 0})
+                    return
+
+                archive, total = state.archive, len(state.archive)
+                byte_range = self.headers.get("Range")
+                match = re.fullmatch(r"bytes=(\d+)-(\d*)", byte_range or "")
+                if match:
+                    start = int(match.group(1))
+                    end = min(int(match.group(2)) if match.group(2) else total - 1, total - 1)
+                    body = archive[start:end + 1]
+                    limit = len(body) // 2 if state.truncate and len(body) > 1 else None
+                    sent = self._send(206, body, {"Content-Range": f"bytes {start}-{end}/{total}"}, limit)
+                    if limit is not None:
+                        # Drop the connection mid-body
+                        self.close_connection = True
+                else:
+                    sent = self._send(200, archive, {})
+                with state.lock:
+                    state.requests.append({"path": path, "range": byte_range, "bytes": sent})
+
+        return Handler
+
+
+def build_archive(work_dir: str, num_images: int) -> bytes:
+    """A Roboflow-style VOC export of synthetic train/valid splits as zip bytes."""
+    export_dir = os.path.join(work_dir, "export")
+    for split, seed in (("train", 0), ("valid", 1)):
+        generate_voc_split(os.path.join(export_dir, split), num_images, seed=seed)
+    archive_path = os.path.join(work_dir, "export.zip")
+    with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as zf:
+        for root, _, names in os.walk(export_dir):
+            for name in sorted(names):
+                path = os.path.join(root, name)
+                zf.write(path, os.path.relpath(path, export_dir).replace(os.sep, "/"))
+    with open(archive_path, "rb") as f:
+        return f.read()
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def run_scenarios(server: ExportServer, work_dir: str, chunk_size: int, num_connections: int) -> Dict[str, Dict]:
+    """Runs the download and ingestion scenarios against `server` and checks each one."""
+    results: Dict[str, Dict] = {}
+    url = f"{server.url}{EXPORT_PATH}"
+    total = len(server.archive)
+
+    def scenario(name: str, fn: Callable[[], Dict]) -> None:
+        server.reset()
+        start = time.perf_counter()
+        result = fn()
+        result["seconds"] = time.perf_counter() - start
+        result["requests"] = len(server.archive_requests())
+        result["bytes_served"] = sum(r["bytes"] for r in server.archive_requests())
+        results[name] = result
+        logger.info(f"{name}: {'ok' if result['ok'] else 'FAILED'} in {result['seconds']:.2f}s, "
+                    f"{result['requests']} archive requests, {result['bytes_served']} bytes served")
+
+    # Parallel ranges: a fresh download is split into num_connections ranged requests
+    target = os.path.join(work_dir, "download", "export.zip")
+    os.makedirs(os.path.dirname(target))
+
+    def parallel_ranges() -> Dict:
+        ok = download_file(url, target, chunk_size=chunk_size, num_connections=num_connections)
+        ranged = [r for r in server.archive_requests() if r["range"]]
+        return {"ok": ok and _read(target) == server.archive and len(ranged) == num_connections, "ranged_requests": len(ranged)}
+
+    scenario("parallel_ranges", parallel_ranges)
+
+    # Resume: an interrupted download leaves .part files; the rerun fetches only the rest
+    os.remove(target)
+
+    def interrupted() -> Dict:
+        server.truncate = True
+        try:
+            ok = download_file(url, target, chunk_size=chunk_size, num_connections=num_connections)
+        finally:
+            server.truncate = False
+        parts = [name for name in os.listdir(os.path.dirname(target)) if ".part" in name]
+        partial = sum(os.path.getsize(os.path.join(os.path.dirname(target), name)) for name in parts)
+        return {"ok": not ok and bool(parts) and 0 < partial < total, "part_files": len(parts), "partial_bytes": partial}
+
+    def resumed() -> Dict:
+        ok = download_file(url, target, chunk_size=chunk_size, num_connections=num_connections)
+        served = sum(r["bytes"] for r in server.archive_requests())
+        leftovers = [name for name in os.listdir(os.path.dirname(target)) if ".part" in name]
+        return {"ok": ok and _read(target) == server.archive and served < total and not leftovers}
+
+    scenario("interrupted", interrupted)
+    scenario("resumed", resumed)
+
+    # A complete file of the right size is not downloaded again
+    scenario("already_downloaded", lambda: {"ok": download_file(url, target, chunk_size=chunk_size, num_connections=num_connections)
+                                            and not server.archive_requests()})
+
+    # End to end through the ingestion component: export link, download, extraction and manifest
+    config = DataIngestionConfig(
+        download_location=os.path.join(work_dir, "data"),
+        workspace="synthetic", project_name="voc", version=1, format="voc",
+        api_url=server.url,
+        manifest_file=os.path.join(work_dir, "manifest.json"),
+        chunk_size_mb=1, num_connections=num_connections, extract_workers=4, keep_archive=False,
+    )
+    os.makedirs(config.download_location)
+    with zipfile.ZipFile(target) as zf:
+        members = [info.filename for info in zf.infolist() if not info.is_dir()]
+
+    def ingest() -> Dict:
+        RoboflowDatasetDownloader(config).download(api_key="synthetic")
+        with open(config.manifest_file) as f:
+            manifest = json.load(f)
+        on_disk = all(os.path.exists(os.path.join(config.download_location, name)) for name in members)
+        return {"ok": on_disk and manifest["complete"] and sorted(manifest["files"]) == sorted(members), "files": len(members)}
+
+    scenario("ingest", ingest)
+
+    # The manifest shows everything is present: no request reaches the server at all
+    def manifest_skip() -> Dict:
+        RoboflowDatasetDownloader(config).download(api_key="synthetic")
+        return {"ok": not server.requests}
+
+    scenario("manifest_skip", manifest_skip)
+
+    # A changed and a deleted file: the archive is fetched again, only those two are re-extracted
+    changed, deleted = (os.path.join(config.download_location, name) for name in members[:2])
+    original = {path: _read(path) for path in (changed, deleted)}
+    with open(changed, "ab") as f:
+        f.write(b"corrupted")
+    os.remove(deleted)
+    untouched = {name: os.stat(os.path.join(config.download_location, name)).st_mtime_ns for name in members[2:]}
+
+    def repair() -> Dict:
+        RoboflowDatasetDownloader(config).download(api_key="synthetic")
+        restored = all(_read(path) == data for path, data in original.items())
+        unchanged = all(os.stat(os.path.join(config.download_location, name)).st_mtime_ns == mtime for name, mtime in untouched.items())
+        return {"ok": restored and unchanged, "re_extracted": 2, "kept": len(untouched)}
+
+    scenario("repair", repair)
+    return results
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Dataset ingestion against a local HTTP stand-in for Roboflow: parallel "
+                                                 "range downloads, resume from .part files, manifest skip and repair.")
+    parser.add_argument("--num-images", type=int, default=64, help="Synthetic images per split.")
+    parser.add_argument("--chunk-kb", type=int, default=64, help="Download read size; ranges are at least 8 chunks.")
+    parser.add_argument("--num-connections", type=int, default=4)
+    parser.add_argument("--output", default="artifacts/benchmarks/ingestion.json")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="ingestion_")
+    try:
+        archive = build_archive(work_dir, args.num_images)
+        chunk_size = args.chunk_kb << 10
+        if len(archive) < 8 * chunk_size * args.num_connections:
+            logger.warning(f"The {len(archive)} byte archive is too small for {args.num_connections} ranges of 8 chunks; "
+                           f"raise --num-images or lower --chunk-kb")
+        with ExportServer(archive) as server:
+            results = run_scenarios(server, work_dir, chunk_size, args.num_connections)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, {"meta": dict(vars(args), archive_bytes=len(archive)), "scenarios": results})
+    failed = [name for name, result in results.items() if not result["ok"]]
+    if failed:
+        logger.error(f"Ingestion scenarios failed: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
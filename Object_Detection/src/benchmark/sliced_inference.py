@@ -0,0 +1,137 @@
+import argparse
+import io
+import json
+import os
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List
+from PIL import Image, ImageDraw
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def large_jpeg(side: int, objects_per_mpx: int = 20, seed: int = 0) -> bytes:
+    """A square noise image of `side` pixels with small rectangles, like objects in an aerial frame."""
+    rng = random.Random(seed)
+    image = Image.effect_noise((side, side), 64).convert("RGB")
+    draw = ImageDraw.Draw(image)
+    for _ in range(max(1, objects_per_mpx * side * side // 1_000_000)):
+        x, y, w, h = rng.randint(0, side - 80), rng.randint(0, side - 80), rng.randint(16, 80), rng.randint(16, 80)
+        draw.rectangle((x, y, x + w, y + h), fill=tuple(rng.randint(0, 255) for _ in range(3)))
+    buffer = io.BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def _max_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def build_predictor(model_path: str, batch_size: int, merge: str, threads: int):
+    """`Predictor` with sliced inference for the configured model; random weights if `model_path` doesn't exist."""
+    import torch
+    from src.components.image_decoders import get_decoder
+    from src.components.model_trainer import build_model
+    from src.config.configuration import ConfigurationManager
+    from src.models.predict_model import Predictor
+
+    torch.set_num_threads(threads)
+    config_manager = ConfigurationManager()
+    trainer_config = config_manager.get_model_trainer_config()
+    class_map = config_manager.get_dataset_config().class_map
+    image_size = config_manager.get_data_transformation_config().image_size
+    model = build_model(trainer_config.model_name, num_classes=len(class_map) + 1, image_size=image_size)
+    if os.path.exists(model_path):
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    sliced_config = replace(config_manager.get_sliced_inference_config(), batch_size=batch_size, merge=merge)
+    return Predictor(config_manager.get_inference_config(), model, class_map,
+                     get_decoder(config_manager.get_inference_config().decoder, image_size), sliced_config)
+
+
+def run_child(image_path: str, model_path: str, batch_size: int, merge: str, threads: int) -> Dict:
+    """
+    Runs in a fresh process, so peak memory is its own: one sliced prediction on the decoded
+    image, after a warm-up on a small one.
+    """
+    predictor = build_predictor(model_path, batch_size, merge, threads)
+    with open(image_path, "rb") as f:
+        data = f.read()
+    predictor.predict_sliced(large_jpeg(256, seed=1))
+    start = time.perf_counter()
+    image, _ = predictor.full_decoder.decode(data)
+    image = image.convert("RGB") if isinstance(image, Image.Image) else image
+    decode_s = time.perf_counter() - start
+    # The decoded image is already held; what inference adds on top is the tiling's working memory
+    before_mb = _max_rss_mb()
+    start = time.perf_counter()
+    result = predictor.sliced(image)
+    elapsed = time.perf_counter() - start
+    width, height = image.size if isinstance(image, Image.Image) else (image.shape[-1], image.shape[-2])
+    return {
+        "decoded_image_mb": width * height * 3 / 2**20,
+        "decode_s": decode_s,
+        "max_rss_before_mb": before_mb,
+        "max_rss_after_mb": _max_rss_mb(),
+        "inference_extra_mb": _max_rss_mb() - before_mb,
+        "num_tiles": result["num_tiles"],
+        "candidates": result["num_candidates"],
+        "detections": len(result["scores"]),
+        "seconds": elapsed,
+        "ms_per_tile": elapsed * 1000.0 / result["num_tiles"],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Sliced inference on large images: time, tiles and peak memory per image size, "
+                                                 "batch size and merge method, each in a fresh process.")
+    parser.add_argument("--sides", type=int, nargs="+", default=[1000, 3000, 6000], help="Square image sizes in pixels.")
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8])
+    parser.add_argument("--merge", nargs="+", default=["nms", "wbf"], choices=["nms", "wbf"])
+    parser.add_argument("--model-path", default="artifacts/model_trainer/model.pt", help="Random weights if missing.")
+    parser.add_argument("--threads", type=int, default=1)
+    parser.add_argument("--output", default="artifacts/benchmarks/sliced_inference.json")
+    parser.add_argument("--child", nargs=2, metavar=("IMAGE_PATH", "BATCH_SIZE"), help=argparse.SUPPRESS)
+    parser.add_argument("--child-merge", default="nms", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_child(args.child[0], args.model_path, int(args.child[1]), args.child_merge, args.threads)))
+        return 0
+
+    if not os.path.exists(args.model_path):
+        logger.warning(f"No checkpoint at {args.model_path}; timing the configured model with random weights")
+    # Images are generated here, so generating them doesn't count towards the children's peak memory
+    work_dir = tempfile.mkdtemp(prefix="sliced_inference_")
+    runs: List[Dict] = []
+    try:
+        for side in args.sides:
+            with open(os.path.join(work_dir, f"{side}.jpg"), "wb") as f:
+                f.write(large_jpeg(side))
+        for merge in args.merge:
+            for batch_size in args.batch_sizes:
+                for side in args.sides:
+                    command = [sys.executable, "-m", "src.benchmark.sliced_inference", "--child", os.path.join(work_dir, f"{side}.jpg"),
+                               str(batch_size), "--child-merge", merge, "--model-path", args.model_path, "--threads", str(args.threads)]
+                    child = subprocess.run(command, capture_output=True, text=True, check=True)
+                    run = dict(json.loads(child.stdout.strip().splitlines()[-1]), side=side, batch_size=batch_size, merge=merge)
+                    runs.append(run)
+                    logger.info(f"{side}x{side}, {merge}, batch {batch_size}: {run['num_tiles']} tiles in {run['seconds']:.2f}s "
+                                f"({run['ms_per_tile']:.1f}ms/tile), {run['candidates']} tile detections merged into {run['detections']}; "
+                                f"decoded image {run['decoded_image_mb']:.0f}MB, inference added {run['inference_extra_mb']:.0f}MB to the peak RSS")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, {"meta": dict(vars(args), cpu_count=os.cpu_count()), "runs": runs})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
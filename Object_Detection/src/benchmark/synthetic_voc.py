@@ -0,0 +1,84 @@
+import argparse
+import os
+import random
+from typing import Sequence, Tuple
+from PIL import Image, ImageDraw
+from src.utils.logging_setup import logger
+
+DEFAULT_CLASSES = ("person", "car", "dog", "cat", "bicycle")
+
+
+def _annotation_xml(filename: str, width: int, height: int, objects) -> str:
+    object_xml = "".join(
+        f"<object><name>{name}</name><pose>Unspecified</pose><truncated>0</truncated><difficult>0</difficult>"
+        f"<bndbox><xmin>{xmin}</xmin><ymin>{ymin}</ymin><xmax>{xmax}</xmax><ymax>{ymax}</ymax></bndbox></object>"
+        for name, (xmin, ymin, xmax, ymax) in objects
+    )
+    return (
+        f"<annotation><folder></folder><filename>{filename}</filename>"
+        f"<size><width>{width}</width><height>{height}</height><depth>3</depth></size>"
+        f"<segmented>0</segmented>{object_xml}</annotation>"
+    )
+
+
+def generate_voc_split(out_dir: str, num_images: int, min_size: Tuple[int, int] = (320, 240),
+                       max_size: Tuple[int, int] = (640, 480), max_objects: int = 5,
+                       classes: Sequence[str] = DEFAULT_CLASSES, seed: int = 0, quality: int = 90) -> str:
+    """
+    Writes a synthetic Pascal-VOC-style split: JPEG images with random rectangles and
+    matching XML annotations, named like Roboflow exports (`<name>_jpg.rf.<hash>`).
+
+    Args:
+        out_dir (str): Split directory to create.
+        num_images (int): Number of image/annotation pairs.
+        min_size (Tuple[int, int]): Minimum (width, height) of the images.
+        max_size (Tuple[int, int]): Maximum (width, height) of the images.
+        max_objects (int): Maximum number of objects per image.
+        classes (Sequence[str]): Class names to draw objects from.
+        seed (int): Random seed, so a split can be regenerated identically.
+        quality (int): JPEG quality.
+
+    Returns:
+        str: The split directory.
+    """
+    rng = random.Random(seed)
+    os.makedirs(out_dir, exist_ok=True)
+    for i in range(num_images):
+        width = rng.randint(min_size[0], max_size[0])
+        height = rng.randint(min_size[1], max_size[1])
+        image = Image.effect_noise((width, height), 64).convert("RGB")
+        draw = ImageDraw.Draw(image)
+
+        objects = []
+        for _ in range(rng.randint(0, max_objects)):
+            box_w = rng.randint(max(width // 20, 2), max(width // 2, 3))
+            box_h = rng.randint(max(height // 20, 2), max(height // 2, 3))
+            xmin = rng.randint(0, width - box_w)
+            ymin = rng.randint(0, height - box_h)
+            box = (xmin, ymin, xmin + box_w, ymin + box_h)
+            draw.rectangle(box, fill=tuple(rng.randint(0, 255) for _ in range(3)))
+            objects.append((rng.choice(classes), box))
+
+        base_id = f"synthetic_{i:07d}_jpg.rf.{rng.getrandbits(64):016x}"
+        image.save(os.path.join(out_dir, f"{base_id}.jpg"), quality=quality)
+        with open(os.path.join(out_dir, f"{base_id}.xml"), 'w') as f:
+            f.write(_annotation_xml(f"{base_id}.jpg", width, height, objects))
+
+    logger.info(f"Generated {num_images} synthetic VOC samples in {out_dir}")
+    return out_dir
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a synthetic Pascal-VOC-style dataset.")
+    parser.add_argument("--out-dir", required=True, help="Dataset directory; splits are created inside it.")
+    parser.add_argument("--splits", nargs="+", default=["train", "valid"])
+    parser.add_argument("--num-images", type=int, default=256)
+    parser.add_argument("--min-size", type=int, nargs=2, default=[320, 240], metavar=("W", "H"))
+    parser.add_argument("--max-size", type=int, nargs=2, default=[640, 480], metavar=("W", "H"))
+    parser.add_argument("--max-objects", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    for offset, split in enumerate(args.splits):
+        generate_voc_split(os.path.join(args.out_dir, split), args.num_images, tuple(args.min_size),
+                           tuple(args.max_size), args.max_objects, seed=args.seed + offset)
@@ -0,0 +1,154 @@
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from typing import Dict, List, Tuple
+import cv2
+import numpy as np
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+def synthetic_video(path: str, num_frames: int, size: Tuple[int, int] = (1280, 720), fps: float = 30.0, seed: int = 0) -> str:
+    """Writes a noisy video of `size` (width, height) with rectangles moving across it, like a camera over traffic."""
+    rng = random.Random(seed)
+    width, height = size
+    objects = [[rng.randint(0, width - 120), rng.randint(0, height - 120), rng.randint(40, 120), rng.randint(40, 120),
+                rng.choice([-6, -3, 3, 6]), rng.choice([-4, -2, 2, 4]), tuple(rng.randint(0, 255) for _ in range(3))]
+               for _ in range(6)]
+    background = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    for _ in range(num_frames):
+        frame = background.copy()
+        for obj in objects:
+            x, y, w, h, dx, dy, color = obj
+            cv2.rectangle(frame, (x, y), (x + w, y + h), color, -1)
+            obj[0] = min(max(x + dx, 0), width - w)
+            obj[1] = min(max(y + dy, 0), height - h)
+            if obj[0] in (0, width - w):
+                obj[4] = -dx
+            if obj[1] in (0, height - h):
+                obj[5] = -dy
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+def build_predictor(model_path: str):
+    """`Predictor` for the configured model; random weights if `model_path` doesn't exist."""
+    import torch
+    from src.components.image_decoders import get_decoder
+    from src.components.model_trainer import build_model
+    from src.config.configuration import ConfigurationManager
+    from src.models.predict_model import Predictor
+
+    config_manager = ConfigurationManager()
+    trainer_config = config_manager.get_model_trainer_config()
+    class_map = config_manager.get_dataset_config().class_map
+    transformation_config = config_manager.get_data_transformation_config()
+    image_size = transformation_config.image_size if transformation_config.resize else None
+    model = build_model(trainer_config.model_name, num_classes=len(class_map) + 1, image_size=image_size)
+    if os.path.exists(model_path):
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    config = config_manager.get_inference_config()
+    return Predictor(config, model, class_map, get_decoder(config.decoder, image_size))
+
+
+def run_sequential(path: str, predictor, config) -> Dict:
+    """The naive loop: read, preprocess, detect and write one frame at a time on one thread."""
+    from src.components.video_inference import draw_detections, preprocess_frame
+
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    writer = None
+    times = {"decode": 0.0, "preprocess": 0.0, "inference": 0.0, "postprocess": 0.0}
+    frames = 0
+    start = time.perf_counter()
+    with open(config.detections_file, "w") as f:
+        while True:
+            t0 = time.perf_counter()
+            ok, frame = capture.read()
+            t1 = time.perf_counter()
+            if not ok:
+                break
+            sample = preprocess_frame(frame, predictor.decoder.target_size)
+            t2 = time.perf_counter()
+            result = predictor.predict_batch([sample])[0]
+            t3 = time.perf_counter()
+            f.write(json.dumps(dict(result, frame=frames)) + "\n")
+            if config.write_video:
+                if writer is None:
+                    writer = cv2.VideoWriter(str(config.output_video), cv2.VideoWriter_fourcc(*"mp4v"), fps, (frame.shape[1], frame.shape[0]))
+                writer.write(draw_detections(frame, result))
+            t4 = time.perf_counter()
+            for name, seconds in zip(times, (t1 - t0, t2 - t1, t3 - t2, t4 - t3)):
+                times[name] += seconds
+            frames += 1
+    wall_s = time.perf_counter() - start
+    capture.release()
+    if writer is not None:
+        writer.release()
+    return {
+        "frames_processed": frames,
+        "wall_s": wall_s,
+        "fps": frames / wall_s,
+        "stages": {name: {"busy_s": seconds, "occupancy": seconds / wall_s} for name, seconds in times.items()},
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Video inference on a synthetic video: the naive per-frame loop against "
+                                                 "the threaded pipeline, with achieved FPS and per-stage occupancy.")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--strides", type=int, nargs="+", default=[1, 3])
+    parser.add_argument("--backpressure", nargs="+", default=["block", "drop_oldest"], choices=["block", "drop_oldest", "drop_newest"])
+    parser.add_argument("--model-path", default="artifacts/model_trainer/model.pt", help="Random weights if missing.")
+    parser.add_argument("--output", default="artifacts/benchmarks/video_pipeline.json")
+    args = parser.parse_args()
+
+    from src.components.video_inference import VideoInference, preprocess_frame
+    from src.config.configuration import ConfigurationManager
+
+    if not os.path.exists(args.model_path):
+        logger.warning(f"No checkpoint at {args.model_path}; timing the configured model with random weights")
+    predictor = build_predictor(args.model_path)
+    base_config = ConfigurationManager().get_video_inference_config()
+    work_dir = tempfile.mkdtemp(prefix="video_pipeline_")
+    runs: List[Dict] = []
+    try:
+        path = synthetic_video(os.path.join(work_dir, "synthetic.mp4"), args.frames, (args.width, args.height))
+        # Warm-up, so the first timed run doesn't pay for lazy initialisation
+        predictor.predict_batch([preprocess_frame(np.zeros((args.height, args.width, 3), dtype=np.uint8), predictor.decoder.target_size)])
+
+        sequential = run_sequential(path, predictor, base_config)
+        runs.append(dict(sequential, mode="sequential"))
+        logger.info(f"sequential: {sequential['frames_processed']} frames at {sequential['fps']:.1f} fps; time share "
+                    + ", ".join(f"{name} {stage['occupancy']:.0%}" for name, stage in sequential["stages"].items()))
+
+        for backpressure in args.backpressure:
+            for stride in args.strides:
+                for batch_size in args.batch_sizes:
+                    config = replace(base_config, frame_stride=stride, batch_size=batch_size, backpressure=backpressure)
+                    report = VideoInference(config, predictor.predict_batch, predictor.decoder.target_size).run(path)
+                    runs.append(dict(report, mode="pipelined", speedup_vs_sequential=report["fps"] / sequential["fps"]))
+                    logger.info(f"pipelined, {backpressure}, stride {stride}, batch {batch_size}: {report['frames_processed']} frames "
+                                f"at {report['fps']:.1f} fps ({report['fps'] / sequential['fps']:.2f}x), source at "
+                                f"{report['source_fps_achieved']:.1f} fps, {report['frames_dropped']} dropped, bottleneck {report['bottleneck']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    save_json(args.output, {"meta": dict(vars(args), cpu_count=os.cpu_count()), "runs": runs})
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
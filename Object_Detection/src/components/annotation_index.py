@@ -0,0 +1,243 @@
+import os
+import xml.etree.ElementTree as ET
+import numpy as np
+from typing import IO, Dict, List, Optional, Tuple, Union
+from src.utils.logging_setup import logger
+
+
+def parse_voc_xml(ann_path: Union[str, IO[bytes]]) -> Tuple[List[str], List[List[float]], Tuple[int, int], List[bool]]:
+    """
+    Parses a VOC XML file into raw class names, boxes, the image size and difficult flags.
+
+    Args:
+        ann_path (Union[str, IO[bytes]]): Path to the VOC XML annotation file, or an open file object.
+
+    Returns:
+        Tuple of (class names, [xmin, ymin, xmax, ymax] boxes, (width, height), difficult flags).
+        The size is (0, 0) when the XML has no <size> element; objects without a
+        <difficult> element are not difficult.
+    """
+    tree = ET.parse(ann_path)
+    root = tree.getroot()
+
+    width, height = 0, 0
+    size = root.find('size')
+    if size is not None:
+        width = int(float(size.find('width').text))
+        height = int(float(size.find('height').text))
+
+    names = []
+    boxes = []
+    difficult = []
+    for obj in root.findall('object'):
+        bbox = obj.find('bndbox')
+        names.append(obj.find('name').text.strip())
+        boxes.append([
+            float(bbox.find('xmin').text),
+            float(bbox.find('ymin').text),
+            float(bbox.find('xmax').text),
+            float(bbox.find('ymax').text),
+        ])
+        flag = obj.find('difficult')
+        difficult.append(flag is not None and bool(int(float(flag.text or 0))))
+    return names, boxes, (width, height), difficult
+
+
+class AnnotationIndex:
+    """
+    Columnar index of all VOC annotations in a split.
+
+    Every XML file is parsed once and flattened into NumPy arrays (boxes, class ids,
+    difficult flags, per-image offsets and image sizes) that are saved next to the data. The index is
+    rebuilt for a file whenever its mtime or size changes, so `MyDataset.__getitem__`
+    and annotation-only passes only ever slice arrays.
+    """
+    FORMAT_VERSION = 2
+
+    def __init__(self, ids: List[str], names: np.ndarray, boxes: np.ndarray, name_ids: np.ndarray, difficult: np.ndarray,
+                 offsets: np.ndarray, sizes: np.ndarray, mtimes: np.ndarray, file_sizes: np.ndarray):
+        """
+        Args:
+            ids (List[str]): Base ids of the indexed samples, in dataset order.
+            names (np.ndarray): Vocabulary of raw class names found in the XML files.
+            boxes (np.ndarray): (num_objects, 4) float32 boxes of all images, concatenated.
+            name_ids (np.ndarray): (num_objects,) index into `names` for every box.
+            difficult (np.ndarray): (num_objects,) VOC `difficult` flag of every box.
+            offsets (np.ndarray): (num_images + 1,) start offset of each image in `boxes`.
+            sizes (np.ndarray): (num_images, 2) image (width, height) read from the XML.
+            mtimes (np.ndarray): (num_images,) XML modification times in nanoseconds.
+            file_sizes (np.ndarray): (num_images,) XML file sizes in bytes.
+        """
+        self.ids = list(ids)
+        self.names = names
+        self.boxes = boxes
+        self.name_ids = name_ids
+        self.difficult = difficult
+        self.offsets = offsets
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.file_sizes = file_sizes
+
+        # Filled by `apply_class_map`
+        self.labels = None
+        self.kept_difficult = None
+        self.keep = None
+        self.label_offsets = None
+        self._kept_boxes = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def num_objects(self) -> np.ndarray:
+        """Number of (class-mapped) objects per image."""
+        return np.diff(self.label_offsets)
+
+    @classmethod
+    def load_or_build(cls, root_dir: str, ids: List[str], index_path: str, class_map: Dict[str, int]) -> "AnnotationIndex":
+        """
+        Loads the index saved at `index_path`, re-parsing only the XML files that were
+        added or whose mtime/size changed since it was written, and saves it back if
+        anything was updated.
+
+        Args:
+            root_dir (str): Split directory containing the XML files.
+            ids (List[str]): Base ids of the samples, in dataset order.
+            index_path (str): Location of the saved index.
+            class_map (Dict[str, int]): Mapping from class name to label.
+
+        Returns:
+            AnnotationIndex: The up-to-date index with labels mapped through `class_map`.
+        """
+        ann_paths = [os.path.join(root_dir, f"{base_id}.xml") for base_id in ids]
+        stats = [os.stat(path) for path in ann_paths]
+        mtimes = np.array([st.st_mtime_ns for st in stats], dtype=np.int64)
+        file_sizes = np.array([st.st_size for st in stats], dtype=np.int64)
+
+        cached = cls.load(index_path) if os.path.exists(index_path) else None
+        if cached is not None and cached.ids == list(ids) \
+                and np.array_equal(cached.mtimes, mtimes) and np.array_equal(cached.file_sizes, file_sizes):
+            logger.info(f"Annotation index {index_path} is up to date ({len(ids)} images)")
+            index = cached
+        else:
+            index = cls._build(ids, ann_paths, mtimes, file_sizes, cached)
+            index.save(index_path)
+
+        index.apply_class_map(class_map)
+        return index
+
+    @classmethod
+    def _build(cls, ids: List[str], ann_paths: List[str], mtimes: np.ndarray, file_sizes: np.ndarray,
+               cached: Optional["AnnotationIndex"] = None) -> "AnnotationIndex":
+        """Builds the index, reusing entries of `cached` whose XML file is unchanged."""
+        reusable = {}
+        if cached is not None:
+            for i, base_id in enumerate(cached.ids):
+                reusable[base_id] = i
+
+        vocab = {}
+        all_boxes, all_name_ids, all_difficult, counts, sizes = [], [], [], [], []
+        parsed = 0
+        for i, (base_id, ann_path) in enumerate(zip(ids, ann_paths)):
+            j = reusable.get(base_id)
+            if j is not None and cached.mtimes[j] == mtimes[i] and cached.file_sizes[j] == file_sizes[i]:
+                start, end = cached.offsets[j], cached.offsets[j + 1]
+                names = [str(n) for n in cached.names[cached.name_ids[start:end]]]
+                boxes = cached.boxes[start:end].tolist()
+                difficult = cached.difficult[start:end].tolist()
+                size = tuple(cached.sizes[j])
+            else:
+                try:
+                    names, boxes, size, difficult = parse_voc_xml(ann_path)
+                except Exception as e:
+                    logger.error(f"Error parsing XML for {ann_path}: {e}")
+                    names, boxes, size, difficult = [], [], (0, 0), []
+                parsed += 1
+
+            for name in names:
+                all_name_ids.append(vocab.setdefault(name, len(vocab)))
+            all_boxes.extend(boxes)
+            all_difficult.extend(difficult)
+            counts.append(len(boxes))
+            sizes.append(size)
+
+        logger.info(f"Annotation index built: parsed {parsed} of {len(ids)} XML files")
+        offsets = np.zeros(len(ids) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return cls(
+            ids=ids,
+            names=np.array(list(vocab), dtype=np.str_),
+            boxes=np.array(all_boxes, dtype=np.float32).reshape(-1, 4),
+            name_ids=np.array(all_name_ids, dtype=np.int32),
+            difficult=np.array(all_difficult, dtype=bool),
+            offsets=offsets,
+            sizes=np.array(sizes, dtype=np.int32).reshape(-1, 2),
+            mtimes=mtimes,
+            file_sizes=file_sizes,
+        )
+
+    def apply_class_map(self, class_map: Dict[str, int]) -> None:
+        """
+        Maps raw class names to labels and drops boxes whose class is not in `class_map`.
+        Labels are precomputed once so per-sample access is a plain slice.
+        """
+        lut = np.array([class_map.get(str(name), -1) for name in self.names], dtype=np.int64)
+        labels = lut[self.name_ids] if len(self.name_ids) else np.zeros(0, dtype=np.int64)
+        self.keep = labels >= 0
+        self.labels = labels[self.keep]
+
+        # Running count of kept boxes, sampled at the image offsets, gives the filtered offsets
+        kept_cumsum = np.zeros(len(self.keep) + 1, dtype=np.int64)
+        np.cumsum(self.keep, out=kept_cumsum[1:])
+        self.label_offsets = kept_cumsum[self.offsets]
+        self._kept_boxes = self.boxes[self.keep]
+        self.kept_difficult = self.difficult[self.keep]
+
+    def get(self, idx: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Returns the (boxes, labels, difficult) arrays of image `idx` as views into the index."""
+        start, end = self.label_offsets[idx], self.label_offsets[idx + 1]
+        return self._kept_boxes[start:end], self.labels[start:end], self.kept_difficult[start:end]
+
+    def save(self, index_path: str) -> None:
+        """Atomically writes the index to `index_path`."""
+        os.makedirs(os.path.dirname(index_path) or ".", exist_ok=True)
+        tmp_path = f"{index_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(
+                f,
+                version=np.array(self.FORMAT_VERSION),
+                ids=np.array(self.ids, dtype=np.str_),
+                names=self.names,
+                boxes=self.boxes,
+                name_ids=self.name_ids,
+                difficult=self.difficult,
+                offsets=self.offsets,
+                sizes=self.sizes,
+                mtimes=self.mtimes,
+                file_sizes=self.file_sizes,
+            )
+        os.replace(tmp_path, index_path)
+        logger.info(f"Annotation index saved to: {index_path}")
+
+    @classmethod
+    def load(cls, index_path: str) -> Optional["AnnotationIndex"]:
+        """Loads an index from disk. Returns None if the file is unreadable or outdated."""
+        try:
+            with np.load(index_path, allow_pickle=False) as data:
+                if int(data["version"]) != cls.FORMAT_VERSION:
+                    logger.warning(f"Annotation index {index_path} has an old format, rebuilding")
+                    return None
+                return cls(
+                    ids=data["ids"].tolist(),
+                    names=data["names"],
+                    boxes=data["boxes"],
+                    name_ids=data["name_ids"],
+                    difficult=data["difficult"],
+                    offsets=data["offsets"],
+                    sizes=data["sizes"],
+                    mtimes=data["mtimes"],
+                    file_sizes=data["file_sizes"],
+                )
+        except Exception as e:
+            logger.warning(f"Could not load annotation index {index_path}: {e}")
+            return None
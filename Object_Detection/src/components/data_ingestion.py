@@ -1,32 +1,141 @@
-from roboflow import Roboflow
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional
 from src.entity.config_entity import DataIngestionConfig
+from src.utils.helpers import download_file, extract_zip, file_crc32, save_json
 from src.utils.logging_setup import logger
 
+MANIFEST_VERSION = 1
+
+
 class RoboflowDatasetDownloader:
     def __init__(self, config: DataIngestionConfig):
         """
         Initialize Roboflow dataset downloader.
-        
+
         Args:
             config (DataIngestionConfig): Configuration object containing dataset details.
         """
         self.config = config
         self.dataset = None
 
+    @property
+    def dataset_key(self) -> str:
+        """Identifies the exported dataset version the manifest was written for."""
+        return f"{self.config.workspace}/{self.config.project_name}/{self.config.version}/{self.config.format}"
+
+    def _load_manifest(self) -> Optional[Dict]:
+        if not os.path.exists(self.config.manifest_file):
+            return None
+        try:
+            with open(self.config.manifest_file, 'r') as f:
+                manifest = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read ingestion manifest {self.config.manifest_file}: {e}")
+            return None
+        if manifest.get("version") != MANIFEST_VERSION or manifest.get("dataset") != self.dataset_key:
+            logger.info("Ingestion manifest belongs to a different dataset version, ignoring it")
+            return None
+        return manifest
+
+    def _is_complete(self, manifest: Optional[Dict]) -> bool:
+        """Whether every file in the manifest is on disk with its recorded size and mtime."""
+        if not manifest or not manifest.get("complete") or not manifest.get("files"):
+            return False
+        for name, entry in manifest["files"].items():
+            path = os.path.join(self.config.download_location, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                return False
+            if stat.st_size != entry["size"] or stat.st_mtime_ns != entry["mtime_ns"]:
+                return False
+        return True
+
+    def _export_link(self, api_key: str) -> str:
+        """Resolves the signed download link of the dataset export through the Roboflow REST API."""
+        import requests
+
+        url = f"{self.config.api_url.rstrip('/')}/{self.dataset_key}"
+        response = requests.get(url, params={"api_key": api_key}, timeout=60)
+        response.raise_for_status()
+        link = response.json().get("export", {}).get("link")
+        if not link:
+            raise ValueError(f"No export link in Roboflow response for {self.dataset_key}")
+        return link
+
+    def _download_with_sdk(self, api_key: str) -> str:
+        """Fallback to the Roboflow SDK, which always downloads and extracts the full archive."""
+        from roboflow import Roboflow
+
+        rf = Roboflow(api_key=api_key)
+        project = rf.workspace(self.config.workspace).project(self.config.project_name)
+        version = project.version(self.config.version)
+        return version.download(model_format=self.config.format, location=self.config.download_location).location
+
+    def _manifest_entries(self, dataset_dir: str) -> Dict[str, Dict]:
+        """
+        Manifest entries of the files under `dataset_dir`, keyed like the archive members
+        (relative to the download location), with the size, CRC-32 and mtime an extraction
+        records, so a later archive download also recognises them.
+        """
+        paths = [os.path.join(root, name) for root, _, names in os.walk(dataset_dir) for name in names]
+        with ThreadPoolExecutor(max_workers=max(1, self.config.extract_workers)) as executor:
+            crcs = list(executor.map(file_crc32, paths))
+        entries = {}
+        for path, crc in zip(paths, crcs):
+            stat = os.stat(path)
+            name = os.path.relpath(path, self.config.download_location).replace(os.sep, "/")
+            entries[name] = {"size": stat.st_size, "crc32": crc, "mtime_ns": stat.st_mtime_ns}
+        return entries
+
     def download(self, api_key: str) -> str:
         """
         Download the dataset from Roboflow and extract it to the given directory.
 
+        Nothing is downloaded when the manifest shows that every extracted file is still
+        present and unchanged. Otherwise the export archive is downloaded (resuming a
+        partial download) and only the members missing or changed on disk are extracted.
+
         Args:
             api_key (str): Your Roboflow API key.
-        
+
         Returns:
-            dataset info object that contains location and metadata
+            str: Directory the dataset was extracted to.
         """
+        manifest = self._load_manifest()
+        if self._is_complete(manifest):
+            logger.info(f"Dataset {self.dataset_key} already present in {self.config.download_location} ({len(manifest['files'])} files), skipping download")
+            self.dataset = self.config.download_location
+            return self.dataset
+
         logger.info("Downloading dataset from Roboflow...")
-        rf = Roboflow(api_key=api_key)
-        project = rf.workspace(self.config.workspace).project(self.config.project_name)
-        version = project.version(self.config.version)
-        self.dataset = version.download(model_format=self.config.format, location=self.config.download_location)
-        logger.info(f"Dataset downloaded and extracted to: {self.dataset.location}")
-        return self.dataset
\ No newline at end of file
+        try:
+            link = self._export_link(api_key)
+        except Exception as e:
+            logger.warning(f"Could not resolve the export link ({e}); falling back to the Roboflow SDK")
+            self.dataset = self._download_with_sdk(api_key)
+            # Recorded like an extraction, so the next run skips the download
+            files = self._manifest_entries(self.dataset)
+            save_json(self.config.manifest_file, {"version": MANIFEST_VERSION, "dataset": self.dataset_key, "files": files, "complete": bool(files)})
+            logger.info(f"Dataset downloaded and extracted to: {self.dataset}")
+            return self.dataset
+
+        manifest = manifest or {"version": MANIFEST_VERSION, "dataset": self.dataset_key, "files": {}}
+        manifest["complete"] = False
+        archive_path = os.path.join(self.config.download_location, "roboflow.zip")
+        if not download_file(link, archive_path, chunk_size=self.config.chunk_size_mb << 20, num_connections=self.config.num_connections):
+            raise RuntimeError(f"Failed to download {self.dataset_key}; rerun to resume")
+        extracted = extract_zip(archive_path, self.config.download_location, manifest["files"], num_workers=self.config.extract_workers)
+        # Saved even on failure, so a rerun skips the members that were already extracted
+        manifest["complete"] = extracted
+        save_json(self.config.manifest_file, manifest)
+        if not extracted:
+            raise RuntimeError(f"Failed to extract {archive_path}")
+        if not self.config.keep_archive:
+            os.remove(archive_path)
+
+        self.dataset = self.config.download_location
+        logger.info(f"Dataset downloaded and extracted to: {self.dataset}")
+        return self.dataset
@@ -1,32 +1,202 @@
+import time
+from typing import Callable, Optional
+from src.components.data_transformation import MyBatchTransform
 from src.components.dataset import MyDataset
+from src.components.samplers import AspectRatioGroupedBatchSampler, ShardedSampler, read_image_sizes
+from src.components.shards import ShardedVOCDataset
 from src.entity.config_entity import DataLoaderConfig
-from src.utils.helpers import collate_fn
-from torch.utils.data import DataLoader
+from src.utils.distributed import get_distributed_world_size
+from src.utils.helpers import collate_fn, pack_batch, padded_collate_fn
+from torch.utils.data import DataLoader, IterableDataset
+from src.utils.instrumentation import InstrumentedBatch, WorkerInstrumentationInit, instrumentation
 from src.utils.logging_setup import logger
+
+class BatchTransformCollate:
+    '''
+    Collation followed by a batch transform, so the transform runs inside the
+    DataLoader workers on the freshly collated batch. With `pack`, the result is
+    returned as a `PackedBatch`.
+    '''
+    def __init__(self, collate_fn: Callable, batch_transform: MyBatchTransform, pack: bool = False):
+        self.collate_fn = collate_fn
+        self.batch_transform = batch_transform
+        self.pack = pack
+
+    def __call__(self, batch):
+        images, targets = self.collate_fn(batch)
+        images, targets = self.batch_transform(images, targets)
+        if self.pack:
+            return pack_batch(images, targets)
+        return images, targets
+
+class InstrumentedCollate:
+    '''
+    Times the collate function and, inside a worker, returns the worker's data-path
+    metrics together with the batch as an `InstrumentedBatch`.
+    '''
+    def __init__(self, collate_fn: Callable):
+        self.collate_fn = collate_fn
+
+    def __call__(self, batch):
+        with instrumentation.timer("collate"):
+            batch = self.collate_fn(batch)
+        instrumentation.count("batches")
+        if instrumentation.in_worker and instrumentation.enabled:
+            return InstrumentedBatch(batch, instrumentation.take())
+        return batch
+
+class InstrumentedDataLoader(DataLoader):
+    '''
+    DataLoader that logs one data-path summary per epoch (stage latency histograms,
+    counters and throughput) instead of per-sample log lines. Worker metrics arrive
+    with their batch and are merged as it is yielded; `last_counters` keeps the
+    counters of the last completed epoch.
+    '''
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.epoch = 0
+        self.last_counters = {}
+
+    def __iter__(self):
+        # Streaming datasets reshuffle their shards per epoch
+        if hasattr(self.dataset, "set_epoch"):
+            self.dataset.set_epoch(self.epoch)
+        if not instrumentation.enabled:
+            self.epoch += 1
+            for batch in super().__iter__():
+                yield batch.batch if isinstance(batch, InstrumentedBatch) else batch
+            return
+
+        instrumentation.reset()
+        epoch_start = time.perf_counter()
+        iterator = super().__iter__()
+        while True:
+            # Time the main process spends waiting for the next batch
+            wait_start = time.perf_counter_ns()
+            try:
+                batch = next(iterator)
+            except StopIteration:
+                break
+            instrumentation.record("wait", time.perf_counter_ns() - wait_start)
+            if isinstance(batch, InstrumentedBatch):
+                instrumentation.merge(batch.metrics)
+                batch = batch.batch
+            yield batch
+
+        self.epoch += 1
+        self.last_counters = dict(instrumentation.counters)
+        logger.info(f"Epoch {self.epoch} data loading summary: {instrumentation.summary(time.perf_counter() - epoch_start)}")
+        instrumentation.reset()
+
 class MyDataloader:
     '''
     Custom DataLoader for object detection.
     '''
-    def __init__(self, config: DataLoaderConfig, dataset: MyDataset, shuffle: bool = True):
+    def __init__(self, config: DataLoaderConfig, dataset: MyDataset, shuffle: bool = True, batch_transform: Optional[MyBatchTransform] = None):
         self.config = config
         self.dataset = dataset
         self.shuffle = shuffle
-        self.collate_fn = collate_fn
+        self.batch_sampler = None
+        self.sharded = True
+        if self.config.collate not in ("default", "padded"):
+            raise ValueError(f"Invalid collate: {self.config.collate}. Must be one of 'default' or 'padded'.")
+        if batch_transform is not None:
+            self.collate_fn = BatchTransformCollate(collate_fn, batch_transform, pack=self.config.collate == "padded")
+        else:
+            self.collate_fn = padded_collate_fn if self.config.collate == "padded" else collate_fn
 
-    def get_loader(self):
+    def _get_batch_sampler(self, batch_size: int, sharded: bool) -> Optional[AspectRatioGroupedBatchSampler]:
         '''
-        Returns the DataLoader object.
+        Builds the configured batch sampler, or returns None for plain random batching.
         '''
-        logger.info(f"Initializing DataLoader with batch size {self.config.train_batch_size if self.shuffle else self.config.valid_batch_size}, workers {self.config.num_workers}, shuffle={self.shuffle}.")
-        data_loader = DataLoader(
-            self.dataset,
-            batch_size=self.config.train_batch_size if self.shuffle else self.config.valid_batch_size,
+        if self.config.batch_sampler == "random":
+            return None
+        if isinstance(self.dataset, IterableDataset):
+            logger.warning("Batch samplers do not apply to streaming datasets; using sequential batches.")
+            return None
+        if self.config.batch_sampler != "aspect_ratio":
+            raise ValueError(f"Invalid batch sampler: {self.config.batch_sampler}. Must be one of 'random' or 'aspect_ratio'.")
+
+        batch_sampler = AspectRatioGroupedBatchSampler(
+            sizes=read_image_sizes(self.dataset),
+            batch_size=batch_size,
+            bin_edges=self.config.aspect_ratio_bins,
+            drop_last=self.drop_last,
             shuffle=self.shuffle,
+            num_replicas=None if sharded else 1,
+            rank=None if sharded else 0,
+            even_shards=self.shuffle
+        )
+        report = batch_sampler.padding_report()
+        logger.info(f"Aspect ratio grouping: padding {report['grouped']:.1%} vs {report['random']:.1%} with random batches ({report['saved']:.1%} saved)")
+        return batch_sampler
+
+    @property
+    def drop_last(self) -> bool:
+        '''
+        Only training loaders drop the incomplete last batch; evaluation sees every sample.
+        '''
+        return self.config.drop_last and self.shuffle
+
+    def get_loader(self, sharded: bool = True):
+        '''
+        Returns the DataLoader object.
+
+        Args:
+            sharded (bool, optional): Under distributed training, load only this rank's part of
+                the dataset. Set to False when a single process needs all of it, e.g. export and
+                quantization on the main process. Defaults to True.
+        '''
+        batch_size = self.config.train_batch_size if self.shuffle else self.config.valid_batch_size
+        logger.info(f"Initializing DataLoader with batch size {batch_size}, workers {self.config.num_workers}, shuffle={self.shuffle}.")
+        self.sharded = sharded
+        self.batch_sampler = self._get_batch_sampler(batch_size, sharded)
+        if isinstance(self.dataset, ShardedVOCDataset):
+            self.dataset.split_ranks = sharded
+
+        # Workers return their data-path metrics with every batch
+        worker_init_fn = None
+        if self.config.num_workers > 0:
+            worker_init_fn = WorkerInstrumentationInit(instrumentation.enabled, instrumentation.debug_sample_rate)
+
+        loader_kwargs = dict(
             pin_memory=self.config.pin_memory,
-            drop_last=self.config.drop_last,
             num_workers=self.config.num_workers,
-            collate_fn=self.collate_fn
+            collate_fn=InstrumentedCollate(self.collate_fn),
+            worker_init_fn=worker_init_fn
         )
+        if self.batch_sampler is not None:
+            data_loader = InstrumentedDataLoader(
+                self.dataset,
+                batch_sampler=self.batch_sampler,
+                **loader_kwargs
+            )
+        elif isinstance(self.dataset, IterableDataset):
+            # Streaming datasets shuffle themselves (shard order + shuffle buffer)
+            data_loader = InstrumentedDataLoader(
+                self.dataset,
+                batch_size=batch_size,
+                drop_last=self.drop_last,
+                **loader_kwargs
+            )
+        elif sharded and get_distributed_world_size() > 1:
+            # Each rank loads its own, non-overlapping part of the dataset; training shards are
+            # cut to the same size, evaluation shards together cover every sample
+            data_loader = InstrumentedDataLoader(
+                self.dataset,
+                batch_size=batch_size,
+                sampler=ShardedSampler(len(self.dataset), shuffle=self.shuffle, even_shards=self.shuffle),
+                drop_last=self.drop_last,
+                **loader_kwargs
+            )
+        else:
+            data_loader = InstrumentedDataLoader(
+                self.dataset,
+                batch_size=batch_size,
+                shuffle=self.shuffle,
+                drop_last=self.drop_last,
+                **loader_kwargs
+            )
         logger.info("DataLoader initialized.")
         return data_loader
 
@@ -34,5 +204,12 @@ class MyDataloader:
         '''
         Returns the number of batches in the DataLoader.
         '''
-        return len(self.dataset) // (self.config.train_batch_size if self.shuffle else self.config.valid_batch_size)
-    
\ No newline at end of file
+        if self.batch_sampler is not None:
+            return len(self.batch_sampler)
+        batch_size = self.config.train_batch_size if self.shuffle else self.config.valid_batch_size
+        if isinstance(self.dataset, IterableDataset) or not self.sharded or get_distributed_world_size() == 1:
+            # Streaming datasets already report the samples of this rank
+            num_samples = len(self.dataset)
+        else:
+            num_samples = len(ShardedSampler(len(self.dataset), even_shards=self.shuffle))
+        return num_samples // batch_size if self.drop_last else -(-num_samples // batch_size)
@@ -2,79 +2,91 @@ import torchvision.transforms.functional as F
 from PIL import Image
 import torch
 import random
-from typing import Tuple, Dict
+from typing import Callable, Optional, Tuple, Dict, List, Sequence, Union
+from src.core.box_ops import hflip_boxes, scale_boxes
 from src.entity.config_entity import DataTransformationConfig
 
+ImageType = Union[Image.Image, torch.Tensor]
+
 
 class MyTransform:
     """
     All-in-one transformation class for Object Detection.
     Handles sequential application of transforms (Compose logic), resizing,
     conversion to Tensor, and geometric augmentation (RandomHorizontalFlip) 
-    while correctly updating bounding boxes.
+    while correctly updating bounding boxes. An optional target encoder (e.g.
+    `SSDTargetEncoder`) runs last, on the final boxes.
     """
-    def __init__(self, config: DataTransformationConfig, train: bool = False):
+    def __init__(self, config: DataTransformationConfig, train: bool = False,
+                 target_encoder: Optional[Callable[[ImageType, Dict[str, torch.Tensor]], Dict[str, torch.Tensor]]] = None):
         """
         Args:
             config (DataTransformationConfig): Configuration for the Data Transformation Stage.
             train (bool, optional): Whether the model is in training mode. Defaults to False.
+            target_encoder (Callable, optional): Adds model-specific targets computed from
+                the transformed image and boxes. Defaults to None.
         """
         self.config = config
         self.train = train
+        self.target_encoder = target_encoder
+
+    @staticmethod
+    def _image_size(image: ImageType) -> Tuple[int, int]:
+        """Returns the (width, height) of a PIL image or a CHW tensor."""
+        if isinstance(image, torch.Tensor):
+            h, w = image.shape[-2:]
+            return w, h
+        return image.size
 
-    def _random_horizontal_flip(self, image: Image.Image, target: Dict[str, torch.Tensor]) -> Tuple[Image.Image, Dict[str, torch.Tensor]]:
+    def _random_horizontal_flip(self, image: ImageType, target: Dict[str, torch.Tensor]) -> Tuple[ImageType, Dict[str, torch.Tensor]]:
         """Applies horizontal flip to image and updates bounding boxes."""
         if random.random() < self.config.flip_prob:
             image = F.hflip(image)
             
-            # Get width (W) of the PIL image
-            w, _ = image.size 
-            
-            # Clone boxes tensor to prevent in-place modification issues
-            boxes = target["boxes"].clone()
+            # Get width (W) of the image
+            w, _ = self._image_size(image)
             
-            # Apply the horizontal flip transformation to coordinates:
-            # new_xmin = W - old_xmax
-            # new_xmax = W - old_xmin
-            xmin_old = boxes[:, 0].clone()
-            xmax_old = boxes[:, 2].clone()
-            
-            boxes[:, 0] = w - xmax_old
-            boxes[:, 2] = w - xmin_old
-            
-            target["boxes"] = boxes
+            # new_xmin = W - old_xmax, new_xmax = W - old_xmin (a new tensor, the original is untouched)
+            target["boxes"] = hflip_boxes(target["boxes"], w)
             
         return image, target
     
-    def _resize(self, image: Image.Image, target: Dict[str, torch.Tensor]) -> Tuple[Image.Image, Dict[str, torch.Tensor]]:
+    def _resize(self, image: ImageType, target: Dict[str, torch.Tensor]) -> Tuple[ImageType, Dict[str, torch.Tensor]]:
         """Resizes the image and updates bounding boxes."""
+        # image_size follows torchvision's (height, width) convention
+        orig_w, orig_h = self._image_size(image)
+        if (orig_h, orig_w) == tuple(self.config.image_size):
+            # Already at the target size (e.g. served from a packed image store)
+            return image, target
+
         image = F.resize(image, self.config.image_size)
         
-        # Get width (W) and height (H) of the resized PIL image
-        w, h = image.size
-        
-        # Clone boxes tensor to prevent in-place modification issues
-        boxes = target["boxes"].clone()
+        # Get width (W) and height (H) of the resized image
+        w, h = self._image_size(image)
         
         # Apply the resize transformation to coordinates
-        boxes[:, 0] = boxes[:, 0] * (w / self.config.image_size[0])
-        boxes[:, 2] = boxes[:, 2] * (w / self.config.image_size[0])
-        boxes[:, 1] = boxes[:, 1] * (h / self.config.image_size[1])
-        boxes[:, 3] = boxes[:, 3] * (h / self.config.image_size[1])
-        
-        target["boxes"] = boxes
+        target["boxes"] = scale_boxes(target["boxes"], (w / orig_w, h / orig_h))
 
         return image, target
 
-    def _to_tensor(self, image: Image.Image, target: Dict[str, torch.Tensor]) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
-        """Converts the PIL image to a PyTorch Tensor."""
+    def _to_tensor(self, image: ImageType, target: Dict[str, torch.Tensor]) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
+        """Converts the image to a float PyTorch Tensor (0-1 range)."""
+        if isinstance(image, torch.Tensor):
+            # uint8 tensors (e.g. from a packed image store) only need a dtype conversion
+            return F.convert_image_dtype(image, torch.float32), target
         # torchvision.transforms.functional.to_tensor converts PIL Image to float Tensor (0-1 range)
         return F.to_tensor(image), target
 
-    def __call__(self, image: Image.Image, target: Dict[str, torch.Tensor]) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
+    def __call__(self, image: ImageType, target: Dict[str, torch.Tensor]) -> Tuple[torch.Tensor, Dict[str, torch.Tensor]]:
         """
         Executes the transformation pipeline.
         """
+        if self.config.batch_mode:
+            # Resize, flip and conversion run on the whole batch in `MyBatchTransform`
+            if not isinstance(image, torch.Tensor):
+                image = F.pil_to_tensor(image)
+            return image, target
+
         # 0. Resize (Always mandatory)
         if self.config.resize:
             image, target = self._resize(image, target)
@@ -85,5 +97,116 @@ class MyTransform:
         
         # 2. Conversion (Always mandatory)
         image, target = self._to_tensor(image, target)
+
+        # 3. Target encoding (optional), on the final boxes
+        if self.target_encoder is not None:
+            target = self.target_encoder(image, target)
             
-        return image, target
\ No newline at end of file
+        return image, target
+
+
+class MyBatchTransform:
+    """
+    Batch-mode counterpart of `MyTransform` that runs after collation.
+
+    Takes the uint8 CHW tensors produced by `MyTransform` in batch mode and applies
+    resizing, the random horizontal flip (one random draw per sample), dtype conversion
+    and normalization as tensor ops over the whole batch. Box coordinates of all images
+    are updated with a single vectorized op over the concatenated boxes; an optional
+    target encoder then runs per image, as in `MyTransform`.
+    """
+    def __init__(self, config: DataTransformationConfig, train: bool = False,
+                 target_encoder: Optional[Callable[[ImageType, Dict[str, torch.Tensor]], Dict[str, torch.Tensor]]] = None):
+        """
+        Args:
+            config (DataTransformationConfig): Configuration for the Data Transformation Stage.
+            train (bool, optional): Whether the model is in training mode. Defaults to False.
+            target_encoder (Callable, optional): Adds model-specific targets computed from
+                the transformed image and boxes. Defaults to None.
+        """
+        self.config = config
+        self.train = train
+        self.target_encoder = target_encoder
+        self.mean = torch.tensor(config.mean, dtype=torch.float32).view(1, -1, 1, 1)
+        self.std = torch.tensor(config.std, dtype=torch.float32).view(1, -1, 1, 1)
+
+    def _resize(self, images: Sequence[torch.Tensor]) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Resizes all images to `image_size` and stacks them into one float batch.
+        Images of equal size are interpolated together in a single call.
+
+        Returns:
+            The (N, C, H, W) float batch in the 0-1 range and the (N, 2) per-image
+            (x, y) scale factors applied to the boxes.
+        """
+        out_h, out_w = (int(s) for s in self.config.image_size)
+        scales = torch.empty((len(images), 2), dtype=torch.float32)
+
+        groups: Dict[Tuple[int, int], List[int]] = {}
+        for i, image in enumerate(images):
+            groups.setdefault(tuple(image.shape[-2:]), []).append(i)
+
+        batch = None
+        for (h, w), indices in groups.items():
+            group = torch.stack([images[i] for i in indices]).float().div_(255.0)
+            if (h, w) != (out_h, out_w):
+                group = torch.nn.functional.interpolate(group, size=(out_h, out_w), mode="bilinear", align_corners=False, antialias=True)
+            scales[indices] = torch.tensor([out_w / w, out_h / h])
+            if len(groups) == 1:
+                # Common case (e.g. images from a packed store): no scatter copy needed
+                return group, scales
+            if batch is None:
+                batch = torch.empty((len(images), group.shape[1], out_h, out_w), dtype=torch.float32)
+            batch[indices] = group
+        return batch, scales
+
+    def __call__(self, images: Sequence[torch.Tensor], targets: Sequence[Dict[str, torch.Tensor]]) -> Tuple[torch.Tensor, Tuple[Dict[str, torch.Tensor], ...]]:
+        """
+        Executes the batch transformation pipeline.
+
+        Args:
+            images (Sequence[torch.Tensor]): uint8 CHW images of the batch.
+            targets (Sequence[Dict[str, torch.Tensor]]): Per-image targets with "boxes".
+
+        Returns:
+            The (N, C, H, W) float image batch and the updated targets.
+        """
+        n = len(images)
+
+        # 0. Resize and conversion to float
+        if self.config.resize:
+            batch, scales = self._resize(images)
+        else:
+            if len({tuple(image.shape) for image in images}) > 1:
+                raise ValueError("Batch mode without resize requires all images in a batch to have the same size.")
+            batch = torch.stack(list(images)).float().div_(255.0)
+            scales = torch.ones((n, 2), dtype=torch.float32)
+        width = batch.shape[-1]
+
+        # 1. Augmentation (Only applied during training): one random draw per sample
+        if self.train and self.config.flip_prob > 0.0:
+            flip_mask = torch.rand(n) < self.config.flip_prob
+            if flip_mask.any():
+                batch[flip_mask] = batch[flip_mask].flip(-1)
+        else:
+            flip_mask = torch.zeros(n, dtype=torch.bool)
+
+        # 2. Normalization
+        if self.config.normalize:
+            batch.sub_(self.mean).div_(self.std)
+
+        # 3. Box updates for the whole batch at once
+        counts = [len(target["boxes"]) for target in targets]
+        boxes = torch.cat([target["boxes"] for target in targets])
+        image_index = torch.repeat_interleave(torch.arange(n), torch.tensor(counts, dtype=torch.int64))
+        boxes = scale_boxes(boxes, scales[image_index])
+        boxes = torch.where(flip_mask[image_index].unsqueeze(1), hflip_boxes(boxes, width), boxes)
+
+        new_targets = []
+        for image, target, image_boxes in zip(batch, targets, boxes.split(counts)):
+            target = dict(target)
+            target["boxes"] = image_boxes
+            if self.target_encoder is not None:
+                target = self.target_encoder(image, target)
+            new_targets.append(target)
+        return batch, tuple(new_targets)
@@ -1,7 +1,82 @@
+import json
+import math
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from PIL import Image
+from src.components.annotation_index import parse_voc_xml
 from src.entity.config_entity import DataValidationConfig
+from src.utils.helpers import save_json
 from src.utils.logging_setup import logger
 
+CACHE_VERSION = 1
+
+
+def _stat(path: str) -> Optional[List[int]]:
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return [st.st_mtime_ns, st.st_size]
+
+
+def validate_sample(root_dir: str, base_id: str) -> Tuple[List[str], List[str]]:
+    """
+    Deep-checks one image/annotation pair: the image decodes completely, the XML parses,
+    and every box is non-degenerate and inside the decoded image.
+
+    Args:
+        root_dir (str): Split directory.
+        base_id (str): File name of the pair without extension.
+
+    Returns:
+        Tuple[List[str], List[str]]: Errors and warnings found for the pair.
+    """
+    errors, warnings = [], []
+    img_path = os.path.join(root_dir, f"{base_id}.jpg")
+    ann_path = os.path.join(root_dir, f"{base_id}.xml")
+
+    size = None
+    if not os.path.exists(img_path):
+        errors.append("image file missing")
+    else:
+        try:
+            with Image.open(img_path) as img:
+                img.load()
+                size = img.size
+        except Exception as e:
+            errors.append(f"image does not decode: {e}")
+
+    if not os.path.exists(ann_path):
+        errors.append("annotation file missing")
+        return errors, warnings
+    try:
+        names, boxes, xml_size, _ = parse_voc_xml(ann_path)
+    except Exception as e:
+        errors.append(f"annotation does not parse: {e}")
+        return errors, warnings
+
+    if not boxes:
+        warnings.append("no objects")
+    if size is not None and xml_size != (0, 0) and tuple(xml_size) != tuple(size):
+        warnings.append(f"annotation size {xml_size[0]}x{xml_size[1]} differs from image size {size[0]}x{size[1]}")
+
+    for name, (xmin, ymin, xmax, ymax) in zip(names, boxes):
+        box = f"'{name}' box [{xmin:g}, {ymin:g}, {xmax:g}, {ymax:g}]"
+        if not all(math.isfinite(v) for v in (xmin, ymin, xmax, ymax)):
+            errors.append(f"{box} has non-finite coordinates")
+        elif xmax <= xmin or ymax <= ymin:
+            errors.append(f"{box} is empty")
+        elif size is not None and (xmin < 0 or ymin < 0 or xmax > size[0] or ymax > size[1]):
+            errors.append(f"{box} lies outside the {size[0]}x{size[1]} image")
+    return errors, warnings
+
+
+def _validate_chunk(root_dir: str, base_ids: List[str]) -> List[Tuple[List[str], List[str]]]:
+    return [validate_sample(root_dir, base_id) for base_id in base_ids]
+
+
 class DataValidation:
     """
     Component to validate the structure and integrity of the ingested dataset.
@@ -14,10 +89,10 @@ class DataValidation:
         Checks if the required split directories and files exist in the dataset folder.
         Returns True if all required files/directories exist, else False.
         """
-        
+
         try:
             validation_status = True
-            
+
             # 1. Check for required splits/files
             logger.info("Checking for required files and directories...")
             for file_or_dir in self.config.required_files:
@@ -26,17 +101,139 @@ class DataValidation:
                     logger.error(f"Validation FAILED: Required file/directory missing: {path_to_check}")
                     validation_status = False
 
-
-            # 2. Save validation status
-            logger.info("Saving validation status...")
-            with open(self.config.status_file, 'w') as f:
-                f.write(f"Validation status: {validation_status}")
-            
             if validation_status:
                 logger.info("Validation PASSED: All required files/directories are present.")
-                
+
             return validation_status
-            
+
         except Exception as e:
             logger.error(f"Error during data validation: {e}", exc_info=True)
-            raise e
\ No newline at end of file
+            raise e
+
+    def _load_cache(self) -> Dict[str, Dict]:
+        if not os.path.exists(self.config.cache_file):
+            return {}
+        try:
+            with open(self.config.cache_file, 'r') as f:
+                cache = json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read validation cache {self.config.cache_file}: {e}")
+            return {}
+        return cache.get("samples", {}) if cache.get("version") == CACHE_VERSION else {}
+
+    def _list_samples(self, root_dir: str) -> List[str]:
+        """Base ids of every .jpg or .xml file in a split, so orphans of either kind are reported."""
+        base_ids = set()
+        with os.scandir(root_dir) as entries:
+            for entry in entries:
+                base_id, ext = os.path.splitext(entry.name)
+                if ext in (".jpg", ".xml") and entry.is_file():
+                    base_ids.add(base_id)
+        return sorted(base_ids)
+
+    def validate_samples(self) -> Dict:
+        """
+        Deep validation of every image/annotation pair in the split directories.
+
+        Pairs are checked by a process pool. Results are cached per pair, keyed on the
+        mtime and size of both files, so a rerun only re-checks new or changed pairs.
+
+        Returns:
+            Dict: Per-split counts and the errors/warnings of every failing pair.
+        """
+        try:
+            cache = self._load_cache()
+            new_cache, splits, errors, warnings = {}, {}, {}, {}
+            for split in self.config.required_files:
+                root_dir = os.path.join(self.config.data_dir, split)
+                if not os.path.isdir(root_dir):
+                    continue
+
+                results, pending = {}, []
+                for base_id in self._list_samples(root_dir):
+                    key = f"{split}/{base_id}"
+                    stat = [_stat(os.path.join(root_dir, f"{base_id}.jpg")), _stat(os.path.join(root_dir, f"{base_id}.xml"))]
+                    cached = cache.get(key)
+                    if cached is not None and cached["stat"] == stat:
+                        results[key] = cached
+                    else:
+                        results[key] = {"stat": stat}
+                        pending.append(base_id)
+
+                logger.info(f"Validating {len(pending)} of {len(results)} samples in {root_dir} ({len(results) - len(pending)} cached)")
+                for base_id, (sample_errors, sample_warnings) in zip(pending, self._run_checks(root_dir, pending)):
+                    results[f"{split}/{base_id}"].update(errors=sample_errors, warnings=sample_warnings)
+
+                invalid = 0
+                for key, result in results.items():
+                    if result["errors"]:
+                        errors[key] = result["errors"]
+                        invalid += 1
+                    if result["warnings"]:
+                        warnings[key] = result["warnings"]
+                new_cache.update(results)
+                splits[split] = {
+                    "samples": len(results),
+                    "validated": len(pending),
+                    "cached": len(results) - len(pending),
+                    "invalid": invalid,
+                    "with_warnings": sum(bool(result["warnings"]) for result in results.values()),
+                }
+                logger.info(f"Split {split}: {invalid} of {len(results)} samples invalid")
+
+            # Only entries of files that still exist are kept
+            save_json(self.config.cache_file, {"version": CACHE_VERSION, "samples": new_cache})
+            return {"splits": splits, "errors": errors, "warnings": warnings}
+
+        except Exception as e:
+            logger.error(f"Error during deep data validation: {e}", exc_info=True)
+            raise e
+
+    def _run_checks(self, root_dir: str, base_ids: List[str]) -> List[Tuple[List[str], List[str]]]:
+        """Runs `validate_sample` over `base_ids`, in a process pool when there is enough work."""
+        if self.config.num_workers <= 1 or len(base_ids) < 2 * self.config.chunk_size:
+            return _validate_chunk(root_dir, base_ids)
+        chunks = [base_ids[i:i + self.config.chunk_size] for i in range(0, len(base_ids), self.config.chunk_size)]
+        with ProcessPoolExecutor(max_workers=self.config.num_workers) as executor:
+            results = executor.map(_validate_chunk, [root_dir] * len(chunks), chunks)
+            return [result for chunk_results in results for result in chunk_results]
+
+    def save_report(self, files_exist: bool, samples: Optional[Dict] = None, duration_s: float = 0.0) -> bool:
+        """
+        Writes the one-line status file and the structured JSON report next to it.
+
+        Args:
+            files_exist (bool): Result of `validate_all_files_exist`.
+            samples (Dict, optional): Result of `validate_samples`, if deep validation ran. Defaults to None.
+            duration_s (float, optional): Time spent validating. Defaults to 0.0.
+
+        Returns:
+            bool: The overall validation status.
+        """
+        validation_status = files_exist and not (samples and samples["errors"])
+        report = {
+            "status": validation_status,
+            "deep": samples is not None,
+            "duration_s": round(duration_s, 3),
+            "required_files": {
+                name: os.path.exists(os.path.join(self.config.data_dir, name)) for name in self.config.required_files
+            },
+        }
+        if samples is not None:
+            report.update(samples)
+
+        logger.info("Saving validation status...")
+        with open(self.config.status_file, 'w') as f:
+            f.write(f"Validation status: {validation_status}")
+        save_json(self.config.report_file, report)
+        return validation_status
+
+    def run(self) -> bool:
+        """Runs the structural checks and, if enabled and the splits exist, the deep validation."""
+        start = time.perf_counter()
+        files_exist = self.validate_all_files_exist()
+        samples = self.validate_samples() if self.config.deep and files_exist else None
+        validation_status = self.save_report(files_exist, samples, time.perf_counter() - start)
+        if samples is not None and samples["errors"]:
+            logger.error(f"Validation FAILED: {len(samples['errors'])} invalid samples, see {self.config.report_file}")
+        return validation_status
@@ -1,23 +1,38 @@
 import torch
 import os
-import xml.etree.ElementTree as ET
-from PIL import Image
+import numpy as np
 from torch.utils.data import Dataset
-from typing import Tuple
+from typing import Optional, Sequence, Tuple
+from src.components.annotation_index import AnnotationIndex
+from src.components.file_indexer import SplitFileIndexer
+from src.components.image_decoders import get_decoder, scale_boxes
+from src.components.image_store import PackedImageStore
+from src.core.box_ops import box_area
 from src.entity.config_entity import DatasetConfig
+from src.utils.instrumentation import instrumentation
 from src.utils.logging_setup import logger
 
 class MyDataset(Dataset):
     """
     Custom Dataset class for loading VOC-formatted data.
-    Handles image loading and XML annotation parsing.
+    Handles image loading; annotations are served from a prebuilt `AnnotationIndex`.
     """
-    def __init__(self, config: DatasetConfig, subset: str = None, transforms=None) -> None:
+    def __init__(self, config: DatasetConfig, subset: str = None, transforms=None,
+                 decode_size: Optional[Sequence[int]] = None) -> None:
         '''
         Initialize the dataset with configuration and optional transforms.
+
+        Args:
+            config (DatasetConfig): Configuration for the dataset.
+            subset (str, optional): One of 'train', 'valid' or 'test'. Defaults to None.
+            transforms (callable, optional): Transformation applied to every sample. Defaults to None.
+            decode_size (Sequence[int], optional): (height, width) the images are resized to by the
+                transforms; reduced-resolution decoders never decode below it. Defaults to None.
         '''
         self.config = config
         self.transforms = transforms
+        self.image_store = None
+        self.decoder = get_decoder(self.config.decoder, decode_size)
 
         subset_dir = None
         if subset == "train":
@@ -29,7 +44,7 @@ class MyDataset(Dataset):
         else:
             raise ValueError(f"Invalid subset: {subset}. Must be one of 'train', 'valid', or 'test'.")
         
-        self.root_dir = os.path.join(self.config.root_dir, subset_dir)
+        self.root_dir = os.path.join(self.config.data_dir, subset_dir)
 
         if not os.path.exists(self.root_dir):
             raise FileNotFoundError(f"Dataset root directory {self.root_dir} does not exist.")
@@ -37,94 +52,101 @@ class MyDataset(Dataset):
         if not os.path.isdir(self.root_dir):
             raise ValueError(f"Dataset root directory {self.root_dir} is not a directory.")
         
-        if not os.listdir(self.root_dir):
-            raise ValueError(f"Dataset root directory {self.root_dir} is empty.")
+        with os.scandir(self.root_dir) as entries:
+            if next(entries, None) is None:
+                raise ValueError(f"Dataset root directory {self.root_dir} is empty.")
         
 
-        # Collect base IDs for image/annotation pairs
-        self.ids = []
-        files = os.listdir(self.config.root_dir)
-        
-        # Collect unique base names by looking for XML files
-        xml_files = [f for f in files if f.endswith(".xml")]
-        
-        for xml_file in xml_files:
-            # Base ID includes the `_jpg.rf.HASH` part as it's common to both files
-            base_id = os.path.splitext(xml_file)[0] 
-            img_path_check = os.path.join(self.root_dir, base_id + '.jpg')
-            
-            if os.path.exists(img_path_check):
-                self.ids.append(base_id)
+        # Collect base IDs for image/annotation pairs, reusing the persisted list if the split is unchanged
+        indexer = SplitFileIndexer(
+            root_dir=self.root_dir,
+            cache_path=os.path.join(self.config.data_dir, f"{os.path.basename(os.path.normpath(self.root_dir))}_{self.config.ids_cache_file}"),
+        )
+        cached_ids = indexer.load_cached()
+        self.ids = cached_ids if cached_ids is not None else indexer.scan()
         
         if not self.ids:
-            logger.warning(f"Warning: No matching image/annotation pairs found in {self.config.root_dir}")
+            logger.warning(f"Warning: No matching image/annotation pairs found in {self.root_dir}")
+
+        # Parse every XML once into flat arrays; later runs reuse the saved index
+        self.annotation_index = AnnotationIndex.load_or_build(
+            root_dir=self.root_dir,
+            ids=self.ids,
+            index_path=os.path.join(self.root_dir, self.config.index_file),
+            class_map=self.config.class_map,
+        )
+
+        # Saved last: the annotation index is written into the split directory and changes its mtime
+        if cached_ids is None:
+            indexer.save(self.ids)
 
     def __len__(self) -> int:
         """Returns the number of samples in the dataset."""
         return len(self.ids)
 
-    def _parse_xml(self, ann_path: str, idx: int) -> Tuple[torch.Tensor, torch.Tensor]:
-        """Parses a VOC XML file to extract bounding boxes and labels."""
-        boxes = []
-        labels = []
-        try:
-            # Parse the XML file
-            logger.info(f"Parsing XML for {ann_path}")
-            tree = ET.parse(ann_path)
-            root = tree.getroot()
-            
-            for obj in root.findall('object'):
-                label_name = obj.find('name').text
-                if label_name in self.config.class_map:
-                    label = self.config.class_map[label_name]
-                    
-                    bbox = obj.find('bndbox')
-                    xmin = int(bbox.find('xmin').text)
-                    ymin = int(bbox.find('ymin').text)
-                    xmax = int(bbox.find('xmax').text)
-                    ymax = int(bbox.find('ymax').text)
-                    
-                    boxes.append([xmin, ymin, xmax, ymax])
-                    labels.append(label)
-        except Exception as e:
-            logger.error(f"Error parsing XML for {ann_path}: {e}")
-            
+    def get_annotation(self, idx: int) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """
+        Returns the (boxes, labels, difficult) of sample `idx` from the annotation index,
+        without opening the image or parsing any XML.
+        """
+        boxes, labels, difficult = self.annotation_index.get(idx)
+
         # Handle the case where an image has NO annotations
-        if not boxes:
-            boxes.append([0, 0, 1, 1])
-            labels.append(0)  # Background label
+        if len(boxes) == 0:
+            return torch.tensor([[0, 0, 1, 1]], dtype=torch.float32), torch.tensor([0], dtype=torch.int64), torch.zeros(1, dtype=torch.bool)
 
-        boxes = torch.tensor(boxes, dtype=torch.float32)
-        labels = torch.tensor(labels, dtype=torch.int64)
-        
-        logger.info(f"Image {idx} has {len(boxes)} objects")
-        return boxes, labels
+        return torch.from_numpy(boxes.copy()), torch.from_numpy(labels.copy()), torch.from_numpy(difficult.copy())
+
+    def use_image_store(self, image_store: PackedImageStore) -> None:
+        """
+        Serves images from a packed, memory-mapped store instead of decoding the JPEG files.
+
+        Args:
+            image_store (PackedImageStore): Store containing every id of this dataset.
+        """
+        missing = [base_id for base_id in self.ids if base_id not in image_store.positions]
+        if missing:
+            raise ValueError(f"Packed image store {image_store.store_prefix} is missing {len(missing)} images of {self.root_dir}.")
+        self.image_store = image_store
+
+    @property
+    def image_sizes(self) -> np.ndarray:
+        """(num_samples, 2) array of original image (width, height) read from the annotations."""
+        return self.annotation_index.sizes
 
     def __getitem__(self, idx: int):
         """Returns a sample from the dataset at the given index."""
         if idx >= len(self.ids):
             raise IndexError(f"Index {idx} is out of range. Dataset has {len(self.ids)} samples.")
-        logger.info(f"Loading sample {idx}")
+        instrumentation.debug_sample(f"Loading sample {idx}")
         base_id = self.ids[idx]
         img_path = os.path.join(self.root_dir, f"{base_id}.jpg")
-        ann_path = os.path.join(self.root_dir, f"{base_id}.xml")
 
-        img = Image.open(img_path).convert("RGB")
-        boxes, labels = self._parse_xml(ann_path, idx)
+        with instrumentation.timer("parse"):
+            boxes, labels, difficult = self.get_annotation(idx)
+        with instrumentation.timer("decode"):
+            if self.image_store is not None:
+                # Zero-copy view of the pre-resized image
+                img, orig_size = self.image_store.get(base_id)
+            else:
+                img, orig_size = self.decoder.decode(img_path)
+            # Boxes follow the actually stored / decoded size
+            boxes = scale_boxes(boxes, img, orig_size)
         
         target = {}
         target["boxes"] = boxes
         target["labels"] = labels
         target["image_id"] = torch.tensor([idx])
-        target["area"] = (boxes[:, 3] - boxes[:, 1]) * (boxes[:, 2] - boxes[:, 0])
+        target["area"] = box_area(boxes)
         target["iscrowd"] = torch.zeros((len(boxes),), dtype=torch.int64)
+        target["difficult"] = difficult
         
-        logger.info(f"Sample {idx} loaded with {len(boxes)} objects")
         # Apply transforms
         if self.transforms:
-            logger.info(f"Applying transforms to sample {idx}")
-            img, target = self.transforms(img, target)
+            with instrumentation.timer("transform"):
+                img, target = self.transforms(img, target)
 
-        logger.info(f"Sample {idx} transformed")
+        instrumentation.count("samples")
+        instrumentation.count("objects", len(boxes))
+        instrumentation.debug_sample(f"Sample {idx} loaded with {len(boxes)} objects")
         return img, target
-
@@ -0,0 +1,96 @@
+import json
+import os
+from typing import Dict, List, Optional, Tuple
+from src.utils.logging_setup import logger
+
+
+class SplitFileIndexer:
+    """
+    Finds the image/annotation pairs of a dataset split in a single `os.scandir` pass.
+
+    `.jpg` and `.xml` names are paired in memory instead of with one `os.path.exists`
+    per file; sub-directories (e.g. a split sharded into `000/`, `001/`, ...) are walked
+    too. The id list is persisted with the mtime of every scanned directory, so later
+    runs skip the scan unless a directory changed.
+    """
+    CACHE_VERSION = 1
+
+    def __init__(self, root_dir: str, cache_path: str):
+        """
+        Args:
+            root_dir (str): Split directory to index.
+            cache_path (str): Where to persist the id list. Must be outside `root_dir`,
+                since writing it would change the directory mtime.
+        """
+        self.root_dir = root_dir
+        self.cache_path = cache_path
+
+    def _scan_dir(self, rel_dir: str) -> Tuple[List[str], List[str]]:
+        """Scans one directory and returns its paired ids and its sub-directories."""
+        images, annotations, subdirs = set(), set(), []
+        with os.scandir(os.path.join(self.root_dir, rel_dir)) as entries:
+            for entry in entries:
+                name = entry.name
+                if name.endswith(".jpg"):
+                    images.add(name[:-4])
+                elif name.endswith(".xml"):
+                    annotations.add(name[:-4])
+                elif entry.is_dir():
+                    subdirs.append(os.path.join(rel_dir, name) if rel_dir else name)
+        # Base ID includes the `_jpg.rf.HASH` part as it's common to both files
+        ids = [os.path.join(rel_dir, base_id) if rel_dir else base_id for base_id in images & annotations]
+        return ids, subdirs
+
+    def scan(self) -> List[str]:
+        """Walks the split and its sub-directories and returns the sorted ids."""
+        ids = []
+        pending = [""]
+        while pending:
+            dir_ids, subdirs = self._scan_dir(pending.pop())
+            ids.extend(dir_ids)
+            pending.extend(subdirs)
+        ids.sort()
+        logger.info(f"Indexed {len(ids)} image/annotation pairs in {self.root_dir}")
+        return ids
+
+    def _dir_mtimes(self, ids: List[str]) -> Dict[str, int]:
+        """mtime of the split directory and of every sub-directory containing samples."""
+        rel_dirs = {""} | {os.path.dirname(base_id) for base_id in ids}
+        return {rel_dir: os.stat(os.path.join(self.root_dir, rel_dir)).st_mtime_ns for rel_dir in rel_dirs}
+
+    def load_cached(self) -> Optional[List[str]]:
+        """Returns the persisted ids, or None if there are none or a directory changed since."""
+        if not os.path.exists(self.cache_path):
+            return None
+        try:
+            with open(self.cache_path, 'r') as f:
+                cache = json.load(f)
+            if cache["version"] != self.CACHE_VERSION or os.path.abspath(self.root_dir) != cache["root_dir"]:
+                return None
+            for rel_dir, mtime_ns in cache["dir_mtimes"].items():
+                if os.stat(os.path.join(self.root_dir, rel_dir)).st_mtime_ns != mtime_ns:
+                    logger.info(f"Directory {os.path.join(self.root_dir, rel_dir)} changed, re-indexing")
+                    return None
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Could not load id cache {self.cache_path}: {e}")
+            return None
+        logger.info(f"Loaded {len(cache['ids'])} ids from {self.cache_path}")
+        return cache["ids"]
+
+    def save(self, ids: List[str]) -> None:
+        """
+        Persists the ids with the current directory mtimes. Call it after anything else
+        that writes into the split directory (e.g. the annotation index).
+        """
+        cache = {
+            "version": self.CACHE_VERSION,
+            "root_dir": os.path.abspath(self.root_dir),
+            "dir_mtimes": self._dir_mtimes(ids),
+            "ids": ids,
+        }
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w') as f:
+            json.dump(cache, f)
+        os.replace(tmp_path, self.cache_path)
+        logger.info(f"Id cache saved to: {self.cache_path}")
@@ -0,0 +1,166 @@
+import io
+import math
+import numpy as np
+import torch
+from PIL import Image
+from torchvision.io import ImageReadMode, decode_image, decode_jpeg
+from typing import Optional, Sequence, Tuple, Union
+from src.core import box_ops
+from src.utils.logging_setup import logger
+
+ImageSource = Union[str, bytes]
+
+# DCT-domain scale factors supported by libjpeg (and therefore PIL draft mode and OpenCV)
+REDUCTION_FACTORS = (8, 4, 2, 1)
+
+
+def reduction_factor(orig_size: Tuple[int, int], target_size: Optional[Sequence[int]]) -> int:
+    """
+    Largest JPEG reduction factor whose decoded image still covers `target_size`.
+
+    Args:
+        orig_size (Tuple[int, int]): (width, height) of the encoded image.
+        target_size (Sequence[int], optional): Size the image is resized to afterwards, following
+            torchvision's convention: (height, width), or a single value for the shorter side.
+
+    Returns:
+        int: One of 8, 4, 2 or 1 (1 when `target_size` is None).
+    """
+    if not target_size:
+        return 1
+    orig_w, orig_h = orig_size
+    for factor in REDUCTION_FACTORS:
+        w, h = math.ceil(orig_w / factor), math.ceil(orig_h / factor)
+        if len(target_size) == 1:
+            if min(w, h) >= target_size[0]:
+                return factor
+        elif h >= target_size[0] and w >= target_size[1]:
+            return factor
+    return 1
+
+
+def _open_source(source: ImageSource) -> Image.Image:
+    return Image.open(io.BytesIO(source) if isinstance(source, bytes) else source)
+
+
+class ImageDecoder:
+    """
+    Decodes an image file (path or encoded bytes) into an RGB image.
+
+    Subclasses may decode at a reduced resolution when a `target_size` is given; the
+    decoded image is never smaller than `target_size`. `decode` also returns the
+    original size, so callers can rescale boxes to the actually decoded size.
+    """
+    name = None
+
+    def __init__(self, target_size: Optional[Sequence[int]] = None):
+        """
+        Args:
+            target_size (Sequence[int], optional): Size the image is resized to afterwards,
+                as (height, width). Defaults to None (always decode at full resolution).
+        """
+        self.target_size = list(target_size) if target_size else None
+
+    def decode(self, source: ImageSource) -> Tuple[Union[Image.Image, torch.Tensor], Tuple[int, int]]:
+        """
+        Returns the decoded image (PIL image or CHW uint8 tensor) and the (width, height)
+        of the encoded image.
+        """
+        raise NotImplementedError
+
+
+class PilDecoder(ImageDecoder):
+    """Full-resolution decoding with PIL (the original behaviour)."""
+    name = "pil"
+
+    def decode(self, source: ImageSource) -> Tuple[Image.Image, Tuple[int, int]]:
+        img = _open_source(source).convert("RGB")
+        return img, img.size
+
+
+class PilDraftDecoder(ImageDecoder):
+    """PIL with `Image.draft`, letting libjpeg downscale in the DCT domain while decoding."""
+    name = "pil_draft"
+
+    def decode(self, source: ImageSource) -> Tuple[Image.Image, Tuple[int, int]]:
+        img = _open_source(source)
+        orig_size = img.size
+        factor = reduction_factor(orig_size, self.target_size)
+        if factor > 1:
+            # draft() picks the largest scale s with orig // requested >= s, so request orig // factor
+            img.draft("RGB", (orig_size[0] // factor, orig_size[1] // factor))
+        return img.convert("RGB"), orig_size
+
+
+class TorchvisionDecoder(ImageDecoder):
+    """`torchvision.io.decode_jpeg` straight to a CHW uint8 tensor, at full resolution."""
+    name = "torchvision"
+
+    def decode(self, source: ImageSource) -> Tuple[torch.Tensor, Tuple[int, int]]:
+        if isinstance(source, bytes):
+            data = torch.frombuffer(bytearray(source), dtype=torch.uint8)
+        else:
+            data = torch.from_numpy(np.fromfile(source, dtype=np.uint8))
+        if data[:2].tolist() == [0xFF, 0xD8]:
+            img = decode_jpeg(data, mode=ImageReadMode.RGB)
+        else:
+            img = decode_image(data, mode=ImageReadMode.RGB)
+        h, w = img.shape[-2:]
+        return img, (w, h)
+
+
+class OpenCVDecoder(ImageDecoder):
+    """OpenCV with `IMREAD_REDUCED_COLOR_{2,4,8}` DCT-domain downscaling, to a CHW uint8 tensor."""
+    name = "opencv"
+
+    def decode(self, source: ImageSource) -> Tuple[torch.Tensor, Tuple[int, int]]:
+        import cv2
+
+        # The header read is cheap and gives the original size the boxes refer to
+        with _open_source(source) as header:
+            orig_size = header.size
+        flag = {
+            1: cv2.IMREAD_COLOR,
+            2: cv2.IMREAD_REDUCED_COLOR_2,
+            4: cv2.IMREAD_REDUCED_COLOR_4,
+            8: cv2.IMREAD_REDUCED_COLOR_8,
+        }[reduction_factor(orig_size, self.target_size)]
+
+        if isinstance(source, bytes):
+            array = cv2.imdecode(np.frombuffer(source, dtype=np.uint8), flag)
+        else:
+            array = cv2.imread(source, flag)
+        if array is None:
+            raise ValueError(f"OpenCV could not decode image {source if isinstance(source, str) else '<bytes>'}")
+        array = cv2.cvtColor(array, cv2.COLOR_BGR2RGB)
+        return torch.from_numpy(array).permute(2, 0, 1), orig_size
+
+
+DECODERS = {decoder.name: decoder for decoder in (PilDecoder, PilDraftDecoder, TorchvisionDecoder, OpenCVDecoder)}
+
+
+def get_decoder(name: str, target_size: Optional[Sequence[int]] = None) -> ImageDecoder:
+    """
+    Builds the decode backend `name`.
+
+    Args:
+        name (str): One of "pil", "pil_draft", "torchvision" or "opencv".
+        target_size (Sequence[int], optional): Size the image is resized to afterwards, as
+            (height, width). Reduced-resolution backends never decode below it. Defaults to None.
+
+    Returns:
+        ImageDecoder: The decoder.
+    """
+    if name not in DECODERS:
+        raise ValueError(f"Invalid decoder: {name}. Must be one of {', '.join(repr(n) for n in DECODERS)}.")
+    logger.info(f"Using '{name}' image decoder with target size {target_size}")
+    return DECODERS[name](target_size)
+
+
+def scale_boxes(boxes: torch.Tensor, image: Union[Image.Image, torch.Tensor], orig_size: Tuple[int, int]) -> torch.Tensor:
+    """Rescales boxes given in original-image pixels to the size of the decoded `image`."""
+    w, h = (image.shape[-1], image.shape[-2]) if isinstance(image, torch.Tensor) else image.size
+    orig_w, orig_h = orig_size
+    if (w, h) == (orig_w, orig_h):
+        return boxes
+    return box_ops.scale_boxes(boxes, (w / orig_w, h / orig_h))
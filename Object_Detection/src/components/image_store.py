@@ -0,0 +1,135 @@
+import os
+import numpy as np
+import torch
+from PIL import Image
+from typing import List, Optional, Tuple
+from src.utils.logging_setup import logger
+
+
+class PackedImageStore:
+    """
+    Read-only store of pre-resized images packed into one contiguous uint8 file.
+
+    The data file (`<prefix>.u8`) holds every image as HWC uint8 back to back, and the
+    sidecar (`<prefix>.npz`) holds the per-image byte offsets, shapes and original sizes.
+    The data file is memory-mapped, so samples are zero-copy views backed by the page
+    cache, which is shared by all DataLoader workers.
+    """
+    FORMAT_VERSION = 1
+
+    def __init__(self, store_prefix: str):
+        """
+        Args:
+            store_prefix (str): Path of the store without extension.
+        """
+        self.store_prefix = store_prefix
+        with np.load(f"{store_prefix}.npz", allow_pickle=False) as sidecar:
+            self.ids = sidecar["ids"].tolist()
+            self.offsets = sidecar["offsets"]
+            self.shapes = sidecar["shapes"]
+            self.orig_sizes = sidecar["orig_sizes"]
+            self.image_size = tuple(sidecar["image_size"].tolist())
+        self.positions = {base_id: i for i, base_id in enumerate(self.ids)}
+        self._data = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __getstate__(self):
+        # Never pickle the mapping itself: each worker maps the file on first access
+        state = self.__dict__.copy()
+        state["_data"] = None
+        return state
+
+    @property
+    def data(self) -> np.memmap:
+        """Lazily opened copy-on-write mapping of the data file."""
+        if self._data is None:
+            self._data = np.memmap(f"{self.store_prefix}.u8", dtype=np.uint8, mode="c")
+        return self._data
+
+    def get(self, base_id: str) -> Tuple[torch.Tensor, Tuple[int, int]]:
+        """
+        Returns the stored image for `base_id` as a CHW uint8 tensor view, together with
+        the (width, height) of the original image.
+        """
+        pos = self.positions[base_id]
+        h, w, c = self.shapes[pos]
+        start = self.offsets[pos]
+        array = self.data[start:start + h * w * c].reshape(h, w, c)
+        orig_w, orig_h = self.orig_sizes[pos]
+        return torch.from_numpy(array).permute(2, 0, 1), (int(orig_w), int(orig_h))
+
+    @classmethod
+    def is_valid(cls, store_prefix: str, ids: List[str], image_size: Optional[Tuple[int, int]]) -> bool:
+        """Checks that a store exists at `store_prefix` and covers `ids` at `image_size`."""
+        if not (os.path.exists(f"{store_prefix}.npz") and os.path.exists(f"{store_prefix}.u8")):
+            return False
+        try:
+            with np.load(f"{store_prefix}.npz", allow_pickle=False) as sidecar:
+                if int(sidecar["version"]) != cls.FORMAT_VERSION:
+                    return False
+                if tuple(sidecar["image_size"].tolist()) != cls._size_key(image_size):
+                    return False
+                stored_ids = set(sidecar["ids"].tolist())
+        except Exception as e:
+            logger.warning(f"Could not read packed image store {store_prefix}: {e}")
+            return False
+        return stored_ids.issuperset(ids)
+
+    @staticmethod
+    def _size_key(image_size: Optional[Tuple[int, int]]) -> Tuple[int, int]:
+        # (-1, -1) marks a store packed at the native resolution
+        return tuple(int(s) for s in image_size) if image_size else (-1, -1)
+
+    @classmethod
+    def build(cls, root_dir: str, ids: List[str], store_prefix: str, image_size: Optional[Tuple[int, int]] = None) -> "PackedImageStore":
+        """
+        Decodes every image of a split once, resizes it and appends it to the packed store.
+
+        Args:
+            root_dir (str): Split directory containing the `.jpg` files.
+            ids (List[str]): Base ids of the images to pack.
+            store_prefix (str): Path of the store without extension.
+            image_size (Tuple[int, int], optional): Target (height, width). Images are
+                packed at their native resolution when None.
+
+        Returns:
+            PackedImageStore: The store opened for reading.
+        """
+        logger.info(f"Packing {len(ids)} images from {root_dir} into {store_prefix}.u8")
+        os.makedirs(os.path.dirname(store_prefix) or ".", exist_ok=True)
+        tmp_suffix = f".{os.getpid()}.tmp"
+
+        offsets = np.zeros(len(ids), dtype=np.int64)
+        shapes = np.zeros((len(ids), 3), dtype=np.int32)
+        orig_sizes = np.zeros((len(ids), 2), dtype=np.int32)
+        position = 0
+        with open(f"{store_prefix}.u8{tmp_suffix}", "wb") as f:
+            for i, base_id in enumerate(ids):
+                with Image.open(os.path.join(root_dir, f"{base_id}.jpg")) as img:
+                    orig_sizes[i] = img.size
+                    img = img.convert("RGB")
+                    if image_size:
+                        # image_size follows torchvision's (height, width) convention
+                        img = img.resize((int(image_size[1]), int(image_size[0])), Image.BILINEAR)
+                    array = np.asarray(img, dtype=np.uint8)
+                f.write(array.tobytes())
+                offsets[i] = position
+                shapes[i] = array.shape
+                position += array.size
+
+        with open(f"{store_prefix}.npz{tmp_suffix}", "wb") as f:
+            np.savez(
+                f,
+                version=np.array(cls.FORMAT_VERSION),
+                ids=np.array(ids, dtype=np.str_),
+                offsets=offsets,
+                shapes=shapes,
+                orig_sizes=orig_sizes,
+                image_size=np.array(cls._size_key(image_size), dtype=np.int64),
+            )
+        os.replace(f"{store_prefix}.u8{tmp_suffix}", f"{store_prefix}.u8")
+        os.replace(f"{store_prefix}.npz{tmp_suffix}", f"{store_prefix}.npz")
+        logger.info(f"Packed image store written: {position / 2**20:.1f} MiB")
+        return cls(store_prefix)
@@ -0,0 +1,316 @@
+import time
+from contextlib import nullcontext
+from typing import Dict, List, Mapping, Optional, Sequence
+import numpy as np
+import torch
+from torch import nn
+from src.components.model_trainer import BatchPrefetcher
+from src.core.box_ops import box_iou
+from src.entity.config_entity import ModelEvaluationConfig
+from src.utils.device import DEVICE
+from src.utils.distributed import all_gather_object, is_main_process
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+COCO_IOU_THRESHOLDS = np.linspace(0.5, 0.95, 10)
+COCO_RECALL_POINTS = np.linspace(0.0, 1.0, 101)
+VOC07_RECALL_POINTS = np.linspace(0.0, 1.0, 11)
+
+
+def _to_numpy(value, dtype) -> np.ndarray:
+    if hasattr(value, "detach"):
+        value = value.detach().cpu().numpy()
+    return np.asarray(value, dtype=dtype)
+
+
+def precision_envelope(precision: np.ndarray) -> np.ndarray:
+    """Makes precision monotonically non-increasing along axis 0 (max precision at any higher recall)."""
+    return np.maximum.accumulate(precision[::-1], axis=0)[::-1]
+
+
+def interpolated_ap(recall: np.ndarray, precision: np.ndarray, recall_points: np.ndarray) -> np.ndarray:
+    """
+    AP as the mean envelope precision at fixed recall points (VOC07 11-point, COCO 101-point).
+
+    Args:
+        recall (np.ndarray): (N, T) non-decreasing recall of the score-sorted detections.
+        precision (np.ndarray): (N, T) precision of the score-sorted detections.
+        recall_points (np.ndarray): Recall values to sample the envelope at.
+
+    Returns:
+        np.ndarray: (T,) AP per IoU threshold.
+    """
+    envelope = precision_envelope(precision)
+    ap = np.empty(recall.shape[1])
+    for t in range(recall.shape[1]):
+        idx = np.searchsorted(recall[:, t], recall_points, side="left")
+        sampled = np.where(idx < len(envelope), envelope[np.minimum(idx, len(envelope) - 1), t], 0.0)
+        ap[t] = sampled.mean()
+    return ap
+
+
+def area_under_pr(recall: np.ndarray, precision: np.ndarray) -> np.ndarray:
+    """VOC2010+ all-point AP: area under the precision envelope, summed over recall steps."""
+    envelope = precision_envelope(precision)
+    steps = np.diff(recall, axis=0, prepend=0.0)
+    return (steps * envelope).sum(axis=0)
+
+
+class DetectionEvaluator:
+    """
+    Streaming mAP evaluator for VOC07 (11-point), VOC12 (all-point) and COCO-style
+    AP@[.5:.95] (101-point).
+
+    `update` matches the detections of each image against its ground truth right away
+    and keeps only a score and one true-positive flag per IoU threshold per detection,
+    so memory grows with the number of detections, not images. IoUs are computed for all
+    detections against all boxes of an image at once, with pairs of different classes
+    zeroed, and each detection is matched at every threshold in one step. AP is then
+    computed per class from score-sorted cumulative sums.
+
+    COCO AP follows the COCO matching: in score order, a detection takes the
+    best-overlapping unmatched ground truth box of its class above the threshold,
+    preferring boxes not marked `difficult`; detections matched to difficult boxes count
+    neither way. VOC07/VOC12 AP follow the VOC devkit instead: a detection is compared
+    only with the box of its class it overlaps most, matched or not; above IoU 0.5 it is a
+    true positive if that box is still unmatched, a false positive if it was already
+    taken, and ignored if the box is difficult.
+    """
+    def __init__(self, num_classes: int, iou_thresholds: Sequence[float] = COCO_IOU_THRESHOLDS,
+                 max_detections: int = 100, class_names: Optional[Mapping[int, str]] = None):
+        """
+        Args:
+            num_classes (int): Number of classes, including the background class 0.
+            iou_thresholds (Sequence[float], optional): IoU thresholds; must contain 0.5 (and
+                0.75 for AP75). Defaults to 0.5:0.05:0.95.
+            max_detections (int, optional): Highest-scoring detections kept per image. Defaults to 100.
+            class_names (Mapping[int, str], optional): Label to name, for the per-class report. Defaults to None.
+        """
+        self.num_classes = num_classes
+        self.iou_thresholds = np.asarray(iou_thresholds, dtype=np.float64)
+        self.max_detections = max_detections
+        self.class_names = dict(class_names or {})
+        self.reset()
+
+    def reset(self) -> None:
+        self.scores: List[np.ndarray] = []
+        self.labels: List[np.ndarray] = []
+        self.matches: List[np.ndarray] = []  # (N, T) int8: 1 true positive, 0 false positive, -1 ignored
+        self.voc_matches: List[np.ndarray] = []  # (N,) int8, same flags under VOC devkit matching at IoU 0.5
+        self.num_gt = np.zeros(self.num_classes, dtype=np.int64)
+        self.num_images = 0
+
+    def _match_image(self, boxes: np.ndarray, labels: np.ndarray, gt_boxes: np.ndarray,
+                     gt_labels: np.ndarray, gt_difficult: np.ndarray) -> np.ndarray:
+        """(N, T) match flags of the score-sorted detections of one image."""
+        num_thresholds = len(self.iou_thresholds)
+        matches = np.zeros((len(boxes), num_thresholds), dtype=np.int8)
+        if len(boxes) == 0 or len(gt_boxes) == 0:
+            return matches
+
+        # Non-difficult boxes first, so argmax prefers them on equal IoU
+        order = np.argsort(gt_difficult, kind="stable")
+        gt_boxes, gt_labels, gt_difficult = gt_boxes[order], gt_labels[order], gt_difficult[order]
+        ious = box_iou(boxes, gt_boxes)
+        ious[labels[:, None] != gt_labels[None, :]] = 0.0
+
+        # Only detections overlapping some box of their class can match at any threshold
+        candidates = np.flatnonzero(ious.max(axis=1) >= self.iou_thresholds.min())
+        taken = np.zeros((num_thresholds, len(gt_boxes)), dtype=bool)
+        for i in candidates:
+            # (T, G) IoU of this detection with every still unmatched box, per threshold
+            available = np.where(taken | (ious[i][None, :] < self.iou_thresholds[:, None]), -1.0, ious[i][None, :])
+            if not gt_difficult.any():
+                best = available.argmax(axis=1)
+            else:
+                # A match to a non-difficult box wins over any difficult one
+                preferred = np.where(gt_difficult[None, :], -1.0, available)
+                best = np.where(preferred.max(axis=1) >= 0.0, preferred.argmax(axis=1), available.argmax(axis=1))
+            matched = available[np.arange(num_thresholds), best] >= 0.0
+            taken[matched, best[matched]] = True
+            matches[i] = np.where(matched, np.where(gt_difficult[best], -1, 1), 0)
+        return matches
+
+    @staticmethod
+    def _match_image_voc(boxes: np.ndarray, labels: np.ndarray, gt_boxes: np.ndarray,
+                         gt_labels: np.ndarray, gt_difficult: np.ndarray, iou_threshold: float = 0.5) -> np.ndarray:
+        """(N,) match flags of the score-sorted detections of one image under VOC devkit matching."""
+        matches = np.zeros(len(boxes), dtype=np.int8)
+        if len(boxes) == 0 or len(gt_boxes) == 0:
+            return matches
+
+        ious = box_iou(boxes, gt_boxes)
+        ious[labels[:, None] != gt_labels[None, :]] = 0.0
+        # Only the most overlapping box counts, even if another detection already took it
+        best = ious.argmax(axis=1)
+        best_iou = ious[np.arange(len(boxes)), best]
+        detected = np.zeros(len(gt_boxes), dtype=bool)
+        for i in np.flatnonzero(best_iou > iou_threshold):
+            g = best[i]
+            if gt_difficult[g]:
+                matches[i] = -1
+            elif not detected[g]:
+                detected[g] = True
+                matches[i] = 1
+        return matches
+
+    def update(self, predictions: Sequence[Dict], targets: Sequence[Dict]) -> None:
+        """
+        Adds a batch of detections and their ground truth.
+
+        Args:
+            predictions (Sequence[Dict]): Per image "boxes" (N, 4), "scores" (N,) and "labels"
+                (N,), as returned by torchvision detectors in eval mode.
+            targets (Sequence[Dict]): Per image "boxes" (M, 4), "labels" (M,) and optionally
+                "difficult" (M,) ground truth.
+        """
+        for prediction, target in zip(predictions, targets):
+            scores = _to_numpy(prediction["scores"], np.float64).reshape(-1)
+            order = np.argsort(-scores, kind="stable")[:self.max_detections]
+            scores = scores[order]
+            boxes = _to_numpy(prediction["boxes"], np.float64).reshape(-1, 4)[order]
+            labels = _to_numpy(prediction["labels"], np.int64).reshape(-1)[order]
+
+            gt_boxes = _to_numpy(target["boxes"], np.float64).reshape(-1, 4)
+            gt_labels = _to_numpy(target["labels"], np.int64).reshape(-1)
+            gt_difficult = _to_numpy(target["difficult"], bool).reshape(-1) if "difficult" in target else np.zeros(len(gt_labels), dtype=bool)
+
+            self.num_gt += np.bincount(gt_labels[~gt_difficult], minlength=self.num_classes)[:self.num_classes]
+            self.scores.append(scores)
+            self.labels.append(labels)
+            self.matches.append(self._match_image(boxes, labels, gt_boxes, gt_labels, gt_difficult))
+            self.voc_matches.append(self._match_image_voc(boxes, labels, gt_boxes, gt_labels, gt_difficult))
+            self.num_images += 1
+
+    def merge(self, other: "DetectionEvaluator") -> None:
+        """Adds the state of another evaluator, e.g. of another distributed rank."""
+        self.scores.extend(other.scores)
+        self.labels.extend(other.labels)
+        self.matches.extend(other.matches)
+        self.voc_matches.extend(other.voc_matches)
+        self.num_gt += other.num_gt
+        self.num_images += other.num_images
+
+    def _class_pr(self, scores: np.ndarray, matches: np.ndarray, num_gt: int):
+        """Recall and precision (N, T) of one class from its detections' match flags."""
+        order = np.argsort(-scores, kind="stable")
+        matches = matches[order]
+        # Ignored detections repeat the previous row, which changes neither AP definition
+        tp = np.cumsum(matches == 1, axis=0)
+        fp = np.cumsum(matches == 0, axis=0)
+        recall = tp / num_gt
+        precision = tp / np.maximum(tp + fp, 1)
+        return recall, precision
+
+    def compute(self) -> Dict:
+        """
+        Computes AP per class and their means over the classes with ground truth.
+
+        Returns:
+            Dict: "map" (COCO AP@[.5:.95]), "map_50", "map_75", "voc07_map", "voc12_map",
+            and the same per class under "per_class".
+        """
+        t50 = int(np.argmin(np.abs(self.iou_thresholds - 0.5)))
+        t75 = int(np.argmin(np.abs(self.iou_thresholds - 0.75)))
+        scores = np.concatenate(self.scores) if self.scores else np.zeros(0)
+        labels = np.concatenate(self.labels) if self.labels else np.zeros(0, dtype=np.int64)
+        matches = np.concatenate(self.matches) if self.matches else np.zeros((0, len(self.iou_thresholds)), dtype=np.int8)
+        voc_matches = np.concatenate(self.voc_matches)[:, None] if self.voc_matches else np.zeros((0, 1), dtype=np.int8)
+
+        per_class = {}
+        for label in range(1, self.num_classes):
+            if self.num_gt[label] == 0:
+                continue
+            name = self.class_names.get(label, str(label))
+            mask = labels == label
+            if not mask.any():
+                per_class[name] = {"ap": 0.0, "ap_50": 0.0, "ap_75": 0.0, "voc07_ap": 0.0, "voc12_ap": 0.0, "num_gt": int(self.num_gt[label])}
+                continue
+            recall, precision = self._class_pr(scores[mask], matches[mask], self.num_gt[label])
+            coco = interpolated_ap(recall, precision, COCO_RECALL_POINTS)
+            voc_recall, voc_precision = self._class_pr(scores[mask], voc_matches[mask], self.num_gt[label])
+            per_class[name] = {
+                "ap": float(coco.mean()),
+                "ap_50": float(coco[t50]),
+                "ap_75": float(coco[t75]),
+                "voc07_ap": float(interpolated_ap(voc_recall, voc_precision, VOC07_RECALL_POINTS)[0]),
+                "voc12_ap": float(area_under_pr(voc_recall, voc_precision)[0]),
+                "num_gt": int(self.num_gt[label]),
+            }
+
+        def mean(key: str) -> float:
+            return float(np.mean([metrics[key] for metrics in per_class.values()])) if per_class else 0.0
+
+        results = {
+            "map": mean("ap"),
+            "map_50": mean("ap_50"),
+            "map_75": mean("ap_75"),
+            "voc07_map": mean("voc07_ap"),
+            "voc12_map": mean("voc12_ap"),
+            "num_images": self.num_images,
+            "num_detections": int(len(scores)),
+            "per_class": per_class,
+        }
+        logger.info(f"mAP@[.5:.95]={results['map']:.4f} mAP@.5={results['map_50']:.4f} mAP@.75={results['map_75']:.4f} "
+                    f"VOC07={results['voc07_map']:.4f} VOC12={results['voc12_map']:.4f} over {self.num_images} images")
+        return results
+
+
+class ModelEvaluation:
+    """
+    Runs a detector over a data loader and scores its detections with `DetectionEvaluator`.
+    Under distributed training every rank evaluates its shard of the loader and rank 0
+    merges the results.
+    """
+    def __init__(self, config: ModelEvaluationConfig, model: nn.Module, class_map: Mapping[str, int]):
+        """
+        Args:
+            config (ModelEvaluationConfig): Configuration for the evaluation.
+            model (nn.Module): A torchvision detection model with its trained weights.
+            class_map (Mapping[str, int]): Class name to label, without the background class.
+        """
+        self.config = config
+        if config.mixed_precision not in ("bf16", "none"):
+            raise ValueError(f"Invalid mixed precision: {config.mixed_precision}. Must be one of 'bf16' or 'none'.")
+        self.model = model.to(DEVICE).eval()
+        self.evaluator = DetectionEvaluator(
+            num_classes=len(class_map) + 1,
+            max_detections=config.max_detections,
+            class_names={label: name for name, label in class_map.items()}
+        )
+
+    def evaluate(self, loader) -> Dict:
+        """
+        Evaluates the model on every batch of `loader` and saves the metrics.
+
+        Args:
+            loader: Data loader yielding (images, targets) tuples or `PackedBatch`es.
+
+        Returns:
+            Dict: The metrics of `DetectionEvaluator.compute`.
+        """
+        try:
+            self.evaluator.reset()
+            autocast = torch.autocast(device_type=DEVICE.type, dtype=torch.bfloat16) if self.config.mixed_precision == "bf16" else nullcontext()
+            start = time.perf_counter()
+            with torch.inference_mode(), autocast:
+                for images, targets in BatchPrefetcher(loader):
+                    predictions = self.model(images)
+                    # NumPy has no bfloat16
+                    predictions = [{k: v.float() if v.is_floating_point() else v for k, v in p.items()} for p in predictions]
+                    self.evaluator.update(predictions, targets)
+            inference_s = time.perf_counter() - start
+
+            evaluators = all_gather_object(self.evaluator)
+            if not is_main_process():
+                return {}
+            for evaluator in evaluators[1:]:
+                self.evaluator.merge(evaluator)
+            metrics = self.evaluator.compute()
+            metrics["inference_images_per_s"] = self.evaluator.num_images / inference_s if inference_s > 0 else 0.0
+            save_json(self.config.metrics_file, metrics)
+            return metrics
+
+        except Exception as e:
+            logger.error(f"Error during model evaluation: {e}")
+            raise e
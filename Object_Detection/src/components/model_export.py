@@ -0,0 +1,254 @@
+import inspect
+import os
+import time
+import warnings
+from typing import Dict, List, Sequence
+import torch
+import torch.nn.functional as F
+from torch import nn
+from src.entity.config_entity import ModelExportConfig
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+EXPORT_FORMATS = ("torchscript", "onnx")
+# (height, width) factors of the second input size the exports are checked at
+SECOND_SIZE_SCALE = (0.75, 1.25)
+
+
+def export_torchscript(model: nn.Module, path: str) -> None:
+    """
+    Scripts a torchvision detector and saves it. Scripting keeps the Python control flow, so
+    the saved module takes any number of images of any size, like the eager model.
+    """
+    scripted = torch.jit.script(model.eval())
+    scripted.save(path)
+
+
+def load_torchscript(path: str) -> torch.jit.ScriptModule:
+    # Registers the torchvision ops (nms, box_iou, ...) the scripted code calls
+    import torchvision  # noqa: F401
+
+    return torch.jit.load(path, map_location="cpu").eval()
+
+
+def torchscript_forward(module: torch.jit.ScriptModule, images: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+    """Detections of a scripted detector, which returns (losses, detections) in every mode."""
+    return module(images)[1]
+
+
+def export_onnx(model: nn.Module, sample_image: torch.Tensor, path: str, opset_version: int = 17) -> List[str]:
+    """
+    Traces a torchvision detector on one (3, H, W) image and saves it as ONNX, with the image
+    height and width and the number of detections as dynamic axes.
+
+    The per-image loops of the detector are unrolled while tracing, so the graph takes a
+    single image; `onnx_forward` runs a batch image by image.
+
+    Returns:
+        List[str]: The output names, in the order of the eager model's output dict (which
+            differs between model families).
+    """
+    model = model.eval()
+    with torch.no_grad():
+        output_names = list(model([sample_image])[0].keys())
+    # Newer torch defaults to the dynamo-based exporter, which can't export these models yet
+    kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with warnings.catch_warnings():
+        # The tracer warns about every Python-side shape computation it freezes
+        warnings.simplefilter("ignore")
+        torch.onnx.export(
+            model, ([sample_image],), path,
+            opset_version=opset_version,
+            input_names=["images"],
+            output_names=output_names,
+            dynamic_axes={"images": {1: "height", 2: "width"}, **{name: {0: "detections"} for name in output_names}},
+            **kwargs
+        )
+    return output_names
+
+
+def load_onnx_session(path: str, num_threads: int = 0):
+    """
+    An ONNX Runtime CPU session for an exported detector.
+
+    Args:
+        path (str): The .onnx file.
+        num_threads (int, optional): Intra-op threads, 0 for ONNX Runtime's default. Defaults to 0.
+    """
+    try:
+        import onnxruntime as ort
+    except ImportError as e:
+        raise ImportError("ONNX Runtime inference needs the onnxruntime package: pip install onnxruntime") from e
+
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = num_threads
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    return ort.InferenceSession(path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+def onnx_forward(session, images: Sequence[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+    """Detections of an exported detector for each image, in the eager model's output format."""
+    names = [output.name for output in session.get_outputs()]
+    input_name = session.get_inputs()[0].name
+    outputs = []
+    for image in images:
+        values = session.run(names, {input_name: image.detach().float().contiguous().numpy()})
+        outputs.append({name: torch.from_numpy(value) for name, value in zip(names, values)})
+    return outputs
+
+
+def rescale_image(image: torch.Tensor, scale: Sequence[float]) -> torch.Tensor:
+    """A (3, H, W) image resized by (height, width) factors."""
+    size = [max(round(dim * factor), 1) for dim, factor in zip(image.shape[-2:], scale)]
+    return F.interpolate(image[None], size=size, mode="bilinear", align_corners=False)[0]
+
+
+def compare_detections(reference: Sequence[Dict[str, torch.Tensor]], candidate: Sequence[Dict[str, torch.Tensor]],
+                       box_atol: float, score_atol: float) -> Dict:
+    """
+    Detection-level parity of an exported model with the eager one on the same images.
+
+    Scores are compared sorted, so the comparison is independent of the order of the
+    detections. Every reference detection must then have a candidate detection with the
+    same label, a score within `score_atol` and every box coordinate within `box_atol`.
+    Detections whose score is within `score_atol` of another one, or of the lowest kept
+    score, are left out: which of them survive NMS and the top-k cut depends on rounding,
+    so they legitimately differ between runtimes.
+
+    Returns:
+        Dict: Detections compared and matched, the match rate, the largest score and box
+            differences, and whether anything was compared at all ("validated"); with no
+            detection to compare the match rate is None and parity is not established.
+    """
+    compared = matched = 0
+    max_score_diff = max_box_diff = 0.0
+    for ref, cand in zip(reference, candidate):
+        ref_scores, cand_scores = ref["scores"].float(), cand["scores"].float()
+        n = min(len(ref_scores), len(cand_scores))
+        if n:
+            diff = (ref_scores.sort(descending=True)[0][:n] - cand_scores.sort(descending=True)[0][:n]).abs().max()
+            max_score_diff = max(max_score_diff, diff.item())
+        if not len(ref_scores):
+            continue
+
+        gaps = (ref_scores[:, None] - ref_scores[None, :]).abs()
+        gaps.fill_diagonal_(float("inf"))
+        unambiguous = (gaps.min(dim=1)[0] > score_atol) & (ref_scores > ref_scores.min() + score_atol)
+        for i in unambiguous.nonzero().flatten().tolist():
+            compared += 1
+            candidates = (cand["labels"] == ref["labels"][i]) & ((cand_scores - ref_scores[i]).abs() <= score_atol)
+            if not candidates.any():
+                continue
+            box_diff = (cand["boxes"][candidates].float() - ref["boxes"][i].float()).abs().max(dim=1)[0].min().item()
+            if box_diff <= box_atol:
+                matched += 1
+                max_box_diff = max(max_box_diff, box_diff)
+    return {
+        "compared": compared,
+        "matched": matched,
+        "match_rate": matched / compared if compared else None,
+        "max_score_diff": max_score_diff,
+        "max_box_diff": max_box_diff,
+        "validated": compared > 0,
+    }
+
+
+class ModelExporter:
+    """
+    Exports a trained detector to TorchScript and ONNX and checks each export against the
+    eager model on sample images, at their own size and at a second size, since the ONNX
+    graph is traced at the size of the first image.
+    """
+    def __init__(self, config: ModelExportConfig, model: nn.Module):
+        """
+        Args:
+            config (ModelExportConfig): Configuration for the export.
+            model (nn.Module): A torchvision detection model with its trained weights.
+        """
+        self.config = config
+        for fmt in config.formats:
+            if fmt not in EXPORT_FORMATS:
+                raise ValueError(f"Invalid export format: {fmt}. Must be one of {EXPORT_FORMATS}.")
+        self.model = model.eval()
+
+    def _export(self, fmt: str, sample_image: torch.Tensor) -> str:
+        if fmt == "torchscript":
+            path = str(self.config.torchscript_path)
+            export_torchscript(self.model, path)
+        else:
+            path = str(self.config.onnx_path)
+            export_onnx(self.model, sample_image, path, self.config.opset_version)
+        return path
+
+    def _run(self, fmt: str, path: str, images: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+        if fmt == "torchscript":
+            with torch.inference_mode():
+                return torchscript_forward(load_torchscript(path), images)
+        return onnx_forward(load_onnx_session(path), images)
+
+    def export(self, images: List[torch.Tensor]) -> Dict:
+        """
+        Exports the model in every configured format and validates the exports.
+
+        Args:
+            images (List[torch.Tensor]): Sample (3, H, W) images; the first
+                `config.sample_images` are used.
+
+        Returns:
+            Dict: Per format the file, its size, the export time, the parity reports of
+                `compare_detections` per input size, whether parity holds ("ok") and whether
+                both sizes had detections to compare ("validated"). Also saved to
+                `config.report_file`.
+        """
+        try:
+            images = [image.detach().float().cpu() for image in images[:self.config.sample_images]]
+            sizes = {"sample_size": images, "second_size": [rescale_image(image, SECOND_SIZE_SCALE) for image in images]}
+            with torch.inference_mode():
+                reference = {name: self.model(batch) for name, batch in sizes.items()}
+
+            report: Dict = {"sample_images": len(images), "input_sizes": {name: list(batch[0].shape[-2:]) for name, batch in sizes.items()},
+                            "formats": {}}
+            failed, unvalidated = [], []
+            for fmt in self.config.formats:
+                start = time.perf_counter()
+                path = self._export(fmt, images[0])
+                export_s = time.perf_counter() - start
+                parity = {
+                    name: compare_detections(reference[name], self._run(fmt, path, batch), self.config.box_atol, self.config.score_atol)
+                    for name, batch in sizes.items()
+                }
+                ok = all(
+                    (result["match_rate"] is None or result["match_rate"] >= self.config.min_match_rate)
+                    and result["max_score_diff"] <= self.config.score_atol
+                    for result in parity.values()
+                )
+                validated = all(result["validated"] for result in parity.values())
+                report["formats"][fmt] = {
+                    "path": path,
+                    "size_mb": os.path.getsize(path) / 2**20,
+                    "export_s": export_s,
+                    "parity": parity,
+                    "ok": ok,
+                    "validated": validated,
+                }
+                logger.info(f"Exported {fmt} to {path} in {export_s:.1f}s: " + ", ".join(
+                    f"{name} {result['matched']}/{result['compared']} detections matched, max score diff "
+                    f"{result['max_score_diff']:.2e}, max box diff {result['max_box_diff']:.2e}" for name, result in parity.items()))
+                if not ok:
+                    failed.append(fmt)
+                elif not validated:
+                    unvalidated.append(fmt)
+
+            report["validated"] = not failed and not unvalidated
+            save_json(self.config.report_file, report)
+            if unvalidated:
+                logger.warning(f"Exported {', '.join(unvalidated)} model(s) are NOT validated: the eager model made no "
+                               f"detections that could be compared at one of the input sizes, see {self.config.report_file}")
+            if failed:
+                raise ValueError(f"Exported {', '.join(failed)} model(s) differ from the eager model beyond the tolerances, "
+                                 f"see {self.config.report_file}")
+            return report
+
+        except Exception as e:
+            logger.error(f"Error during model export: {e}")
+            raise e
@@ -0,0 +1,399 @@
+import queue
+import threading
+import time
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import torch
+import torchvision
+import torch.distributed as dist
+from torch import nn
+from torch.distributed.algorithms.join import Join
+from torch.nn.parallel import DistributedDataParallel
+from torch.utils.data import IterableDataset
+from torchvision.models.detection import _utils as det_utils
+from torchvision.models.detection.faster_rcnn import FastRCNNPredictor
+from torchvision.models.detection.ssd import SSDClassificationHead
+from torchvision.models.detection.ssdlite import SSDLiteClassificationHead
+from src.components.ssd_targets import DenseTargetSSD
+from src.entity.config_entity import DistributedConfig, ModelTrainerConfig
+from src.utils.device import DEVICE
+from src.utils.distributed import all_gather_object, barrier, get_distributed_world_size, is_distributed, is_main_process
+from src.utils.helpers import PackedBatch, save_json, unpack_targets, unpad_images
+from src.utils.instrumentation import StageStats
+from src.utils.logging_setup import logger
+
+MODELS = (
+    "fasterrcnn_resnet50_fpn",
+    "fasterrcnn_resnet50_fpn_v2",
+    "fasterrcnn_mobilenet_v3_large_fpn",
+    "fasterrcnn_mobilenet_v3_large_320_fpn",
+    "ssd300_vgg16",
+    "ssdlite320_mobilenet_v3_large",
+)
+
+
+def build_model(name: str, num_classes: int, weights: Optional[str] = None, weights_backbone: Optional[str] = None,
+                image_size: Optional[Tuple[int, int]] = None) -> nn.Module:
+    """
+    Builds a torchvision Faster R-CNN or SSD detector for `num_classes` classes (background included).
+
+    Args:
+        name (str): One of `MODELS`.
+        num_classes (int): Number of classes, including the background class 0.
+        weights (str, optional): Detection weights, e.g. "DEFAULT". The box predictor is
+            replaced to match `num_classes`. Defaults to None (random init).
+        weights_backbone (str, optional): Backbone weights, e.g. "DEFAULT". Defaults to None.
+        image_size (Tuple[int, int], optional): (height, width) the data is already resized
+            to. Faster R-CNN keeps it instead of upscaling to its 800px default. Defaults to None.
+
+    Returns:
+        nn.Module: The model.
+    """
+    if name not in MODELS:
+        raise ValueError(f"Invalid model: {name}. Must be one of {MODELS}.")
+
+    builder = getattr(torchvision.models.detection, name)
+    kwargs: Dict[str, Any] = {"weights": weights, "weights_backbone": weights_backbone}
+    if weights is None:
+        kwargs["num_classes"] = num_classes
+    if name.startswith("fasterrcnn") and image_size is not None:
+        kwargs.update(min_size=min(image_size), max_size=max(image_size))
+    model = builder(**kwargs)
+
+    if weights is not None:
+        # Pretrained heads predict the COCO classes
+        if name.startswith("fasterrcnn"):
+            in_features = model.roi_heads.box_predictor.cls_score.in_features
+            model.roi_heads.box_predictor = FastRCNNPredictor(in_features, num_classes)
+        else:
+            out_channels = det_utils.retrieve_out_channels(model.backbone, model.transform.fixed_size)
+            num_anchors = model.anchor_generator.num_anchors_per_location()
+            if name == "ssd300_vgg16":
+                model.head.classification_head = SSDClassificationHead(out_channels, num_anchors, num_classes)
+            else:
+                norm_layer = partial(nn.BatchNorm2d, eps=0.001, momentum=0.03)
+                model.head.classification_head = SSDLiteClassificationHead(out_channels, num_anchors, num_classes, norm_layer)
+    return model
+
+
+def to_model_inputs(batch, device: torch.device = DEVICE) -> Tuple[List[torch.Tensor], List[Dict[str, torch.Tensor]]]:
+    """
+    Converts a collated batch, either (images, targets) or a `PackedBatch`, into the
+    list-of-images and list-of-target-dicts form torchvision detectors take, on `device`.
+    """
+    if isinstance(batch, PackedBatch):
+        images, targets = unpad_images(batch), unpack_targets(batch)
+    else:
+        images, targets = batch
+    non_blocking = device.type == "cuda"
+    images = [image.to(device, non_blocking=non_blocking) for image in images]
+    targets = [{k: v.to(device, non_blocking=non_blocking) for k, v in target.items()} for target in targets]
+    return images, targets
+
+
+class BatchPrefetcher:
+    """
+    Iterates a data loader in a background thread, converting every batch with
+    `to_model_inputs`, so unpacking and host-to-device copies of the next batches overlap
+    with the forward/backward pass of the current one. Torch ops release the GIL, so the
+    thread runs concurrently with compute.
+    """
+    _END = object()
+
+    def __init__(self, loader, depth: int = 2, device: torch.device = DEVICE):
+        self.loader = loader
+        self.depth = max(depth, 1)
+        self.device = device
+
+    @staticmethod
+    def _put(batches: queue.Queue, item, stop: threading.Event) -> bool:
+        """Blocks until `item` is queued or the consumer has stopped; returns False in the latter case."""
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produce(self, batches: queue.Queue, stop: threading.Event) -> None:
+        try:
+            for batch in self.loader:
+                if not self._put(batches, to_model_inputs(batch, self.device), stop):
+                    return
+        except Exception as e:
+            self._put(batches, e, stop)
+            return
+        self._put(batches, self._END, stop)
+
+    def __iter__(self) -> Iterator[Tuple[List[torch.Tensor], List[Dict[str, torch.Tensor]]]]:
+        batches = queue.Queue(maxsize=self.depth)
+        stop = threading.Event()
+        thread = threading.Thread(target=self._produce, args=(batches, stop), name="batch-prefetch", daemon=True)
+        thread.start()
+        try:
+            while True:
+                item = batches.get()
+                if item is self._END:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            # Also reached when the consumer stops early; unblocks the producer
+            stop.set()
+            while thread.is_alive():
+                try:
+                    batches.get_nowait()
+                except queue.Empty:
+                    thread.join(timeout=0.1)
+
+
+class ModelTrainer:
+    """
+    Training loop for torchvision Faster R-CNN and SSD models.
+
+    Gradients are accumulated over `accumulation_steps` loader batches, so the effective
+    batch size is `accumulation_steps` times the loader batch size. Forward passes run
+    under bfloat16 autocast when `mixed_precision` is "bf16", the model is kept in
+    channels_last memory format when `channels_last` is set, and with `compile` the
+    backbone (the static-shape part of the model) is compiled with `torch.compile`.
+    Batches are prepared by a `BatchPrefetcher` thread while the model computes.
+
+    With `dense_targets`, an SSD model is trained on the targets the data pipeline already
+    matched and encoded (see `SSDTargetEncoder`) instead of matching inside its forward pass.
+
+    Inside an initialized process group the model is wrapped in `DistributedDataParallel`;
+    gradients are only all-reduced on the last batch of every accumulation group (the
+    others run under `no_sync`), only rank 0 saves, and throughput is aggregated over
+    all ranks at the end of every epoch.
+    """
+    PHASES = ("data", "forward", "backward", "optimizer")
+
+    def __init__(self, config: ModelTrainerConfig, model: nn.Module, distributed_config: Optional[DistributedConfig] = None,
+                 dense_targets: bool = False):
+        """
+        Args:
+            config (ModelTrainerConfig): Configuration for the trainer.
+            model (nn.Module): A torchvision detection model, see `build_model`.
+            distributed_config (DistributedConfig, optional): DDP settings, used when a
+                process group is initialized. Defaults to None (DDP defaults).
+            dense_targets (bool, optional): Whether the batches carry dense SSD targets to
+                train on. Defaults to False.
+        """
+        self.config = config
+        if config.mixed_precision not in ("bf16", "none"):
+            raise ValueError(f"Invalid mixed precision: {config.mixed_precision}. Must be one of 'bf16' or 'none'.")
+        if config.accumulation_steps < 1:
+            raise ValueError("accumulation_steps must be at least 1.")
+
+        self.module = model.to(DEVICE)
+        if config.channels_last:
+            # Conv outputs follow the weights' memory format, so the inputs can stay NCHW
+            self.module = self.module.to(memory_format=torch.channels_last)
+        if config.compile:
+            self.module.backbone = torch.compile(self.module.backbone)
+
+        self.dense_targets = dense_targets
+        self.distributed = is_distributed()
+        # The module the training forward runs through (and DDP wraps); the weights stay those of self.module
+        self.model = DenseTargetSSD(self.module) if dense_targets else self.module
+        if self.distributed:
+            ddp_kwargs = {}
+            if distributed_config is not None:
+                ddp_kwargs = dict(
+                    bucket_cap_mb=distributed_config.bucket_cap_mb,
+                    gradient_as_bucket_view=distributed_config.gradient_as_bucket_view,
+                    broadcast_buffers=distributed_config.broadcast_buffers,
+                    find_unused_parameters=distributed_config.find_unused_parameters,
+                )
+            # Broadcasts rank 0's weights, so all ranks start identical
+            self.model = DistributedDataParallel(self.model, device_ids=[DEVICE.index] if DEVICE.type == "cuda" else None, **ddp_kwargs)
+
+        self.params = [p for p in self.module.parameters() if p.requires_grad]
+        self.optimizer = torch.optim.SGD(self.params, lr=config.learning_rate, momentum=config.momentum, weight_decay=config.weight_decay)
+        self.global_step = 0  # optimizer steps
+        self.history: List[Dict[str, float]] = []
+
+    def _autocast(self):
+        if self.config.mixed_precision == "bf16":
+            return torch.autocast(device_type=DEVICE.type, dtype=torch.bfloat16)
+        return nullcontext()
+
+    def _set_lr(self) -> None:
+        """Linear warmup over the first `warmup_steps` optimizer steps."""
+        if self.global_step >= self.config.warmup_steps:
+            scale = 1.0
+        else:
+            scale = (self.global_step + 1) / (self.config.warmup_steps + 1)
+        for group in self.optimizer.param_groups:
+            group["lr"] = self.config.learning_rate * scale
+
+    def _optimizer_step(self) -> None:
+        self._set_lr()
+        self.optimizer.step()
+        self.optimizer.zero_grad(set_to_none=True)
+        self.global_step += 1
+
+    def _flush_gradients(self, pending: int) -> None:
+        """
+        Steps on the gradients of the last, incomplete accumulation group of an epoch, if any.
+
+        Its losses were divided by the full `accumulation_steps`, so the gradients are
+        rescaled to the mean over the batches actually in the group (on all ranks).
+        """
+        if self.distributed:
+            # Those backward passes ran under no_sync, and with uneven inputs the ranks may
+            # disagree on whether a group is left, so every rank takes part in the average
+            total_pending = torch.tensor([pending], dtype=torch.int64)
+            dist.all_reduce(total_pending)
+            pending = total_pending.item()
+            if not pending:
+                return
+            for p in self.params:
+                if p.grad is None:
+                    p.grad = torch.zeros_like(p)
+                dist.all_reduce(p.grad)
+                p.grad.mul_(self.config.accumulation_steps / pending)
+        else:
+            if not pending:
+                return
+            for p in self.params:
+                if p.grad is not None:
+                    p.grad.mul_(self.config.accumulation_steps / pending)
+        self._optimizer_step()
+
+    def _log_progress(self, epoch: int, step: int, images: int, elapsed_s: float, loss: float, stats: Dict[str, StageStats]) -> None:
+        breakdown = " ".join(
+            f"{phase}={stats[phase].total_ns / max(stats[phase].count, 1) / 1e6:.1f}ms" for phase in self.PHASES
+        )
+        logger.info(
+            f"Epoch {epoch} step {step}: loss={loss:.4f} {images / elapsed_s:.1f} images/s{' on rank 0' if self.distributed else ''} "
+            f"| per batch {breakdown} | lr={self.optimizer.param_groups[0]['lr']:.2e}"
+        )
+
+    def train_epoch(self, loader, epoch: int) -> Dict[str, float]:
+        """
+        Trains for one pass over `loader`.
+
+        Args:
+            loader: Data loader yielding (images, targets) tuples or `PackedBatch`es.
+            epoch (int): Epoch number, for logging.
+
+        Returns:
+            Dict[str, float]: Mean loss, images/sec and mean per-batch phase times of the epoch.
+        """
+        self.model.train()
+        self.optimizer.zero_grad(set_to_none=True)
+        stats = {phase: StageStats() for phase in self.PHASES}
+        window = {phase: StageStats() for phase in self.PHASES}
+        total_loss, num_images, window_images, window_loss, pending = 0.0, 0, 0, 0.0, 0
+        step = 0
+        epoch_start = window_start = time.perf_counter()
+
+        # Streaming datasets can give ranks different numbers of batches; Join shadows the
+        # all-reduces of ranks that ran out, instead of deadlocking
+        uneven = self.distributed and isinstance(getattr(loader, "dataset", None), IterableDataset)
+        with Join([self.model]) if uneven else nullcontext():
+            batch_start = time.perf_counter_ns()
+            for images, targets in BatchPrefetcher(loader, self.config.prefetch_batches):
+                t_data = time.perf_counter_ns()
+                pending += 1
+                sync = pending == self.config.accumulation_steps
+                with self.model.no_sync() if self.distributed and not sync else nullcontext():
+                    with self._autocast():
+                        loss_dict = self.model(images, targets)
+                        loss = sum(loss_dict.values())
+                    t_forward = time.perf_counter_ns()
+                    (loss / self.config.accumulation_steps).backward()
+                t_backward = time.perf_counter_ns()
+                if sync:
+                    self._optimizer_step()
+                    pending = 0
+                t_optimizer = time.perf_counter_ns()
+
+                for phase, duration in zip(self.PHASES, (t_data - batch_start, t_forward - t_data, t_backward - t_forward, t_optimizer - t_backward)):
+                    stats[phase].add(duration)
+                    window[phase].add(duration)
+                step += 1
+                loss_value = loss.item()
+                total_loss += loss_value
+                window_loss += loss_value
+                num_images += len(images)
+                window_images += len(images)
+
+                if step % self.config.log_every_n_steps == 0:
+                    now = time.perf_counter()
+                    if is_main_process():
+                        self._log_progress(epoch, step, window_images, now - window_start, window_loss / self.config.log_every_n_steps, window)
+                    window = {phase: StageStats() for phase in self.PHASES}
+                    window_images, window_loss, window_start = 0, 0.0, now
+                batch_start = time.perf_counter_ns()
+
+        self._flush_gradients(pending)
+
+        elapsed = time.perf_counter() - epoch_start
+        summary = {
+            "epoch": epoch,
+            "steps": step,
+            "images": num_images,
+            "loss": total_loss / max(step, 1),
+            "images_per_s": num_images / elapsed if elapsed > 0 else 0.0,
+            "duration_s": elapsed,
+        }
+        summary.update({f"{phase}_ms": stats[phase].total_ns / max(stats[phase].count, 1) / 1e6 for phase in self.PHASES})
+
+        ranks = all_gather_object(summary)
+        if len(ranks) > 1:
+            # The epoch takes as long as its slowest rank
+            duration = max(rank["duration_s"] for rank in ranks)
+            per_rank = [rank["images_per_s"] for rank in ranks]
+            summary = dict(summary, world_size=len(ranks), images=sum(rank["images"] for rank in ranks),
+                           loss=sum(rank["loss"] for rank in ranks) / len(ranks), duration_s=duration,
+                           images_per_s=sum(rank["images"] for rank in ranks) / duration if duration > 0 else 0.0,
+                           rank_images_per_s=per_rank)
+        if is_main_process():
+            logger.info(
+                f"Epoch {epoch} completed: loss={summary['loss']:.4f} {summary['images_per_s']:.1f} images/s in {summary['duration_s']:.1f}s"
+                + (f" over {len(ranks)} ranks (per rank {' '.join(f'{ips:.1f}' for ips in summary['rank_images_per_s'])})" if len(ranks) > 1 else "")
+                + " | " + " ".join(f"{phase}={summary[f'{phase}_ms']:.1f}ms" for phase in self.PHASES)
+            )
+        return summary
+
+    def state_dict(self) -> Dict[str, torch.Tensor]:
+        """Model weights, without the `_orig_mod.` prefix `torch.compile` adds."""
+        return {key.replace("_orig_mod.", ""): value for key, value in self.module.state_dict().items()}
+
+    def train(self, train_loader) -> str:
+        """
+        Trains for `epochs` epochs, saving the weights and the training history after every epoch.
+
+        Args:
+            train_loader: The training data loader.
+
+        Returns:
+            str: Path of the saved model weights.
+        """
+        try:
+            effective = getattr(train_loader, "batch_size", None)
+            logger.info(
+                f"Training on {DEVICE} for {self.config.epochs} epochs: accumulation_steps={self.config.accumulation_steps}"
+                + (f" (effective batch size {effective * self.config.accumulation_steps * get_distributed_world_size()})" if effective else "")
+                + (", dense SSD targets" if self.dense_targets else "")
+                + f", mixed_precision={self.config.mixed_precision}, channels_last={self.config.channels_last}, compile={self.config.compile}"
+                + (f", distributed over {get_distributed_world_size()} ranks" if self.distributed else "")
+            )
+            for epoch in range(1, self.config.epochs + 1):
+                self.history.append(self.train_epoch(train_loader, epoch))
+                if is_main_process():
+                    torch.save(self.state_dict(), self.config.model_path)
+                    save_json(self.config.history_file, {"history": self.history})
+            # Other ranks return only once the weights are saved
+            barrier()
+            logger.info(f"Model saved to {self.config.model_path}")
+            return str(self.config.model_path)
+
+        except Exception as e:
+            logger.error(f"Error during model training: {e}")
+            raise e
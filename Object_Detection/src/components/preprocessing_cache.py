@@ -0,0 +1,115 @@
+import hashlib
+import json
+import os
+import shutil
+from typing import List
+from src.components.image_store import PackedImageStore
+from src.entity.config_entity import DataTransformationConfig, PreprocessingCacheConfig
+from src.utils.logging_setup import logger
+
+
+class PreprocessingCache:
+    """
+    Content-addressed on-disk cache of the deterministic part of `MyTransform`.
+
+    Each entry is a `PackedImageStore` holding the decoded and resized images of one
+    split. Entries are keyed on a hash of the transformation config and the source image
+    fingerprints, so changing `image_size` or any image creates a new entry instead of
+    reusing a stale one. Least recently used entries are evicted to stay within the disk budget.
+    """
+    # Bump when the materialized format or the deterministic transforms change
+    CACHE_VERSION = 1
+    LAST_USED_FILE = "last_used"
+
+    def __init__(self, config: PreprocessingCacheConfig, transformation_config: DataTransformationConfig):
+        """
+        Args:
+            config (PreprocessingCacheConfig): Configuration for the Preprocessing Cache Stage.
+            transformation_config (DataTransformationConfig): Configuration whose deterministic
+                fields (`resize`, `image_size`) are materialized by the cache.
+        """
+        self.config = config
+        self.transformation_config = transformation_config
+
+    @property
+    def image_size(self):
+        return self.transformation_config.image_size if self.transformation_config.resize else None
+
+    def cache_key(self, root_dir: str, ids: List[str]) -> str:
+        """Hashes the transformation config and the (name, size, mtime) of every source image."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps({
+            "version": self.CACHE_VERSION,
+            "resize": bool(self.transformation_config.resize),
+            "image_size": [int(s) for s in self.transformation_config.image_size],
+        }, sort_keys=True).encode())
+        for base_id in ids:
+            st = os.stat(os.path.join(root_dir, f"{base_id}.jpg"))
+            digest.update(f"{base_id}\0{st.st_size}\0{st.st_mtime_ns}\n".encode())
+        return digest.hexdigest()[:32]
+
+    def materialize(self, root_dir: str, ids: List[str]) -> PackedImageStore:
+        """
+        Returns the cache entry for a split, building it on a miss.
+
+        Args:
+            root_dir (str): Split directory containing the `.jpg` files.
+            ids (List[str]): Base ids of the images in the split.
+
+        Returns:
+            PackedImageStore: The pre-resized images of the split.
+        """
+        key = self.cache_key(root_dir, ids)
+        entry_dir = os.path.join(self.config.cache_dir, key)
+        store_prefix = os.path.join(entry_dir, "images")
+
+        if PackedImageStore.is_valid(store_prefix, ids, self.image_size):
+            logger.info(f"Preprocessing cache hit for {root_dir}: {key}")
+            store = PackedImageStore(store_prefix)
+        else:
+            logger.info(f"Preprocessing cache miss for {root_dir}: {key}")
+            store = PackedImageStore.build(root_dir, ids, store_prefix, self.image_size)
+
+        self._touch(entry_dir)
+        self.evict(keep=[key])
+        return store
+
+    def _touch(self, entry_dir: str) -> None:
+        """Records that an entry was just used."""
+        marker = os.path.join(entry_dir, self.LAST_USED_FILE)
+        with open(marker, 'a'):
+            pass
+        os.utime(marker)
+
+    @staticmethod
+    def _entry_size(entry_dir: str) -> int:
+        return sum(entry.stat().st_size for entry in os.scandir(entry_dir) if entry.is_file())
+
+    def evict(self, keep: List[str] = ()) -> None:
+        """
+        Deletes least recently used entries until the cache fits in `max_size_mb`.
+
+        Args:
+            keep (List[str]): Keys of entries that must not be evicted.
+        """
+        entries = []
+        for entry in os.scandir(self.config.cache_dir):
+            if not entry.is_dir():
+                continue
+            marker = os.path.join(entry.path, self.LAST_USED_FILE)
+            last_used = os.path.getmtime(marker) if os.path.exists(marker) else 0.0
+            entries.append((last_used, entry.name, entry.path, self._entry_size(entry.path)))
+
+        budget = self.config.max_size_mb * 2**20
+        total = sum(size for _, _, _, size in entries)
+        for _, key, path, size in sorted(entries):
+            if total <= budget:
+                break
+            if key in keep:
+                continue
+            logger.info(f"Evicting preprocessing cache entry {key} ({size / 2**20:.1f} MiB)")
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+        if total > budget:
+            logger.warning(f"Preprocessing cache uses {total / 2**20:.1f} MiB, above the {self.config.max_size_mb} MiB budget")
@@ -0,0 +1,234 @@
+import copy
+import io
+import time
+import warnings
+from typing import Dict, List, Mapping, Sequence, Tuple
+import numpy as np
+import torch
+from torch import nn
+from src.components.model_evaluation import DetectionEvaluator
+from src.components.model_trainer import to_model_inputs
+from src.entity.config_entity import QuantizationConfig
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+QUANTIZATION_MODES = ("dynamic", "static")
+# Submodules statically quantized by default, per model family: the parts FX can trace on
+# their own. Anchor generation, box decoding, ROI pooling and NMS around them stay in float.
+# ModuleLists are quantized entry by entry.
+STATIC_MODULES = {
+    "fasterrcnn": ["backbone", "rpn.head.conv", "roi_heads.box_head"],
+    "ssd": ["backbone", "head.classification_head.module_list", "head.regression_head.module_list"],
+}
+CPU = torch.device("cpu")
+
+
+def _set_submodule(model: nn.Module, name: str, module: nn.Module) -> None:
+    parent, _, attr = name.rpartition(".")
+    setattr(model.get_submodule(parent) if parent else model, attr, module)
+
+
+def model_size_mb(model: nn.Module) -> float:
+    """Size of the serialized state dict; quantized weights are stored packed, as int8."""
+    buffer = io.BytesIO()
+    torch.save(model.state_dict(), buffer)
+    return buffer.tell() / 2**20
+
+
+def quantize_dynamic(model: nn.Module) -> Tuple[nn.Module, List[str]]:
+    """
+    Dynamic quantization: int8 weights for every `nn.Linear`, with activations quantized on
+    the fly. Only Faster R-CNN's box head and predictor are linear layers; dynamic
+    quantization has no convolution kernels, so it leaves SSD unchanged.
+
+    Returns:
+        The quantized copy of `model` and the names of the quantized modules.
+    """
+    quantized = torch.ao.quantization.quantize_dynamic(copy.deepcopy(model), {nn.Linear}, dtype=torch.qint8)
+    names = [name for name, module in model.named_modules() if isinstance(module, nn.Linear)]
+    return quantized, names
+
+
+def quantize_static(model: nn.Module, module_names: Sequence[str], calibration_batches: Sequence[List[torch.Tensor]],
+                    backend: str) -> Tuple[nn.Module, List[str], Dict[str, str]]:
+    """
+    Static post-training quantization in FX graph mode of the given submodules.
+
+    Each submodule is traced and prepared with observers (convolutions, batch norms and
+    activations are fused first), the whole model then runs on `calibration_batches` so the
+    observers record the activation ranges of real data, and the submodules are converted
+    to int8 kernels. They take and return float tensors, so the detector around them is
+    unchanged. Submodules FX can't trace (data-dependent control flow) stay in float.
+
+    Args:
+        model (nn.Module): The fp32 detector, in eval mode.
+        module_names (Sequence[str]): Dotted names of the submodules to quantize.
+        calibration_batches (Sequence[List[torch.Tensor]]): Batches of images.
+        backend (str): Quantized engine, one of `torch.backends.quantized.supported_engines`.
+
+    Returns:
+        The quantized copy of `model`, the names of the quantized submodules and the reason
+        for every submodule left in float.
+    """
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    if backend not in torch.backends.quantized.supported_engines:
+        raise ValueError(f"Quantized engine {backend} is not available here. Must be one of {torch.backends.quantized.supported_engines}.")
+    torch.backends.quantized.engine = backend
+    model = copy.deepcopy(model).eval()
+
+    names = []
+    for name in module_names:
+        module = model.get_submodule(name)
+        names += [f"{name}.{i}" for i in range(len(module))] if isinstance(module, nn.ModuleList) else [name]
+
+    # Example inputs for tracing: what each submodule gets on the first batch
+    example_inputs: Dict[str, Tuple] = {}
+
+    def record(name: str):
+        def hook(module: nn.Module, args: Tuple) -> None:
+            example_inputs.setdefault(name, args)
+        return hook
+
+    hooks = [model.get_submodule(name).register_forward_pre_hook(record(name)) for name in names]
+    with torch.no_grad():
+        model(calibration_batches[0])
+    for hook in hooks:
+        hook.remove()
+
+    qconfig_mapping = get_default_qconfig_mapping(backend)
+    prepared, skipped = [], {}
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        for name in names:
+            try:
+                _set_submodule(model, name, prepare_fx(model.get_submodule(name), qconfig_mapping, example_inputs[name]))
+                prepared.append(name)
+            except Exception as e:
+                skipped[name] = f"{type(e).__name__}: {e}"
+                logger.warning(f"Leaving {name} in float, it can't be quantized in FX graph mode: {skipped[name]}")
+
+        with torch.no_grad():
+            for images in calibration_batches:
+                model(images)
+        for name in prepared:
+            _set_submodule(model, name, convert_fx(model.get_submodule(name)))
+    return model, prepared, skipped
+
+
+def latency_ms(model: nn.Module, images: Sequence[torch.Tensor]) -> Dict[str, float]:
+    """Per-image latency percentiles at batch size 1, after one warm-up image."""
+    times = []
+    with torch.inference_mode():
+        model([images[0]])
+        for image in images:
+            start = time.perf_counter()
+            model([image])
+            times.append((time.perf_counter() - start) * 1000.0)
+    p50, p95, p99 = np.percentile(times, [50, 95, 99])
+    return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(times))}
+
+
+class ModelQuantization:
+    """
+    Post-training int8 quantization of a trained detector for CPU inference, with a report
+    of mAP, size and latency of the fp32 model and each quantized variant.
+    """
+    def __init__(self, config: QuantizationConfig, model: nn.Module, model_name: str, class_map: Mapping[str, int]):
+        """
+        Args:
+            config (QuantizationConfig): Configuration for the quantization.
+            model (nn.Module): A torchvision detection model with its trained weights.
+            model_name (str): Its name, selecting the default statically quantized submodules.
+            class_map (Mapping[str, int]): Class name to label, without the background class.
+        """
+        self.config = config
+        for mode in config.modes:
+            if mode not in QUANTIZATION_MODES:
+                raise ValueError(f"Invalid quantization mode: {mode}. Must be one of {QUANTIZATION_MODES}.")
+        self.model = model.to(CPU).eval()
+        self.static_modules = config.static_modules or STATIC_MODULES["fasterrcnn" if model_name.startswith("fasterrcnn") else "ssd"]
+        self.class_map = class_map
+
+    def evaluate(self, model: nn.Module, loader) -> Dict:
+        """mAP of `model` on the first `config.eval_batches` batches of `loader` (all if 0)."""
+        evaluator = DetectionEvaluator(num_classes=len(self.class_map) + 1,
+                                       class_names={label: name for name, label in self.class_map.items()})
+        with torch.inference_mode():
+            for i, batch in enumerate(loader):
+                if self.config.eval_batches and i >= self.config.eval_batches:
+                    break
+                images, targets = to_model_inputs(batch, CPU)
+                evaluator.update(model(images), targets)
+        metrics = evaluator.compute()
+        return {key: metrics[key] for key in ("map", "map_50", "map_75", "num_images")}
+
+    def quantize(self, loader) -> Dict:
+        """
+        Quantizes the model in every configured mode, saves the int8 models as TorchScript
+        (servable with the "torchscript" inference backend) and compares them with the fp32
+        model.
+
+        Args:
+            loader: The validation data loader; its first `config.calibration_batches`
+                batches calibrate static quantization and their images time the models.
+
+        Returns:
+            Dict: Per variant ("fp32", "dynamic", "static") the mAP, size, latency and the
+                changes relative to fp32. Also saved to `config.report_file`.
+        """
+        try:
+            calibration_batches = []
+            for batch in loader:
+                calibration_batches.append(to_model_inputs(batch, CPU)[0])
+                if len(calibration_batches) >= self.config.calibration_batches:
+                    break
+            latency_images = [image for images in calibration_batches for image in images][:self.config.latency_images]
+
+            variants: Dict[str, Tuple[nn.Module, Dict]] = {"fp32": (self.model, {})}
+            not_applicable = []
+            for mode in self.config.modes:
+                start = time.perf_counter()
+                if mode == "dynamic":
+                    model, quantized = quantize_dynamic(self.model)
+                    details = {"quantized_modules": quantized}
+                else:
+                    model, quantized, skipped = quantize_static(self.model, self.static_modules, calibration_batches, self.config.backend)
+                    details = {"quantized_modules": quantized, "float_modules": skipped, "calibration_batches": len(calibration_batches)}
+                details["quantization_s"] = time.perf_counter() - start
+                if not quantized:
+                    logger.warning(f"{mode} quantization finds nothing to quantize in this model, skipping it")
+                    not_applicable.append(mode)
+                    continue
+                path = str(self.config.dynamic_model_path if mode == "dynamic" else self.config.static_model_path)
+                torch.jit.script(model).save(path)
+                details["path"] = path
+                variants[mode] = (model, details)
+
+            report: Dict = {"backend": self.config.backend, "threads": torch.get_num_threads(),
+                            "not_applicable": not_applicable, "variants": {}}
+            for name, (model, details) in variants.items():
+                logger.info(f"Evaluating the {name} model")
+                report["variants"][name] = dict(
+                    details,
+                    metrics=self.evaluate(model, loader),
+                    size_mb=model_size_mb(model),
+                    latency_ms=latency_ms(model, latency_images),
+                )
+
+            fp32 = report["variants"]["fp32"]
+            for name, result in report["variants"].items():
+                result["map_change"] = result["metrics"]["map"] - fp32["metrics"]["map"]
+                result["size_ratio"] = result["size_mb"] / fp32["size_mb"]
+                result["speedup_p50"] = fp32["latency_ms"]["p50"] / result["latency_ms"]["p50"]
+                logger.info(f"{name}: mAP {result['metrics']['map']:.4f} ({result['map_change']:+.4f}), "
+                            f"{result['size_mb']:.1f}MB ({result['size_ratio']:.2f}x), latency p50 {result['latency_ms']['p50']:.1f}ms "
+                            f"p95 {result['latency_ms']['p95']:.1f}ms p99 {result['latency_ms']['p99']:.1f}ms ({result['speedup_p50']:.2f}x)")
+
+            save_json(self.config.report_file, report)
+            return report
+
+        except Exception as e:
+            logger.error(f"Error during model quantization: {e}")
+            raise e
@@ -0,0 +1,178 @@
+import os
+import numpy as np
+from PIL import Image
+from torch.utils.data import Sampler
+from typing import Dict, Iterator, List, Optional, Sequence
+from src.components.dataset import MyDataset
+from src.utils.distributed import get_distributed_rank, get_distributed_world_size
+from src.utils.logging_setup import logger
+
+
+def read_image_sizes(dataset: MyDataset) -> np.ndarray:
+    """
+    Returns the (width, height) of every image in the dataset without decoding pixels.
+
+    Sizes come from the annotation index; images whose XML has no <size> element fall
+    back to the JPEG header, which PIL reads without decoding the image data.
+    """
+    sizes = np.array(dataset.image_sizes, dtype=np.int64)
+    missing = np.flatnonzero((sizes <= 0).any(axis=1))
+    if len(missing):
+        logger.info(f"Reading {len(missing)} image sizes from JPEG headers")
+    for i in missing:
+        with Image.open(os.path.join(dataset.root_dir, f"{dataset.ids[i]}.jpg")) as img:
+            sizes[i] = img.size
+    return sizes
+
+
+class AspectRatioGroupedBatchSampler(Sampler[List[int]]):
+    """
+    Batch sampler that only puts images with a similar width/height ratio in the same batch.
+
+    Images are bucketed by aspect ratio using `bin_edges`; every epoch each bucket is
+    shuffled and cut into batches, and the order of all batches is shuffled. This keeps
+    portrait and landscape images apart, which reduces padding when images are batched
+    at (or near) their native size.
+    """
+    def __init__(self, sizes: np.ndarray, batch_size: int, bin_edges: Sequence[float], drop_last: bool = False,
+                 shuffle: bool = True, seed: int = 0, num_replicas: Optional[int] = None, rank: Optional[int] = None,
+                 even_shards: bool = True):
+        """
+        Args:
+            sizes (np.ndarray): (num_samples, 2) image (width, height).
+            batch_size (int): Number of samples per batch.
+            bin_edges (Sequence[float]): Increasing width/height ratios separating the buckets.
+            drop_last (bool, optional): Drop the incomplete last batch of each bucket. Defaults to False.
+            shuffle (bool, optional): Shuffle within buckets and across batches. Defaults to True.
+            seed (int, optional): Base seed, combined with the epoch. Defaults to 0.
+            num_replicas (int, optional): Number of distributed ranks. Every rank makes the same
+                batches and takes every num_replicas-th one. Defaults to the size of the initialized
+                process group, 1 without one.
+            rank (int, optional): Rank of this process. Defaults to its rank in the process group, 0 without one.
+            even_shards (bool, optional): Drop the batches left over after an even split, so every rank
+                runs the same number of steps. Set to False for evaluation, where every batch must be
+                seen once. Defaults to True.
+        """
+        self.sizes = np.asarray(sizes, dtype=np.float64)
+        self.batch_size = batch_size
+        self.drop_last = drop_last
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self.num_replicas = num_replicas if num_replicas is not None else get_distributed_world_size()
+        self.rank = rank if rank is not None else get_distributed_rank()
+        self.even_shards = even_shards
+
+        aspect_ratios = self.sizes[:, 0] / np.maximum(self.sizes[:, 1], 1.0)
+        self.group_ids = np.digitize(aspect_ratios, bin_edges)
+        self.groups = [np.flatnonzero(self.group_ids == g) for g in np.unique(self.group_ids)]
+        logger.info(f"Aspect ratio groups: {[len(g) for g in self.groups]}")
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch used to seed the shuffling."""
+        self.epoch = epoch
+
+    def _make_batches(self, rng: np.random.Generator) -> List[List[int]]:
+        batches = []
+        for group in self.groups:
+            indices = rng.permutation(group) if self.shuffle else group
+            for start in range(0, len(indices), self.batch_size):
+                batch = indices[start:start + self.batch_size]
+                if len(batch) < self.batch_size and self.drop_last:
+                    continue
+                batches.append(batch.tolist())
+        if self.shuffle:
+            order = rng.permutation(len(batches))
+            batches = [batches[i] for i in order]
+        return batches
+
+    def __iter__(self) -> Iterator[List[int]]:
+        rng = np.random.default_rng(self.seed + self.epoch)
+        self.epoch += 1
+        batches = self._make_batches(rng)
+        if self.num_replicas > 1:
+            # Same number of batches on every rank, so DDP steps stay in lockstep
+            stop = len(self) * self.num_replicas if self.even_shards else len(batches)
+            batches = batches[self.rank:stop:self.num_replicas]
+        yield from batches
+
+    def __len__(self) -> int:
+        if self.drop_last:
+            num_batches = sum(len(group) // self.batch_size for group in self.groups)
+        else:
+            num_batches = sum(-(-len(group) // self.batch_size) for group in self.groups)
+        if self.even_shards:
+            return num_batches // self.num_replicas
+        return len(range(self.rank, num_batches, self.num_replicas))
+
+    def padding_fraction(self, batches: List[List[int]]) -> float:
+        """
+        Fraction of padded pixels when every batch is padded to its largest width and height.
+        """
+        padded_pixels, image_pixels = 0.0, 0.0
+        for batch in batches:
+            sizes = self.sizes[batch]
+            padded_pixels += len(batch) * sizes[:, 0].max() * sizes[:, 1].max()
+            image_pixels += (sizes[:, 0] * sizes[:, 1]).sum()
+        return 1.0 - image_pixels / padded_pixels if padded_pixels else 0.0
+
+    def padding_report(self) -> Dict[str, float]:
+        """
+        Compares the padding of one epoch of grouped batches with random batches of the same size.
+        """
+        rng = np.random.default_rng(self.seed)
+        grouped = self.padding_fraction(self._make_batches(rng))
+        order = rng.permutation(len(self.sizes))
+        random_batches = [order[i:i + self.batch_size].tolist() for i in range(0, len(order), self.batch_size)]
+        baseline = self.padding_fraction(random_batches)
+        return {"grouped": grouped, "random": baseline, "saved": baseline - grouped}
+
+
+class ShardedSampler(Sampler[int]):
+    """
+    Rank-aware sampler for distributed training: every rank draws the same permutation
+    of the dataset indices (seeded by the epoch) and takes every num_replicas-th index,
+    so the ranks' shards never overlap. With `even_shards` the tail that does not divide
+    evenly is dropped, so every rank sees the same number of samples (training); without
+    it the shards differ by at most one sample and together cover the whole dataset
+    (evaluation).
+    """
+    def __init__(self, num_samples: int, shuffle: bool = True, seed: int = 0,
+                 num_replicas: Optional[int] = None, rank: Optional[int] = None, even_shards: bool = True):
+        """
+        Args:
+            num_samples (int): Size of the dataset.
+            shuffle (bool, optional): Shuffle the indices every epoch. Defaults to True.
+            seed (int, optional): Base seed, combined with the epoch; must be equal on all ranks. Defaults to 0.
+            num_replicas (int, optional): Number of ranks. Defaults to the size of the initialized
+                process group, 1 without one.
+            rank (int, optional): Rank of this process. Defaults to its rank in the process group, 0 without one.
+            even_shards (bool, optional): Drop the tail so all shards have the same size. Defaults to True.
+        """
+        self.num_samples = num_samples
+        self.shuffle = shuffle
+        self.seed = seed
+        self.epoch = 0
+        self.num_replicas = num_replicas if num_replicas is not None else get_distributed_world_size()
+        self.rank = rank if rank is not None else get_distributed_rank()
+        self.even_shards = even_shards
+        if not 0 <= self.rank < self.num_replicas:
+            raise ValueError(f"Invalid rank {self.rank} for {self.num_replicas} replicas.")
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch used to seed the shuffling."""
+        self.epoch = epoch
+
+    def __iter__(self) -> Iterator[int]:
+        if self.shuffle:
+            indices = np.random.default_rng(self.seed + self.epoch).permutation(self.num_samples)
+        else:
+            indices = np.arange(self.num_samples)
+        self.epoch += 1
+        stop = len(self) * self.num_replicas if self.even_shards else self.num_samples
+        yield from indices[self.rank:stop:self.num_replicas].tolist()
+
+    def __len__(self) -> int:
+        if self.even_shards:
+            return self.num_samples // self.num_replicas
+        return len(range(self.rank, self.num_samples, self.num_replicas))
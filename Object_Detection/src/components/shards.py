@@ -0,0 +1,232 @@
+import hashlib
+import io
+import json
+import os
+import random
+import tarfile
+from typing import Dict, Iterator, List, Tuple
+import torch
+import torch.distributed as dist
+from torch.utils.data import IterableDataset, get_worker_info
+from src.components.annotation_index import parse_voc_xml
+from src.components.image_decoders import ImageDecoder, PilDecoder, scale_boxes
+from src.core.box_ops import box_area
+from src.utils.instrumentation import instrumentation
+from src.utils.logging_setup import logger
+
+SHARD_INDEX_FILE = "index.json"
+
+
+def _source_digest(root_dir: str, ids: List[str], samples_per_shard: int) -> str:
+    """
+    Digest of what the shards are written from: the ids in order, the mtime and size of
+    every image and annotation file, and the shard size.
+    """
+    digest = hashlib.sha256(f"samples_per_shard={samples_per_shard}\n".encode())
+    for base_id in ids:
+        stats = [os.stat(os.path.join(root_dir, f"{base_id}.{ext}")) for ext in ("jpg", "xml")]
+        digest.update(f"{base_id}\t{stats[0].st_mtime_ns}\t{stats[0].st_size}\t{stats[1].st_mtime_ns}\t{stats[1].st_size}\n".encode())
+    return digest.hexdigest()
+
+
+def write_shards(root_dir: str, ids: List[str], shard_dir: str, samples_per_shard: int) -> List[str]:
+    """
+    Packs a split into fixed-size tar shards of `<id>.jpg` / `<id>.xml` pairs, stored
+    consecutively so a shard can be read front to back with sequential I/O.
+    An `index.json` with the shard names and sample counts is written last; shards of an
+    earlier write that the new index does not list are deleted afterwards.
+
+    Args:
+        root_dir (str): Split directory containing the image/annotation pairs.
+        ids (List[str]): Base ids of the samples, in the order they are packed.
+        shard_dir (str): Output directory.
+        samples_per_shard (int): Number of samples per shard.
+
+    Returns:
+        List[str]: Paths of the written shards.
+    """
+    os.makedirs(shard_dir, exist_ok=True)
+    source_digest = _source_digest(root_dir, ids, samples_per_shard)
+    shards, counts = [], []
+    for shard_no, start in enumerate(range(0, len(ids), samples_per_shard)):
+        shard_ids = ids[start:start + samples_per_shard]
+        name = f"shard-{shard_no:06d}.tar"
+        tmp_path = os.path.join(shard_dir, f"{name}.{os.getpid()}.tmp")
+        with tarfile.open(tmp_path, "w") as tar:
+            for base_id in shard_ids:
+                for ext in ("jpg", "xml"):
+                    tar.add(os.path.join(root_dir, f"{base_id}.{ext}"), arcname=f"{base_id}.{ext}", recursive=False)
+        os.replace(tmp_path, os.path.join(shard_dir, name))
+        shards.append(name)
+        counts.append(len(shard_ids))
+
+    with open(os.path.join(shard_dir, SHARD_INDEX_FILE), 'w') as f:
+        json.dump({"shards": shards, "counts": counts, "source_digest": source_digest}, f, indent=4)
+    logger.info(f"Wrote {len(shards)} shards of up to {samples_per_shard} samples to {shard_dir}")
+
+    current = set(shards)
+    stale = [name for name in os.listdir(shard_dir) if name.startswith("shard-") and name.endswith(".tar") and name not in current]
+    for name in stale:
+        os.remove(os.path.join(shard_dir, name))
+    if stale:
+        logger.info(f"Removed {len(stale)} stale shards from {shard_dir}")
+    return [os.path.join(shard_dir, name) for name in shards]
+
+
+def shards_are_valid(shard_dir: str, root_dir: str, ids: List[str], samples_per_shard: int) -> bool:
+    """
+    Checks that `shard_dir` holds a complete set of shards of `samples_per_shard` for
+    exactly `ids`, written from their current files (same mtime and size).
+    """
+    index_path = os.path.join(shard_dir, SHARD_INDEX_FILE)
+    if not os.path.exists(index_path):
+        return False
+    with open(index_path, 'r') as f:
+        index = json.load(f)
+    return index.get("source_digest") == _source_digest(root_dir, ids, samples_per_shard) \
+        and all(os.path.exists(os.path.join(shard_dir, name)) for name in index["shards"])
+
+
+class ShardedVOCDataset(IterableDataset):
+    """
+    Streams VOC samples from tar shards with sequential reads.
+
+    Shards are split without overlap across distributed ranks and DataLoader workers.
+    Shuffling is approximated by shuffling the shard order every epoch and passing the
+    samples through an in-memory shuffle buffer.
+    """
+    def __init__(self, shard_dir: str, class_map: Dict[str, int], transforms=None, shuffle: bool = True,
+                 shuffle_buffer: int = 1000, seed: int = 0, decoder: ImageDecoder = None):
+        """
+        Args:
+            shard_dir (str): Directory written by `write_shards`.
+            class_map (Dict[str, int]): Mapping from class name to label.
+            transforms (callable, optional): Transformation applied to every sample. Defaults to None.
+            shuffle (bool, optional): Shuffle shard order and samples. Defaults to True.
+            shuffle_buffer (int, optional): Number of samples held for shuffling. Defaults to 1000.
+            seed (int, optional): Base seed, combined with the epoch. Defaults to 0.
+            decoder (ImageDecoder, optional): Image decode backend. Defaults to full-resolution PIL.
+        """
+        self.shard_dir = shard_dir
+        self.class_map = class_map
+        self.transforms = transforms
+        self.shuffle = shuffle
+        self.shuffle_buffer = shuffle_buffer
+        self.seed = seed
+        self.decoder = decoder or PilDecoder()
+        self.epoch = 0
+        # Cleared by the data loader when one process reads every shard (export, quantization)
+        self.split_ranks = True
+
+        with open(os.path.join(shard_dir, SHARD_INDEX_FILE), 'r') as f:
+            index = json.load(f)
+        self.shards = index["shards"]
+        self.counts = index["counts"]
+        # Global sample index of the first sample of every shard, used as image_id
+        self.shard_offsets = [sum(self.counts[:i]) for i in range(len(self.counts))]
+
+    def __len__(self) -> int:
+        """Approximate number of samples this rank sees per epoch."""
+        world_size = dist.get_world_size() if self.split_ranks and dist.is_available() and dist.is_initialized() else 1
+        return sum(self.counts) // world_size
+
+    def set_epoch(self, epoch: int) -> None:
+        """Sets the epoch used to seed the shard order and shuffle buffer."""
+        self.epoch = epoch
+
+    def _assigned_shards(self) -> List[int]:
+        """Shard numbers read by this rank and worker; the shard order is the same on every rank."""
+        rank, world_size = 0, 1
+        if self.split_ranks and dist.is_available() and dist.is_initialized():
+            rank, world_size = dist.get_rank(), dist.get_world_size()
+        worker_info = get_worker_info()
+        worker_id, num_workers = (worker_info.id, worker_info.num_workers) if worker_info else (0, 1)
+
+        order = list(range(len(self.shards)))
+        if self.shuffle:
+            random.Random(self.seed + self.epoch).shuffle(order)
+        if len(order) < world_size * num_workers:
+            logger.warning(f"Only {len(order)} shards for {world_size * num_workers} readers; some readers get no data")
+        return order[rank * num_workers + worker_id::world_size * num_workers]
+
+    def _read_shard(self, shard_no: int) -> Iterator[Tuple[int, Dict[str, bytes]]]:
+        """Streams one shard and yields (image_id, {"jpg": bytes, "xml": bytes}) per sample."""
+        path = os.path.join(self.shard_dir, self.shards[shard_no])
+        sample_no = 0
+        current_id, current = None, {}
+        with tarfile.open(path, mode="r|") as tar:
+            for member in tar:
+                if not member.isfile():
+                    continue
+                base_id, ext = member.name.rsplit(".", 1)
+                if base_id != current_id:
+                    current_id, current = base_id, {}
+                current[ext] = tar.extractfile(member).read()
+                if "jpg" in current and "xml" in current:
+                    yield self.shard_offsets[shard_no] + sample_no, current
+                    sample_no += 1
+                    current_id, current = None, {}
+
+    def _decode(self, image_id: int, sample: Dict[str, bytes]):
+        instrumentation.debug_sample(f"Loading sample {image_id}")
+        with instrumentation.timer("parse"):
+            names, boxes, _, difficult = parse_voc_xml(io.BytesIO(sample["xml"]))
+            kept = [(box, self.class_map[name], flag) for name, box, flag in zip(names, boxes, difficult) if name in self.class_map]
+
+            # Handle the case where an image has NO annotations
+            if not kept:
+                kept = [([0, 0, 1, 1], 0, False)]
+        with instrumentation.timer("decode"):
+            img, orig_size = self.decoder.decode(sample["jpg"])
+            # Boxes follow the actually decoded size
+            boxes = scale_boxes(torch.tensor([box for box, _, _ in kept], dtype=torch.float32), img, orig_size)
+
+        target = {}
+        target["boxes"] = boxes
+        target["labels"] = torch.tensor([label for _, label, _ in kept], dtype=torch.int64)
+        target["image_id"] = torch.tensor([image_id])
+        target["area"] = box_area(boxes)
+        target["iscrowd"] = torch.zeros((len(boxes),), dtype=torch.int64)
+        target["difficult"] = torch.tensor([flag for _, _, flag in kept], dtype=torch.bool)
+
+        if self.transforms:
+            with instrumentation.timer("transform"):
+                img, target = self.transforms(img, target)
+
+        instrumentation.count("samples")
+        instrumentation.count("objects", len(boxes))
+        instrumentation.debug_sample(f"Sample {image_id} loaded with {len(boxes)} objects")
+        return img, target
+
+    def __iter__(self):
+        worker_info = get_worker_info()
+        rng = random.Random(self.seed + self.epoch * 1000 + (worker_info.id if worker_info else 0))
+        buffer: List[Tuple[int, Dict[str, bytes]]] = []
+
+        # Raw bytes are buffered; decoding happens only when a sample leaves the buffer
+        for shard_no in self._assigned_shards():
+            for item in self._read_shard(shard_no):
+                if not self.shuffle or self.shuffle_buffer <= 1:
+                    yield self._decode(*item)
+                    continue
+                if len(buffer) < self.shuffle_buffer:
+                    buffer.append(item)
+                    continue
+                pos = rng.randrange(len(buffer))
+                buffer[pos], item = item, buffer[pos]
+                yield self._decode(*item)
+
+        rng.shuffle(buffer)
+        for item in buffer:
+            yield self._decode(*item)
+
+
+def get_sharded_dataset(root_dir: str, ids: List[str], shard_dir: str, class_map: Dict[str, int], samples_per_shard: int,
+                        transforms=None, shuffle: bool = True, shuffle_buffer: int = 1000,
+                        decoder: ImageDecoder = None) -> ShardedVOCDataset:
+    """Opens the shards of a split, writing them first if they are missing or out of date."""
+    if shards_are_valid(shard_dir, root_dir, ids, samples_per_shard):
+        logger.info(f"Using tar shards in {shard_dir}")
+    else:
+        write_shards(root_dir, ids, shard_dir, samples_per_shard)
+    return ShardedVOCDataset(shard_dir, class_map, transforms, shuffle=shuffle, shuffle_buffer=shuffle_buffer, decoder=decoder)
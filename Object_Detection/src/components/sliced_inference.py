@@ -0,0 +1,110 @@
+from typing import Callable, Dict, List, Tuple, Union
+import torch
+from PIL import Image
+from torchvision.transforms import functional as F
+from src.core.box_ops import batched_nms, weighted_box_fusion
+from src.entity.config_entity import SlicedInferenceConfig
+
+MERGE_METHODS = ("nms", "wbf")
+
+
+def _starts(length: int, tile: int, overlap: float) -> List[int]:
+    if length <= tile:
+        return [0]
+    stride = max(1, int(tile * (1.0 - overlap)))
+    starts = list(range(0, length - tile, stride))
+    return starts + [length - tile]
+
+
+def tile_grid(size: Tuple[int, int], tile_size: Tuple[int, int], overlap: float) -> List[Tuple[int, int, int, int]]:
+    """
+    Overlapping tiles covering an image, row by row.
+
+    Neighbouring tiles share `overlap` of the tile size; the last tile of each row and
+    column is aligned to the image border, so every tile has the full tile size unless the
+    image is smaller than a tile.
+
+    Args:
+        size (Tuple[int, int]): (width, height) of the image.
+        tile_size (Tuple[int, int]): (height, width) of the tiles.
+        overlap (float): Fraction of a tile shared with its neighbour, in [0, 1).
+
+    Returns:
+        List[Tuple[int, int, int, int]]: xyxy pixel windows of the tiles.
+    """
+    (width, height), (tile_h, tile_w) = size, tile_size
+    return [(x, y, min(x + tile_w, width), min(y + tile_h, height))
+            for y in _starts(height, tile_h, overlap) for x in _starts(width, tile_w, overlap)]
+
+
+class SlicedInference:
+    """
+    Detection on images much larger than the model input without downscaling them.
+
+    The image is cut into overlapping tiles of the model's native size, the tiles run
+    through the detector `batch_size` at a time, and their detections are shifted to image
+    coordinates and merged with class-aware NMS or weighted box fusion, which removes the
+    duplicates of objects seen by several tiles near the seams.
+
+    Tiles are cut from the decoded image and converted to float one batch at a time, and
+    each tile's detections are thresholded before they are kept, so beyond the decoded
+    image itself memory depends on the tile and batch size, not on the image size.
+    """
+    def __init__(self, config: SlicedInferenceConfig, forward: Callable[[List[torch.Tensor]], List[Dict[str, torch.Tensor]]]):
+        """
+        Args:
+            config (SlicedInferenceConfig): Configuration for sliced inference.
+            forward (Callable): Runs the detector on a list of float (3, H, W) images in [0, 1],
+                returning torchvision-style detections, e.g. `Predictor._forward`.
+        """
+        if config.merge not in MERGE_METHODS:
+            raise ValueError(f"Invalid merge method: {config.merge}. Must be one of {MERGE_METHODS}.")
+        if not 0.0 <= config.overlap < 1.0:
+            raise ValueError(f"Invalid tile overlap: {config.overlap}. Must be in [0, 1).")
+        self.config = config
+        self.forward = forward
+
+    def merge(self, boxes: torch.Tensor, scores: torch.Tensor, labels: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        if self.config.merge == "nms":
+            keep = batched_nms(boxes, scores, labels, self.config.merge_iou_threshold)
+            boxes, scores, labels = boxes[keep], scores[keep], labels[keep]
+        else:
+            boxes, scores, labels = weighted_box_fusion(boxes, scores, labels, self.config.merge_iou_threshold)
+        n = self.config.max_detections
+        return boxes[:n], scores[:n], labels[:n]
+
+    def __call__(self, image: Union[Image.Image, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """
+        Args:
+            image (Union[Image.Image, torch.Tensor]): RGB image, or (3, H, W) tensor, uint8 or
+                float in [0, 1]. Tiles of a PIL image are cropped and converted one by one,
+                without a tensor copy of the whole image.
+
+        Returns:
+            Dict[str, torch.Tensor]: "boxes" (xyxy, image pixels), "scores" and "labels" of
+                the merged detections by decreasing score, "num_tiles" and "num_candidates",
+                the number of tile detections merged.
+        """
+        if isinstance(image, Image.Image):
+            width, height = image.size
+        else:
+            height, width = image.shape[-2:]
+        tiles = tile_grid((width, height), self.config.tile_size, self.config.overlap)
+        boxes, scores, labels = [], [], []
+        for i in range(0, len(tiles), self.config.batch_size):
+            batch = tiles[i:i + self.config.batch_size]
+            if isinstance(image, Image.Image):
+                crops = [F.to_tensor(image.crop(tile)) for tile in batch]
+            else:
+                crops = [image[:, y0:y1, x0:x1] for x0, y0, x1, y1 in batch]
+                if image.dtype == torch.uint8:
+                    crops = [crop.float().div_(255.0) for crop in crops]
+            for (x0, y0, _, _), output in zip(batch, self.forward(crops)):
+                keep = output["scores"] >= self.config.score_threshold
+                boxes.append(output["boxes"][keep].float() + torch.tensor([x0, y0, x0, y0], dtype=torch.float32))
+                scores.append(output["scores"][keep].float())
+                labels.append(output["labels"][keep])
+
+        num_candidates = sum(len(b) for b in boxes)
+        boxes, scores, labels = self.merge(torch.cat(boxes), torch.cat(scores), torch.cat(labels))
+        return {"boxes": boxes, "scores": scores, "labels": labels, "num_tiles": len(tiles), "num_candidates": num_candidates}
@@ -0,0 +1,177 @@
+import os
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Dict, List, Tuple, Union
+import torch
+import torch.nn.functional as F
+from PIL import Image
+from torch import nn
+from src.core.box_ops import DEFAULT_BOX_CODER_WEIGHTS, box_iou, encode_boxes, scale_boxes
+from src.entity.config_entity import SSDTargetsConfig
+from src.utils.logging_setup import logger
+
+
+def dense_targets_enabled(config: SSDTargetsConfig, model_name: str) -> bool:
+    """Whether the data path encodes dense SSD targets for `model_name`."""
+    return config.enabled and model_name.startswith("ssd")
+
+
+@lru_cache(maxsize=None)
+def default_boxes(model_name: str, cache_dir: str) -> Tuple[torch.Tensor, Tuple[int, int]]:
+    """
+    The (A, 4) xyxy default boxes of an SSD model and the (height, width) input size they
+    refer to.
+
+    SSD resizes every image to its fixed input size, so the default boxes only depend on the
+    model, not on the size the data pipeline resizes to. They are computed once with a dummy
+    forward through the backbone and the anchor generator and cached in `cache_dir`.
+    """
+    cache_file = os.path.join(cache_dir, f"default_boxes_{model_name}.pt")
+    if os.path.exists(cache_file):
+        cached = torch.load(cache_file)
+        return cached["boxes"], tuple(cached["image_size"])
+
+    from torchvision.models.detection.image_list import ImageList
+    from src.components.model_trainer import build_model
+
+    model = build_model(model_name, num_classes=2).eval()
+    height, width = model.transform.fixed_size
+    with torch.inference_mode():
+        features = model.backbone(torch.zeros((1, 3, height, width)))
+        if isinstance(features, torch.Tensor):
+            features = OrderedDict([("0", features)])
+        images = ImageList(torch.zeros((1, 3, height, width)), [(height, width)])
+        boxes = model.anchor_generator(images, list(features.values()))[0].contiguous()
+
+    os.makedirs(cache_dir, exist_ok=True)
+    torch.save({"boxes": boxes, "image_size": [height, width]}, cache_file)
+    logger.info(f"Computed {len(boxes)} default boxes of {model_name} and cached them to {cache_file}")
+    return boxes, (height, width)
+
+
+class SSDTargetEncoder:
+    """
+    Matches ground truth boxes to SSD default boxes and encodes the regression targets,
+    as torchvision's SSD does inside its forward pass: every default box takes the ground
+    truth box it overlaps most if the IoU reaches `iou_threshold`, and every ground truth
+    box additionally claims its best default box.
+
+    Runs in the DataLoader workers as the last step of `MyTransform` (or `MyBatchTransform`),
+    adding to each target "cls_targets", the (A,) matched labels with -1 for unmatched default
+    boxes, and "box_targets", the (A, 4) encoded offsets of the matched boxes. Boxes are
+    scaled to the model's input size exactly as its transform does, so ties between equally
+    good default boxes are broken as in torchvision.
+    """
+    def __init__(self, default_boxes: torch.Tensor, input_size: Tuple[int, int], iou_threshold: float = 0.5,
+                 weights: Tuple[float, float, float, float] = DEFAULT_BOX_CODER_WEIGHTS):
+        """
+        Args:
+            default_boxes (torch.Tensor): (A, 4) xyxy default boxes, see `default_boxes`.
+            input_size (Tuple[int, int]): (height, width) the model resizes images to.
+            iou_threshold (float, optional): Minimum IoU of a match. Defaults to 0.5.
+            weights (Tuple[float, float, float, float], optional): Box coder weights. Defaults
+                to those of torchvision's SSD.
+        """
+        self.default_boxes = default_boxes
+        self.input_size = input_size
+        self.iou_threshold = iou_threshold
+        self.weights = weights
+
+    @classmethod
+    def from_config(cls, config: SSDTargetsConfig, model_name: str) -> "SSDTargetEncoder":
+        boxes, input_size = default_boxes(model_name, str(config.root_dir))
+        return cls(boxes, input_size, config.iou_threshold)
+
+    def encode(self, boxes: torch.Tensor, labels: torch.Tensor) -> Tuple[torch.Tensor, torch.Tensor]:
+        """
+        Args:
+            boxes (torch.Tensor): (G, 4) xyxy ground truth boxes at the model's input size.
+            labels (torch.Tensor): (G,) labels.
+
+        Returns:
+            The (A,) class targets (-1 for unmatched) and the (A, 4) box targets (0 for unmatched).
+        """
+        num_anchors = len(self.default_boxes)
+        if len(boxes) == 0:
+            return torch.full((num_anchors,), -1, dtype=torch.int64), torch.zeros((num_anchors, 4), dtype=torch.float32)
+
+        quality = box_iou(boxes, self.default_boxes)  # (G, A)
+        matched_iou, matches = quality.max(dim=0)
+        matches[matched_iou < self.iou_threshold] = -1
+        matches[quality.argmax(dim=1)] = torch.arange(len(boxes))
+
+        matched = matches >= 0
+        cls_targets = torch.where(matched, labels[matches.clamp(min=0)], -1)
+        box_targets = torch.zeros((num_anchors, 4), dtype=torch.float32)
+        box_targets[matched] = encode_boxes(boxes[matches[matched]], self.default_boxes[matched], self.weights)
+        return cls_targets, box_targets
+
+    def __call__(self, image: Union[Image.Image, torch.Tensor], target: Dict[str, torch.Tensor]) -> Dict[str, torch.Tensor]:
+        """Adds the dense targets of the (already resized) `image` to `target`."""
+        if isinstance(image, torch.Tensor):
+            h, w = image.shape[-2:]
+        else:
+            w, h = image.size
+        # Float32 ratios as in GeneralizedRCNNTransform's resize_boxes
+        ratio_h, ratio_w = (torch.tensor(s, dtype=torch.float32) / torch.tensor(s_orig, dtype=torch.float32)
+                            for s, s_orig in zip(self.input_size, (h, w)))
+        boxes = scale_boxes(target["boxes"].float(), torch.stack([ratio_w, ratio_h]))
+        target = dict(target)
+        target["cls_targets"], target["box_targets"] = self.encode(boxes, target["labels"])
+        return target
+
+
+def ssd_loss(head_outputs: Dict[str, torch.Tensor], cls_targets: torch.Tensor, box_targets: torch.Tensor,
+             neg_to_pos_ratio: int) -> Dict[str, torch.Tensor]:
+    """
+    torchvision's SSD loss on dense targets, for the whole batch at once: smooth L1 on the
+    matched default boxes and cross entropy on the positives plus the `neg_to_pos_ratio`
+    hardest negatives per positive, both divided by the number of matches.
+    """
+    bbox_regression, cls_logits = head_outputs["bbox_regression"], head_outputs["cls_logits"]
+    matched = cls_targets >= 0
+    bbox_loss = F.smooth_l1_loss(bbox_regression[matched], box_targets[matched].to(bbox_regression.dtype), reduction="sum")
+
+    gt_classes = cls_targets.clamp(min=0)
+    num_classes = cls_logits.size(-1)
+    cls_loss = F.cross_entropy(cls_logits.reshape(-1, num_classes), gt_classes.reshape(-1), reduction="none").view(gt_classes.size())
+
+    # Hard negative mining
+    positive = gt_classes > 0
+    num_negative = neg_to_pos_ratio * positive.sum(1, keepdim=True)
+    negative_loss = cls_loss.clone()
+    negative_loss[positive] = -float("inf")
+    _, order = negative_loss.sort(1, descending=True)
+    negative = order.sort(1)[1] < num_negative
+
+    num_matched = matched.sum().clamp(min=1)
+    return {
+        "bbox_regression": bbox_loss / num_matched,
+        "classification": (cls_loss[positive].sum() + cls_loss[negative].sum()) / num_matched,
+    }
+
+
+class DenseTargetSSD(nn.Module):
+    """
+    Training forward of a torchvision SSD on targets already encoded by `SSDTargetEncoder`:
+    the backbone and head run as usual, but anchor generation and matching are skipped.
+    Takes and returns the same as the wrapped model in training mode, so the trainer (and
+    DDP) use it in its place.
+    """
+    def __init__(self, model: nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, images: List[torch.Tensor], targets: List[Dict[str, torch.Tensor]]) -> Dict[str, torch.Tensor]:
+        images, _ = self.model.transform(images)
+        features = self.model.backbone(images.tensors)
+        if isinstance(features, torch.Tensor):
+            features = OrderedDict([("0", features)])
+        head_outputs = self.model.head(list(features.values()))
+
+        cls_targets = torch.stack([target["cls_targets"] for target in targets])
+        box_targets = torch.stack([target["box_targets"] for target in targets])
+        if cls_targets.shape[1] != head_outputs["cls_logits"].shape[1]:
+            raise ValueError(f"Targets were encoded for {cls_targets.shape[1]} default boxes, but the model has "
+                             f"{head_outputs['cls_logits'].shape[1]}; were they built for another model?")
+        return ssd_loss(head_outputs, cls_targets, box_targets, self.model.neg_to_pos_ratio)
@@ -0,0 +1,336 @@
+import json
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+import cv2
+import numpy as np
+import torch
+from src.entity.config_entity import VideoInferenceConfig
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+BACKPRESSURE_POLICIES = ("block", "drop_oldest", "drop_newest")
+STAGES = ("decode", "preprocess", "inference", "postprocess")
+# Ends the stream; every stage forwards it to the next one
+END = None
+# How often blocked stages check whether another stage failed
+POLL_S = 0.1
+
+
+class StageStats:
+    """
+    Where a pipeline stage spends its time: working on frames (busy), waiting for input
+    (starved by the stage before it) and waiting for room in its output queue (blocked by
+    the stage after it).
+    """
+    def __init__(self):
+        self.items = 0
+        self.busy_s = 0.0
+        self.wait_in_s = 0.0
+        self.wait_out_s = 0.0
+        self.queue_depths: List[int] = []
+
+    def snapshot(self, wall_s: float) -> Dict[str, float]:
+        return {
+            "items": self.items,
+            "busy_s": self.busy_s,
+            "occupancy": self.busy_s / wall_s if wall_s > 0 else 0.0,
+            "wait_in_s": self.wait_in_s,
+            "wait_out_s": self.wait_out_s,
+            "mean_input_queue_depth": float(np.mean(self.queue_depths)) if self.queue_depths else 0.0,
+        }
+
+
+def preprocess_frame(frame: np.ndarray, target_size: Optional[Sequence[int]] = None) -> Tuple[torch.Tensor, Tuple[int, int]]:
+    """
+    A BGR frame as the float RGB CHW tensor `Predictor.predict_batch` takes, and its
+    (width, height).
+
+    Like the reduced-resolution image decoders, frames are downscaled (keeping the aspect
+    ratio) while they still cover `target_size`, which the model resizes to anyway, so the
+    conversion and the model's own resize work on fewer pixels.
+    """
+    height, width = frame.shape[:2]
+    if target_size:
+        target_h, target_w = (target_size[0], target_size[0]) if len(target_size) == 1 else target_size[:2]
+        scale = max(target_h / height, target_w / width)
+        if scale < 1.0:
+            frame = cv2.resize(frame, (max(1, round(width * scale)), max(1, round(height * scale))), interpolation=cv2.INTER_AREA)
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    return torch.from_numpy(rgb).permute(2, 0, 1).float().div_(255.0), (width, height)
+
+
+def draw_detections(frame: np.ndarray, result: Dict[str, Any]) -> np.ndarray:
+    """Draws the boxes and class names of a `Predictor` result onto a BGR frame, in place."""
+    for box, name, score in zip(result["boxes"], result["classes"], result["scores"]):
+        x0, y0, x1, y1 = (int(round(v)) for v in box)
+        cv2.rectangle(frame, (x0, y0), (x1, y1), (0, 255, 0), 2)
+        cv2.putText(frame, f"{name} {score:.2f}", (x0, max(y0 - 4, 10)), cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 255, 0), 1)
+    return frame
+
+
+class _Stopped(Exception):
+    """Raised in a stage blocked on a queue once another stage has failed."""
+
+
+class VideoInference:
+    """
+    Detection on video files and streams with decoding, preprocessing, batched inference
+    and postprocessing overlapped on threads.
+
+    Each stage runs on its own thread and hands frames to the next one through a bounded
+    queue, so while the model runs on one batch the next frames are already being decoded
+    and converted and the previous results written. OpenCV and torch release the GIL in
+    their kernels, so the stages run concurrently. The bounded queues keep memory flat:
+    when the model falls behind, the queues fill up and the decoder either waits for room
+    ("block", no frame lost, for recorded footage) or drops a frame ("drop_oldest" keeps
+    the newest frames, for live streams; "drop_newest" keeps the queued ones).
+
+    Only every `frame_stride`-th frame is decoded; the others are grabbed from the
+    container without decoding.
+    """
+    def __init__(self, config: VideoInferenceConfig, predict_batch: Callable[[List[Tuple[torch.Tensor, Tuple[int, int]]]], List[Dict[str, Any]]],
+                 target_size: Optional[Sequence[int]] = None):
+        """
+        Args:
+            config (VideoInferenceConfig): Configuration for video inference.
+            predict_batch (Callable): Runs the detector on a list of `preprocess_frame`
+                results, e.g. `Predictor.predict_batch`, returning its results per frame.
+            target_size (Sequence[int], optional): Size the model resizes its inputs to, as
+                (height, width); frames are downscaled towards it. Defaults to None (full size).
+        """
+        if config.backpressure not in BACKPRESSURE_POLICIES:
+            raise ValueError(f"Invalid backpressure policy: {config.backpressure}. Must be one of {BACKPRESSURE_POLICIES}.")
+        if config.frame_stride < 1:
+            raise ValueError(f"Invalid frame stride: {config.frame_stride}. Must be at least 1.")
+        self.config = config
+        self.predict_batch = predict_batch
+        self.target_size = list(target_size) if target_size else None
+
+    def _get(self, q: queue.Queue, stats: StageStats) -> Any:
+        start = time.perf_counter()
+        stats.queue_depths.append(q.qsize())
+        while True:
+            if self._failed.is_set():
+                raise _Stopped()
+            try:
+                item = q.get(timeout=POLL_S)
+                break
+            except queue.Empty:
+                pass
+        stats.wait_in_s += time.perf_counter() - start
+        return item
+
+    def _put(self, q: queue.Queue, item: Any, stats: StageStats) -> None:
+        start = time.perf_counter()
+        while True:
+            if self._failed.is_set():
+                raise _Stopped()
+            try:
+                q.put(item, timeout=POLL_S)
+                break
+            except queue.Full:
+                pass
+        stats.wait_out_s += time.perf_counter() - start
+
+    def _offer(self, q: queue.Queue, item: Any, stats: StageStats) -> None:
+        """Hands a decoded frame on according to the backpressure policy."""
+        if self.config.backpressure == "block":
+            self._put(q, item, stats)
+            return
+        while True:
+            try:
+                q.put_nowait(item)
+                return
+            except queue.Full:
+                pass
+            if self.config.backpressure == "drop_newest":
+                self.counts["dropped"] += 1
+                return
+            try:
+                q.get_nowait()
+                self.counts["dropped"] += 1
+            except queue.Empty:
+                pass
+
+    def _decode(self, capture: cv2.VideoCapture, out_q: queue.Queue, max_frames: Optional[int]) -> None:
+        stats = self.stats["decode"]
+        index = 0
+        while max_frames is None or index < max_frames:
+            start = time.perf_counter()
+            if index % self.config.frame_stride:
+                ok, frame = capture.grab(), None
+            else:
+                ok, frame = capture.read()
+            stats.busy_s += time.perf_counter() - start
+            if not ok:
+                break
+            if frame is None:
+                self.counts["skipped"] += 1
+            else:
+                stats.items += 1
+                self._offer(out_q, (index, frame), stats)
+            index += 1
+        self.counts["read"] = index
+        self._put(out_q, END, stats)
+
+    def _preprocess(self, in_q: queue.Queue, out_q: queue.Queue) -> None:
+        stats = self.stats["preprocess"]
+        while True:
+            item = self._get(in_q, stats)
+            if item is END:
+                break
+            index, frame = item
+            start = time.perf_counter()
+            image, size = preprocess_frame(frame, self.target_size)
+            stats.busy_s += time.perf_counter() - start
+            stats.items += 1
+            # The original frame only travels on if it's annotated
+            self._put(out_q, (index, (image, size), frame if self.config.write_video else None), stats)
+        self._put(out_q, END, stats)
+
+    def _inference(self, in_q: queue.Queue, out_q: queue.Queue) -> None:
+        if self.config.model_threads:
+            # Intra-op threads are set per thread (OpenMP keeps the setting thread-local)
+            torch.set_num_threads(self.config.model_threads)
+        stats = self.stats["inference"]
+        max_wait_s = self.config.max_wait_ms / 1000.0
+        done = False
+        while not done:
+            first = self._get(in_q, stats)
+            if first is END:
+                break
+            batch = [first]
+            deadline = time.perf_counter() + max_wait_s
+            while len(batch) < self.config.batch_size:
+                try:
+                    item = in_q.get(timeout=max(0.0, deadline - time.perf_counter()))
+                except queue.Empty:
+                    break
+                if item is END:
+                    done = True
+                    break
+                batch.append(item)
+            start = time.perf_counter()
+            results = self.predict_batch([sample for _, sample, _ in batch])
+            stats.busy_s += time.perf_counter() - start
+            stats.items += len(batch)
+            self.batch_sizes.append(len(batch))
+            for (index, _, frame), result in zip(batch, results):
+                self._put(out_q, (index, frame, result), stats)
+        self._put(out_q, END, stats)
+
+    def _postprocess(self, in_q: queue.Queue, source_fps: float) -> None:
+        stats = self.stats["postprocess"]
+        writer = None
+        try:
+            with open(self.config.detections_file, "w") as f:
+                while True:
+                    item = self._get(in_q, stats)
+                    if item is END:
+                        break
+                    index, frame, result = item
+                    start = time.perf_counter()
+                    f.write(json.dumps(dict(result, frame=index, time_s=round(index / source_fps, 3))) + "\n")
+                    if frame is not None:
+                        if writer is None:
+                            # Frames left out by the stride are missing from the output, so it plays at the rate kept
+                            writer = cv2.VideoWriter(str(self.config.output_video), cv2.VideoWriter_fourcc(*"mp4v"),
+                                                     source_fps / self.config.frame_stride, (frame.shape[1], frame.shape[0]))
+                        writer.write(draw_detections(frame, result))
+                    stats.busy_s += time.perf_counter() - start
+                    stats.items += 1
+        finally:
+            if writer is not None:
+                writer.release()
+
+    def _stage(self, name: str, target: Callable, *args) -> threading.Thread:
+        def run():
+            try:
+                target(*args)
+            except _Stopped:
+                pass
+            except Exception as e:
+                logger.error(f"Video {name} stage failed: {e}")
+                self.errors.append(e)
+                self._failed.set()
+        return threading.Thread(target=run, name=f"video-{name}", daemon=True)
+
+    def run(self, source: Union[str, int], max_frames: Optional[int] = None) -> Dict:
+        """
+        Runs detection over a video and writes the per-frame detections (JSON lines), the
+        annotated video if `config.write_video`, and a report.
+
+        Args:
+            source (Union[str, int]): Video file, stream URL or camera index, as accepted by
+                `cv2.VideoCapture`.
+            max_frames (int, optional): Stops after this many source frames. Defaults to None
+                (the whole video).
+
+        Returns:
+            Dict: Frames read, skipped by the stride, dropped under backpressure and
+                processed; the achieved processing rate ("fps") and the rate the source was
+                consumed at ("source_fps_achieved"); batch sizes; and per stage its
+                occupancy (busy time over wall time) and waits. The stage with the highest
+                occupancy is the bottleneck. Also saved to `config.report_file`.
+        """
+        try:
+            capture = cv2.VideoCapture(source)
+            if not capture.isOpened():
+                raise ValueError(f"OpenCV could not open video source {source}")
+            source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+            frame_count = int(capture.get(cv2.CAP_PROP_FRAME_COUNT))
+
+            self.stats = {name: StageStats() for name in STAGES}
+            self.counts = {"read": 0, "skipped": 0, "dropped": 0}
+            self.batch_sizes: List[int] = []
+            self.errors: List[Exception] = []
+            self._failed = threading.Event()
+            queues = [queue.Queue(maxsize=self.config.queue_size) for _ in range(3)]
+            threads = [
+                self._stage("decode", self._decode, capture, queues[0], max_frames),
+                self._stage("preprocess", self._preprocess, queues[0], queues[1]),
+                self._stage("inference", self._inference, queues[1], queues[2]),
+                self._stage("postprocess", self._postprocess, queues[2], source_fps),
+            ]
+            start = time.perf_counter()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            wall_s = time.perf_counter() - start
+            capture.release()
+            if self.errors:
+                raise self.errors[0]
+
+            processed = self.stats["postprocess"].items
+            stages = {name: stats.snapshot(wall_s) for name, stats in self.stats.items()}
+            report = {
+                "source": str(source),
+                "source_fps": source_fps,
+                "source_frames": frame_count,
+                "frames_read": self.counts["read"],
+                "frames_skipped": self.counts["skipped"],
+                "frames_dropped": self.counts["dropped"],
+                "frames_processed": processed,
+                "wall_s": wall_s,
+                "fps": processed / wall_s if wall_s > 0 else 0.0,
+                "source_fps_achieved": self.counts["read"] / wall_s if wall_s > 0 else 0.0,
+                "batches": len(self.batch_sizes),
+                "mean_batch_size": float(np.mean(self.batch_sizes)) if self.batch_sizes else 0.0,
+                "bottleneck": max(stages, key=lambda name: stages[name]["occupancy"]),
+                "stages": stages,
+                "config": {"frame_stride": self.config.frame_stride, "batch_size": self.config.batch_size,
+                           "queue_size": self.config.queue_size, "backpressure": self.config.backpressure},
+            }
+            logger.info(f"Processed {processed} of {self.counts['read']} frames in {wall_s:.1f}s ({report['fps']:.1f} fps, "
+                        f"source consumed at {report['source_fps_achieved']:.1f} fps), {self.counts['skipped']} skipped, "
+                        f"{self.counts['dropped']} dropped; occupancy "
+                        + ", ".join(f"{name} {stage['occupancy']:.0%}" for name, stage in stages.items()))
+            save_json(self.config.report_file, report)
+            return report
+
+        except Exception as e:
+            logger.error(f"Error during video inference: {e}")
+            raise e
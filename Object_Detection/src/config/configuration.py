@@ -1,6 +1,6 @@
 import os
 from pathlib import Path
-from src.entity.config_entity import DataIngestionConfig, DataLoaderConfig, DataTransformationConfig, DataValidationConfig, DatasetConfig
+from src.entity.config_entity import DataIngestionConfig, DataLoaderConfig, DataTransformationConfig, DataValidationConfig, DatasetConfig, DistributedConfig, InferenceConfig, InstrumentationConfig, ModelEvaluationConfig, ModelExportConfig, ModelTrainerConfig, PipelineRunnerConfig, PreprocessingCacheConfig, QuantizationConfig, SlicedInferenceConfig, SSDTargetsConfig, VideoInferenceConfig
 from src.constants.constants import CONFIG_FILE_PATH, PARAMS_FILE_PATH
 from src.utils.helpers import create_directory, read_yaml_file
 from src.utils.logging_setup import logger
@@ -18,7 +18,7 @@ class ConfigurationManager(metaclass=SingletonMeta):
         logger.info(f"Data ingestion config: {config}")
         logger.info(f"Data ingestion params: {params}")
 
-        dirs_to_create = [config.download_location]
+        dirs_to_create = [config.download_location, os.path.dirname(config.manifest_file)]
         logger.info(f"Dirs to create: {dirs_to_create}")
         create_directory(dirs_to_create)
         logger.info("Creating data ingestion config")
@@ -28,7 +28,13 @@ class ConfigurationManager(metaclass=SingletonMeta):
             workspace=params.workspace,
             project_name=params.project_name,
             version=params.version,
-            format=params.format
+            format=params.format,
+            api_url=config.api_url,
+            manifest_file=Path(config.manifest_file),
+            chunk_size_mb=params.chunk_size_mb,
+            num_connections=params.num_connections,
+            extract_workers=params.extract_workers,
+            keep_archive=params.keep_archive
         )
         logger.info(f"Data ingestion config created: {data_ingestion_config}")
         return data_ingestion_config
@@ -48,7 +54,12 @@ class ConfigurationManager(metaclass=SingletonMeta):
         data_validation_config = DataValidationConfig(
             data_dir=config.data_dir,
             required_files=params.required_files,
-            status_file=Path(config.status_file)
+            status_file=Path(config.status_file),
+            report_file=Path(config.report_file),
+            cache_file=Path(config.cache_file),
+            deep=params.deep,
+            num_workers=params.num_workers,
+            chunk_size=params.chunk_size
         )
         logger.info(f"Data validation config created: {data_validation_config}")
         return data_validation_config
@@ -56,11 +67,24 @@ class ConfigurationManager(metaclass=SingletonMeta):
     def get_dataset_config(self) -> DatasetConfig:
         logger.info("Getting dataset config")
         config = self.config.dataset
+        params = self.params.dataset
         logger.info(f"Dataset config: {config}")
+        logger.info(f"Dataset params: {params}")
         dataset_config = DatasetConfig(
             data_dir=Path(config.data_dir),
             train_dir=Path(config.train_dir),
-            valid_dir=Path(config.valid_dir)
+            valid_dir=Path(config.valid_dir),
+            # Label 0 is reserved for the background class
+            class_map={name: label for label, name in enumerate(params.classes, start=1)},
+            index_file=config.index_file,
+            ids_cache_file=config.ids_cache_file,
+            image_backend=params.image_backend,
+            decoder=params.decoder,
+            packed_dir=Path(config.packed_dir),
+            mode=params.mode,
+            shard_dir=Path(config.shard_dir),
+            samples_per_shard=params.samples_per_shard,
+            shuffle_buffer=params.shuffle_buffer
         )
         logger.info(f"Dataset config created: {dataset_config}")
         return dataset_config
@@ -72,11 +96,34 @@ class ConfigurationManager(metaclass=SingletonMeta):
         data_transformation_config = DataTransformationConfig(
             resize=params.resize,
             image_size=params.image_size,
-            flip_prob=params.flip_prob
+            flip_prob=params.flip_prob,
+            batch_mode=params.batch_mode,
+            normalize=params.normalize,
+            mean=tuple(params.mean),
+            std=tuple(params.std)
         )
         logger.info(f"Data transformation config created: {data_transformation_config}")
         return data_transformation_config
     
+    def get_preprocessing_cache_config(self) -> PreprocessingCacheConfig:
+        logger.info("Getting preprocessing cache config")
+        config = self.config.preprocessing_cache
+        params = self.params.preprocessing_cache
+        logger.info(f"Preprocessing cache config: {config}")
+        logger.info(f"Preprocessing cache params: {params}")
+
+        dirs_to_create = [config.cache_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        preprocessing_cache_config = PreprocessingCacheConfig(
+            cache_dir=Path(config.cache_dir),
+            enabled=params.enabled,
+            max_size_mb=params.max_size_mb
+        )
+        logger.info(f"Preprocessing cache config created: {preprocessing_cache_config}")
+        return preprocessing_cache_config
+
     def get_data_loader_config(self) -> DataLoaderConfig:
         logger.info("Getting data loader config")
         params = self.params.data_loader
@@ -86,7 +133,249 @@ class ConfigurationManager(metaclass=SingletonMeta):
             valid_batch_size=params.valid_batch_size,
             num_workers=params.num_workers,
             pin_memory=params.pin_memory,
-            drop_last=params.drop_last
+            drop_last=params.drop_last,
+            batch_sampler=params.batch_sampler,
+            aspect_ratio_bins=list(params.aspect_ratio_bins),
+            collate=params.collate
         )
         logger.info(f"Data loader config created: {data_loader_config}")
-        return data_loader_config
\ No newline at end of file
+        return data_loader_config
+
+    def get_instrumentation_config(self) -> InstrumentationConfig:
+        logger.info("Getting instrumentation config")
+        params = self.params.instrumentation
+        logger.info(f"Instrumentation config: {params}")
+        instrumentation_config = InstrumentationConfig(
+            enabled=params.enabled,
+            debug_sample_rate=params.debug_sample_rate
+        )
+        logger.info(f"Instrumentation config created: {instrumentation_config}")
+        return instrumentation_config
+
+    def get_pipeline_runner_config(self) -> PipelineRunnerConfig:
+        logger.info("Getting pipeline runner config")
+        config = self.config.pipeline_runner
+        params = self.params.pipeline_runner
+        logger.info(f"Pipeline runner config: {config}")
+        logger.info(f"Pipeline runner params: {params}")
+
+        dirs_to_create = [os.path.dirname(config.state_file)]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        pipeline_runner_config = PipelineRunnerConfig(
+            state_file=Path(config.state_file),
+            max_workers=params.max_workers
+        )
+        logger.info(f"Pipeline runner config created: {pipeline_runner_config}")
+        return pipeline_runner_config
+
+    def get_model_trainer_config(self) -> ModelTrainerConfig:
+        logger.info("Getting model trainer config")
+        config = self.config.model_trainer
+        params = self.params.model_trainer
+        logger.info(f"Model trainer config: {config}")
+        logger.info(f"Model trainer params: {params}")
+
+        dirs_to_create = [config.root_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        model_trainer_config = ModelTrainerConfig(
+            root_dir=Path(config.root_dir),
+            model_path=Path(config.model_path),
+            history_file=Path(config.history_file),
+            model_name=params.model,
+            weights=params.weights,
+            weights_backbone=params.weights_backbone,
+            epochs=params.epochs,
+            learning_rate=params.learning_rate,
+            momentum=params.momentum,
+            weight_decay=params.weight_decay,
+            warmup_steps=params.warmup_steps,
+            accumulation_steps=params.accumulation_steps,
+            mixed_precision=params.mixed_precision,
+            channels_last=params.channels_last,
+            compile=params.compile,
+            prefetch_batches=params.prefetch_batches,
+            log_every_n_steps=params.log_every_n_steps
+        )
+        logger.info(f"Model trainer config created: {model_trainer_config}")
+        return model_trainer_config
+
+    def get_ssd_targets_config(self) -> SSDTargetsConfig:
+        logger.info("Getting SSD targets config")
+        config = self.config.ssd_targets
+        params = self.params.ssd_targets
+        logger.info(f"SSD targets config: {config}")
+        logger.info(f"SSD targets params: {params}")
+
+        dirs_to_create = [config.root_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        ssd_targets_config = SSDTargetsConfig(
+            root_dir=Path(config.root_dir),
+            enabled=params.enabled,
+            iou_threshold=params.iou_threshold
+        )
+        logger.info(f"SSD targets config created: {ssd_targets_config}")
+        return ssd_targets_config
+
+    def get_distributed_config(self) -> DistributedConfig:
+        logger.info("Getting distributed config")
+        params = self.params.distributed
+        logger.info(f"Distributed config: {params}")
+        distributed_config = DistributedConfig(
+            enabled=params.enabled,
+            backend=params.backend,
+            timeout_s=params.timeout_s,
+            threads_per_rank=params.threads_per_rank,
+            bucket_cap_mb=params.bucket_cap_mb,
+            gradient_as_bucket_view=params.gradient_as_bucket_view,
+            broadcast_buffers=params.broadcast_buffers,
+            find_unused_parameters=params.find_unused_parameters
+        )
+        logger.info(f"Distributed config created: {distributed_config}")
+        return distributed_config
+
+    def get_model_evaluation_config(self) -> ModelEvaluationConfig:
+        logger.info("Getting model evaluation config")
+        config = self.config.model_evaluation
+        params = self.params.model_evaluation
+        logger.info(f"Model evaluation config: {config}")
+        logger.info(f"Model evaluation params: {params}")
+
+        dirs_to_create = [config.root_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        model_evaluation_config = ModelEvaluationConfig(
+            root_dir=Path(config.root_dir),
+            metrics_file=Path(config.metrics_file),
+            max_detections=params.max_detections,
+            mixed_precision=params.mixed_precision
+        )
+        logger.info(f"Model evaluation config created: {model_evaluation_config}")
+        return model_evaluation_config
+
+    def get_model_export_config(self) -> ModelExportConfig:
+        logger.info("Getting model export config")
+        config = self.config.model_export
+        params = self.params.model_export
+        logger.info(f"Model export config: {config}")
+        logger.info(f"Model export params: {params}")
+
+        dirs_to_create = [config.root_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        model_export_config = ModelExportConfig(
+            root_dir=Path(config.root_dir),
+            torchscript_path=Path(config.torchscript_path),
+            onnx_path=Path(config.onnx_path),
+            report_file=Path(config.report_file),
+            formats=list(params.formats),
+            opset_version=params.opset_version,
+            sample_images=params.sample_images,
+            box_atol=params.box_atol,
+            score_atol=params.score_atol,
+            min_match_rate=params.min_match_rate
+        )
+        logger.info(f"Model export config created: {model_export_config}")
+        return model_export_config
+
+    def get_quantization_config(self) -> QuantizationConfig:
+        logger.info("Getting quantization config")
+        config = self.config.quantization
+        params = self.params.quantization
+        logger.info(f"Quantization config: {config}")
+        logger.info(f"Quantization params: {params}")
+
+        dirs_to_create = [config.root_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        quantization_config = QuantizationConfig(
+            root_dir=Path(config.root_dir),
+            dynamic_model_path=Path(config.dynamic_model_path),
+            static_model_path=Path(config.static_model_path),
+            report_file=Path(config.report_file),
+            modes=list(params.modes),
+            backend=params.backend,
+            static_modules=list(params.static_modules or []),
+            calibration_batches=params.calibration_batches,
+            eval_batches=params.eval_batches,
+            latency_images=params.latency_images
+        )
+        logger.info(f"Quantization config created: {quantization_config}")
+        return quantization_config
+
+    def get_inference_config(self) -> InferenceConfig:
+        logger.info("Getting inference config")
+        config = self.config.inference
+        params = self.params.inference
+        logger.info(f"Inference config: {config}")
+        logger.info(f"Inference params: {params}")
+
+        inference_config = InferenceConfig(
+            model_path=Path(config.model_path),
+            host=params.host,
+            port=params.port,
+            max_batch_size=params.max_batch_size,
+            max_wait_ms=params.max_wait_ms,
+            num_workers=params.num_workers,
+            threads_per_worker=params.threads_per_worker,
+            decode_workers=params.decode_workers,
+            decoder=params.decoder,
+            score_threshold=params.score_threshold,
+            mixed_precision=params.mixed_precision,
+            backend=params.backend
+        )
+        logger.info(f"Inference config created: {inference_config}")
+        return inference_config
+
+    def get_sliced_inference_config(self) -> SlicedInferenceConfig:
+        logger.info("Getting sliced inference config")
+        params = self.params.sliced_inference
+        logger.info(f"Sliced inference params: {params}")
+
+        sliced_inference_config = SlicedInferenceConfig(
+            # The size the model is trained at
+            tile_size=tuple(params.tile_size or self.params.data_transformation.image_size),
+            overlap=params.overlap,
+            batch_size=params.batch_size,
+            merge=params.merge,
+            merge_iou_threshold=params.merge_iou_threshold,
+            score_threshold=params.score_threshold,
+            max_detections=params.max_detections
+        )
+        logger.info(f"Sliced inference config created: {sliced_inference_config}")
+        return sliced_inference_config
+
+    def get_video_inference_config(self) -> VideoInferenceConfig:
+        logger.info("Getting video inference config")
+        config = self.config.video_inference
+        params = self.params.video_inference
+        logger.info(f"Video inference config: {config}")
+        logger.info(f"Video inference params: {params}")
+
+        dirs_to_create = [config.root_dir]
+        logger.info(f"Dirs to create: {dirs_to_create}")
+        create_directory(dirs_to_create)
+
+        video_inference_config = VideoInferenceConfig(
+            root_dir=Path(config.root_dir),
+            output_video=Path(config.output_video),
+            detections_file=Path(config.detections_file),
+            report_file=Path(config.report_file),
+            frame_stride=params.frame_stride,
+            batch_size=params.batch_size,
+            max_wait_ms=params.max_wait_ms,
+            queue_size=params.queue_size,
+            backpressure=params.backpressure,
+            write_video=params.write_video,
+            model_threads=params.model_threads
+        )
+        logger.info(f"Video inference config created: {video_inference_config}")
+        return video_inference_config
@@ -0,0 +1,262 @@
+from __future__ import annotations
+import math
+from types import ModuleType
+from typing import TYPE_CHECKING, Sequence, Tuple, TypeVar, Union
+import numpy as np
+
+# Every op takes NumPy arrays or torch tensors and returns the same type. torch is only
+# imported for tensor inputs, so NumPy-only users (e.g. the evaluator) don't pay for it
+if TYPE_CHECKING:
+    import torch
+
+Boxes = TypeVar("Boxes", np.ndarray, "torch.Tensor")
+
+BOX_FORMATS = ("xyxy", "xywh", "cxcywh")
+# Weights of the box coder of torchvision's Faster R-CNN ROI heads
+DEFAULT_BOX_CODER_WEIGHTS = (10.0, 10.0, 5.0, 5.0)
+# Largest log-scale delta decoded, keeping exp() finite (as in torchvision)
+BBOX_XFORM_CLIP = math.log(1000.0 / 16)
+# Above this many boxes `batched_nms` runs one NMS per class instead of the coordinate-offset trick
+PER_CLASS_NMS_MIN_BOXES = 1000
+
+
+def _xp(boxes: Union[np.ndarray, torch.Tensor]) -> ModuleType:
+    """The array module of `boxes`. numpy and torch share the elementwise API used here."""
+    if isinstance(boxes, np.ndarray):
+        return np
+    import torch
+
+    return torch
+
+
+def _unbind(boxes: Boxes) -> Tuple[Boxes, Boxes, Boxes, Boxes]:
+    return boxes[..., 0], boxes[..., 1], boxes[..., 2], boxes[..., 3]
+
+
+def box_convert(boxes: Boxes, in_fmt: str, out_fmt: str) -> Boxes:
+    """
+    Converts (..., 4) boxes between "xyxy" (corners), "xywh" (top-left corner and size) and
+    "cxcywh" (center and size).
+    """
+    for fmt in (in_fmt, out_fmt):
+        if fmt not in BOX_FORMATS:
+            raise ValueError(f"Invalid box format: {fmt}. Must be one of {', '.join(repr(f) for f in BOX_FORMATS)}.")
+    if in_fmt == out_fmt:
+        return boxes
+    xp = _xp(boxes)
+    a, b, c, d = _unbind(boxes)
+    if in_fmt == "xywh":
+        a, b, c, d = a, b, a + c, b + d
+    elif in_fmt == "cxcywh":
+        a, b, c, d = a - c / 2, b - d / 2, a + c / 2, b + d / 2
+    if out_fmt == "xywh":
+        a, b, c, d = a, b, c - a, d - b
+    elif out_fmt == "cxcywh":
+        a, b, c, d = (a + c) / 2, (b + d) / 2, c - a, d - b
+    return xp.stack([a, b, c, d], axis=-1)
+
+
+def box_area(boxes: Boxes) -> Boxes:
+    """Areas of (..., 4) xyxy boxes."""
+    return (boxes[..., 2] - boxes[..., 0]) * (boxes[..., 3] - boxes[..., 1])
+
+
+def _inter_union(boxes1: Boxes, boxes2: Boxes) -> Tuple[Boxes, Boxes]:
+    xp = _xp(boxes1)
+    lt = xp.maximum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = xp.minimum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = xp.clip(rb - lt, 0, None)
+    inter = wh[..., 0] * wh[..., 1]
+    union = box_area(boxes1)[:, None] + box_area(boxes2)[None, :] - inter
+    return inter, union
+
+
+def _safe_divide(numerator: Boxes, denominator: Boxes) -> Boxes:
+    """numerator / denominator, and 0 where the denominator is not positive."""
+    xp = _xp(numerator)
+    valid = denominator > 0
+    return xp.where(valid, numerator / xp.where(valid, denominator, 1), 0)
+
+
+def box_iou(boxes1: Boxes, boxes2: Boxes) -> Boxes:
+    """(N, M) IoU matrix of two sets of xyxy boxes; 0 for pairs with an empty union."""
+    inter, union = _inter_union(boxes1, boxes2)
+    return _safe_divide(inter, union)
+
+
+def generalized_box_iou(boxes1: Boxes, boxes2: Boxes) -> Boxes:
+    """(N, M) generalized IoU matrix (IoU minus the fraction of the enclosing box not covered by the union)."""
+    xp = _xp(boxes1)
+    inter, union = _inter_union(boxes1, boxes2)
+    lt = xp.minimum(boxes1[:, None, :2], boxes2[None, :, :2])
+    rb = xp.maximum(boxes1[:, None, 2:], boxes2[None, :, 2:])
+    wh = xp.clip(rb - lt, 0, None)
+    enclosing = wh[..., 0] * wh[..., 1]
+    return _safe_divide(inter, union) - _safe_divide(enclosing - union, enclosing)
+
+
+def clip_boxes(boxes: Boxes, size: Tuple[int, int]) -> Boxes:
+    """Clips (..., 4) xyxy boxes to an image of the given (width, height)."""
+    xp = _xp(boxes)
+    w, h = size
+    return xp.stack([
+        xp.clip(boxes[..., 0], 0, w), xp.clip(boxes[..., 1], 0, h),
+        xp.clip(boxes[..., 2], 0, w), xp.clip(boxes[..., 3], 0, h),
+    ], axis=-1)
+
+
+def scale_boxes(boxes: Boxes, scale: Union[Sequence[float], Boxes]) -> Boxes:
+    """
+    Scales (N, 4) xyxy boxes by (x, y) factors, given once for all boxes or per box as an (N, 2) array.
+    """
+    xp = _xp(boxes)
+    if isinstance(scale, (tuple, list)):
+        scale = np.asarray(scale, dtype=boxes.dtype) if xp is np else xp.tensor(scale, dtype=boxes.dtype)
+    return boxes * xp.concatenate([scale, scale], axis=-1)
+
+
+def hflip_boxes(boxes: Boxes, width: float) -> Boxes:
+    """Mirrors (..., 4) xyxy boxes horizontally in an image of the given width."""
+    xp = _xp(boxes)
+    return xp.stack([width - boxes[..., 2], boxes[..., 1], width - boxes[..., 0], boxes[..., 3]], axis=-1)
+
+
+def encode_boxes(boxes: Boxes, anchors: Boxes, weights: Sequence[float] = DEFAULT_BOX_CODER_WEIGHTS) -> Boxes:
+    """
+    Regression targets (dx, dy, dw, dh) of xyxy `boxes` relative to xyxy `anchors` of the same shape,
+    as in Faster R-CNN: center offsets in units of the anchor size and log size ratios, times `weights`.
+    """
+    xp = _xp(boxes)
+    wx, wy, ww, wh = weights
+    ax, ay, aw, ah = _unbind(box_convert(anchors, "xyxy", "cxcywh"))
+    bx, by, bw, bh = _unbind(box_convert(boxes, "xyxy", "cxcywh"))
+    return xp.stack([wx * (bx - ax) / aw, wy * (by - ay) / ah, ww * xp.log(bw / aw), wh * xp.log(bh / ah)], axis=-1)
+
+
+def decode_boxes(deltas: Boxes, anchors: Boxes, weights: Sequence[float] = DEFAULT_BOX_CODER_WEIGHTS,
+                 clamp: float = BBOX_XFORM_CLIP) -> Boxes:
+    """Inverse of `encode_boxes`: xyxy boxes from (dx, dy, dw, dh) deltas and xyxy anchors."""
+    xp = _xp(deltas)
+    wx, wy, ww, wh = weights
+    ax, ay, aw, ah = _unbind(box_convert(anchors, "xyxy", "cxcywh"))
+    cx = deltas[..., 0] / wx * aw + ax
+    cy = deltas[..., 1] / wy * ah + ay
+    w = xp.exp(xp.clip(deltas[..., 2] / ww, None, clamp)) * aw
+    h = xp.exp(xp.clip(deltas[..., 3] / wh, None, clamp)) * ah
+    return box_convert(xp.stack([cx, cy, w, h], axis=-1), "cxcywh", "xyxy")
+
+
+def _nms_numpy(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """Greedy NMS: indices of the kept boxes by decreasing score."""
+    order = np.argsort(-scores, kind="stable")
+    areas = box_area(boxes)
+    keep = []
+    while order.size:
+        i, rest = order[0], order[1:]
+        keep.append(i)
+        lt = np.maximum(boxes[i, :2], boxes[rest, :2])
+        rb = np.minimum(boxes[i, 2:], boxes[rest, 2:])
+        wh = np.clip(rb - lt, 0, None)
+        inter = wh[:, 0] * wh[:, 1]
+        iou = _safe_divide(inter, areas[i] + areas[rest] - inter)
+        order = rest[iou <= iou_threshold]
+    return np.asarray(keep, dtype=np.int64)
+
+
+def nms(boxes: Boxes, scores: Boxes, iou_threshold: float) -> Boxes:
+    """
+    Non-maximum suppression of xyxy boxes: drops every box whose IoU with a higher-scoring
+    kept box exceeds `iou_threshold`. Returns the kept indices by decreasing score.
+    """
+    if isinstance(boxes, np.ndarray):
+        return _nms_numpy(boxes, np.asarray(scores), iou_threshold)
+    from torchvision.ops import nms as torchvision_nms
+
+    return torchvision_nms(boxes, scores, iou_threshold)
+
+
+def _batched_nms_per_class(boxes: Boxes, scores: Boxes, labels: Boxes, iou_threshold: float) -> Boxes:
+    xp = _xp(boxes)
+    keep = []
+    for label in xp.unique(labels):
+        indices = xp.nonzero(labels == label)[0] if xp is np else xp.nonzero(labels == label).flatten()
+        keep.append(indices[nms(boxes[indices], scores[indices], iou_threshold)])
+    keep = xp.concatenate(keep)
+    if xp is np:
+        return keep[np.argsort(-scores[keep], kind="stable")]
+    return keep[xp.argsort(scores[keep], descending=True, stable=True)]
+
+
+def batched_nms(boxes: Boxes, scores: Boxes, labels: Boxes, iou_threshold: float) -> Boxes:
+    """
+    Class-aware NMS: boxes only suppress boxes of the same label.
+
+    Up to `PER_CLASS_NMS_MIN_BOXES` boxes, a single NMS runs over all of them with each
+    class shifted by `label * (max coordinate + 1)`, so boxes of different classes never
+    overlap. NMS cost grows with the square of the number of boxes, so larger inputs run
+    one NMS per class instead (the same switch torchvision makes on CPU).
+
+    Returns:
+        The kept indices by decreasing score.
+    """
+    xp = _xp(boxes)
+    if len(boxes) == 0:
+        return xp.zeros(0, dtype=xp.int64)
+    if len(boxes) > PER_CLASS_NMS_MIN_BOXES:
+        return _batched_nms_per_class(boxes, scores, labels, iou_threshold)
+    offsets = labels.astype(boxes.dtype) if xp is np else labels.to(boxes.dtype)
+    offsets = offsets * (boxes.max() + 1)
+    return nms(boxes + offsets[:, None], scores, iou_threshold)
+
+
+def _weighted_box_fusion_numpy(boxes: np.ndarray, scores: np.ndarray, labels: np.ndarray,
+                               iou_threshold: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    fused_boxes, fused_scores, fused_labels = [], [], []
+    for label in np.unique(labels):
+        indices = np.nonzero(labels == label)[0]
+        indices = indices[np.argsort(-scores[indices], kind="stable")]
+        weighted_sums, weights, best, fused = [], [], [], np.zeros((0, 4), dtype=boxes.dtype)
+        for i in indices:
+            iou = box_iou(boxes[i:i + 1], fused)[0] if len(fused) else np.zeros(0)
+            if len(iou) and iou.max() > iou_threshold:
+                k = int(iou.argmax())
+                weighted_sums[k] += scores[i] * boxes[i]
+                weights[k] += scores[i]
+                fused[k] = weighted_sums[k] / max(weights[k], np.finfo(boxes.dtype).tiny)
+            else:
+                weighted_sums.append(scores[i] * boxes[i].astype(np.float64))
+                weights.append(float(scores[i]))
+                best.append(scores[i])
+                fused = np.concatenate([fused, boxes[i:i + 1]])
+        fused_boxes.append(fused)
+        fused_scores.append(np.asarray(best, dtype=scores.dtype))
+        fused_labels.append(np.full(len(fused), label, dtype=labels.dtype))
+    boxes, scores, labels = np.concatenate(fused_boxes), np.concatenate(fused_scores), np.concatenate(fused_labels)
+    order = np.argsort(-scores, kind="stable")
+    return boxes[order], scores[order], labels[order]
+
+
+def weighted_box_fusion(boxes: Boxes, scores: Boxes, labels: Boxes, iou_threshold: float) -> Tuple[Boxes, Boxes, Boxes]:
+    """
+    Class-aware weighted box fusion. In decreasing score order, every box joins the cluster
+    of its label whose fused box it overlaps most if that IoU exceeds `iou_threshold`, and
+    starts a new cluster otherwise. Each cluster becomes one box, the score-weighted mean of
+    its members, with the score of its best member.
+
+    Where NMS keeps the best box of a group of duplicates, fusion averages them, so objects
+    seen partially by several overlapping tiles or models get one box from all views.
+
+    Returns:
+        The fused boxes, scores and labels by decreasing score.
+    """
+    if isinstance(boxes, np.ndarray):
+        if len(boxes) == 0:
+            return boxes, scores, labels
+        return _weighted_box_fusion_numpy(boxes, np.asarray(scores), np.asarray(labels), iou_threshold)
+    import torch
+
+    if len(boxes) == 0:
+        return boxes, scores, labels
+    fused = _weighted_box_fusion_numpy(boxes.detach().cpu().numpy(), scores.detach().cpu().numpy(),
+                                       labels.detach().cpu().numpy(), iou_threshold)
+    return tuple(torch.from_numpy(np.ascontiguousarray(a)).to(boxes.device) for a in fused)
@@ -1,4 +1,4 @@
-from ast import Tuple
+from typing import Tuple
 from dataclasses import dataclass
 from pathlib import Path
 
@@ -13,6 +13,12 @@ class DataIngestionConfig:
     project_name: str
     version: int
     format: str
+    api_url: str
+    manifest_file: Path
+    chunk_size_mb: int
+    num_connections: int
+    extract_workers: int
+    keep_archive: bool
 
 @dataclass(frozen=True)
 class DataValidationConfig:
@@ -22,6 +28,11 @@ class DataValidationConfig:
     data_dir: Path 
     required_files: list 
     status_file: Path
+    report_file: Path
+    cache_file: Path
+    deep: bool
+    num_workers: int
+    chunk_size: int
 
 @dataclass(frozen=True)
 class DatasetConfig:
@@ -31,6 +42,16 @@ class DatasetConfig:
     data_dir: Path
     train_dir: Path
     valid_dir: Path
+    class_map: dict
+    index_file: str
+    ids_cache_file: str
+    image_backend: str
+    decoder: str
+    packed_dir: Path
+    mode: str
+    shard_dir: Path
+    samples_per_shard: int
+    shuffle_buffer: int
 
 @dataclass(frozen=True)
 class DataTransformationConfig:
@@ -40,6 +61,19 @@ class DataTransformationConfig:
     resize: bool
     image_size: Tuple[int, int]
     flip_prob: float
+    batch_mode: bool
+    normalize: bool
+    mean: Tuple[float, float, float]
+    std: Tuple[float, float, float]
+
+@dataclass(frozen=True)
+class PreprocessingCacheConfig:
+    """
+    Configuration for the Preprocessing Cache Stage.
+    """
+    cache_dir: Path
+    enabled: bool
+    max_size_mb: int
 
 @dataclass(frozen=True)
 class DataLoaderConfig:
@@ -50,4 +84,159 @@ class DataLoaderConfig:
     valid_batch_size: int
     num_workers: int
     pin_memory: bool
-    drop_last: bool
\ No newline at end of file
+    drop_last: bool
+    batch_sampler: str
+    aspect_ratio_bins: list
+    collate: str
+
+@dataclass(frozen=True)
+class InstrumentationConfig:
+    """
+    Configuration for the data-path instrumentation.
+    """
+    enabled: bool
+    debug_sample_rate: float
+
+@dataclass(frozen=True)
+class PipelineRunnerConfig:
+    """
+    Configuration for the stage runner in main.py.
+    """
+    state_file: Path
+    max_workers: int
+
+@dataclass(frozen=True)
+class ModelTrainerConfig:
+    """
+    Configuration for the Model Trainer Stage.
+    """
+    root_dir: Path
+    model_path: Path
+    history_file: Path
+    model_name: str
+    weights: str
+    weights_backbone: str
+    epochs: int
+    learning_rate: float
+    momentum: float
+    weight_decay: float
+    warmup_steps: int
+    accumulation_steps: int
+    mixed_precision: str
+    channels_last: bool
+    compile: bool
+    prefetch_batches: int
+    log_every_n_steps: int
+
+@dataclass(frozen=True)
+class SSDTargetsConfig:
+    """
+    Configuration for encoding dense SSD targets in the data pipeline.
+    """
+    root_dir: Path
+    enabled: bool
+    iou_threshold: float
+
+@dataclass(frozen=True)
+class DistributedConfig:
+    """
+    Configuration for distributed data-parallel training.
+    """
+    enabled: bool
+    backend: str
+    timeout_s: int
+    threads_per_rank: int
+    bucket_cap_mb: int
+    gradient_as_bucket_view: bool
+    broadcast_buffers: bool
+    find_unused_parameters: bool
+
+@dataclass(frozen=True)
+class ModelEvaluationConfig:
+    """
+    Configuration for the Model Evaluation Stage.
+    """
+    root_dir: Path
+    metrics_file: Path
+    max_detections: int
+    mixed_precision: str
+
+@dataclass(frozen=True)
+class ModelExportConfig:
+    """
+    Configuration for the Model Export Stage.
+    """
+    root_dir: Path
+    torchscript_path: Path
+    onnx_path: Path
+    report_file: Path
+    formats: list
+    opset_version: int
+    sample_images: int
+    box_atol: float
+    score_atol: float
+    min_match_rate: float
+
+@dataclass(frozen=True)
+class QuantizationConfig:
+    """
+    Configuration for the Quantization Stage.
+    """
+    root_dir: Path
+    dynamic_model_path: Path
+    static_model_path: Path
+    report_file: Path
+    modes: list
+    backend: str
+    static_modules: list
+    calibration_batches: int
+    eval_batches: int
+    latency_images: int
+
+@dataclass(frozen=True)
+class InferenceConfig:
+    """
+    Configuration for the dynamic-batching inference server.
+    """
+    model_path: Path
+    host: str
+    port: int
+    max_batch_size: int
+    max_wait_ms: float
+    num_workers: int
+    threads_per_worker: int
+    decode_workers: int
+    decoder: str
+    score_threshold: float
+    mixed_precision: str
+    backend: str
+
+@dataclass(frozen=True)
+class SlicedInferenceConfig:
+    """
+    Configuration for sliced (tiled) inference on large images.
+    """
+    tile_size: Tuple[int, int]
+    overlap: float
+    batch_size: int
+    merge: str
+    merge_iou_threshold: float
+    score_threshold: float
+    max_detections: int
+
+@dataclass(frozen=True)
+class VideoInferenceConfig:
+    """
+    Configuration for pipelined inference on video files and streams.
+    """
+    root_dir: Path
+    output_video: Path
+    detections_file: Path
+    report_file: Path
+    frame_stride: int
+    batch_size: int
+    max_wait_ms: float
+    queue_size: int
+    backpressure: str
+    write_video: bool
+    model_threads: int
@@ -0,0 +1,428 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import numpy as np
+import torch
+from torch import nn
+from torchvision.transforms import functional as F
+from src.components.image_decoders import ImageDecoder, get_decoder
+from src.components.model_export import load_onnx_session, load_torchscript, onnx_forward, torchscript_forward
+from src.components.model_trainer import build_model
+from src.components.sliced_inference import SlicedInference
+from src.config.configuration import ConfigurationManager
+from src.core.box_ops import scale_boxes
+from src.entity.config_entity import InferenceConfig, SlicedInferenceConfig
+from src.utils.logging_setup import logger
+
+
+class Predictor:
+    """
+    Decodes images and runs a trained detector on batches of them.
+
+    Images are decoded with the configured (possibly reduced-resolution) decoder and
+    boxes are mapped back to the original image size. Subclasses run exported models
+    through the same interface by overriding `_forward`.
+    """
+    def __init__(self, config: InferenceConfig, model: Any, class_map: Mapping[str, int], decoder: ImageDecoder,
+                 sliced_config: Optional[SlicedInferenceConfig] = None):
+        """
+        Args:
+            config (InferenceConfig): Configuration for inference.
+            model (Any): A torchvision detection model with its trained weights, or its
+                export for the subclasses.
+            class_map (Mapping[str, int]): Class name to label, without the background class.
+            decoder (ImageDecoder): Decoder for the request bodies.
+            sliced_config (SlicedInferenceConfig, optional): Enables `predict_sliced`. Defaults to None.
+        """
+        self.config = config
+        if config.mixed_precision not in ("bf16", "none"):
+            raise ValueError(f"Invalid mixed precision: {config.mixed_precision}. Must be one of 'bf16' or 'none'.")
+        self.model = model.eval() if isinstance(model, nn.Module) else model
+        self.class_names = {label: name for name, label in class_map.items()}
+        self.decoder = decoder
+        # Tiles are cut from the full-resolution image
+        self.full_decoder = type(decoder)()
+        self.sliced = SlicedInference(sliced_config, self._forward) if sliced_config is not None else None
+
+    def preprocess(self, data: bytes) -> Tuple[torch.Tensor, Tuple[int, int]]:
+        """Decodes an encoded image into a float CHW tensor and its original (width, height)."""
+        img, orig_size = self.decoder.decode(data)
+        if isinstance(img, torch.Tensor):
+            return F.convert_image_dtype(img, torch.float32), orig_size
+        return F.to_tensor(img), orig_size
+
+    def predict_batch(self, batch: List[Tuple[torch.Tensor, Tuple[int, int]]]) -> List[Dict[str, Any]]:
+        """
+        Runs the model on a batch of preprocessed images.
+
+        Args:
+            batch (List[Tuple[torch.Tensor, Tuple[int, int]]]): Results of `preprocess`.
+
+        Returns:
+            List[Dict[str, Any]]: Per image the boxes (original pixels), scores, labels and
+                class names of the detections above the score threshold.
+        """
+        outputs = self._forward([image for image, _ in batch])
+        results = []
+        for (image, (orig_w, orig_h)), output in zip(batch, outputs):
+            h, w = image.shape[-2:]
+            results.append(self._format(scale_boxes(output["boxes"].float(), (orig_w / w, orig_h / h)), output["scores"], output["labels"]))
+        return results
+
+    def predict_sliced(self, data: bytes) -> Dict[str, Any]:
+        """
+        Detects objects in a large encoded image at full resolution with `SlicedInference`,
+        instead of downscaling it to the model input size.
+
+        Returns:
+            Dict[str, Any]: As an entry of `predict_batch`, plus the number of tiles.
+        """
+        if self.sliced is None:
+            raise ValueError("Sliced inference is not enabled for this predictor")
+        img, _ = self.full_decoder.decode(data)
+        output = self.sliced(img if isinstance(img, torch.Tensor) else img.convert("RGB"))
+        return dict(self._format(output["boxes"], output["scores"], output["labels"]), num_tiles=output["num_tiles"])
+
+    def _format(self, boxes: torch.Tensor, scores: torch.Tensor, labels: torch.Tensor) -> Dict[str, Any]:
+        """The detections above the score threshold as JSON-serializable lists."""
+        keep = scores >= self.config.score_threshold
+        labels = labels[keep].tolist()
+        return {
+            "boxes": [[round(v, 2) for v in box] for box in boxes[keep].tolist()],
+            "scores": [round(v, 4) for v in scores[keep].float().tolist()],
+            "labels": labels,
+            "classes": [self.class_names.get(label, str(label)) for label in labels],
+        }
+
+    def _forward(self, images: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+        autocast = torch.autocast(device_type="cpu", dtype=torch.bfloat16) if self.config.mixed_precision == "bf16" else nullcontext()
+        with torch.inference_mode(), autocast:
+            return self.model(images)
+
+
+class TorchScriptPredictor(Predictor):
+    """`Predictor` on the TorchScript export of the model. Runs in float32 (`mixed_precision` is ignored)."""
+    def _forward(self, images: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+        with torch.inference_mode():
+            return torchscript_forward(self.model, images)
+
+
+class OnnxPredictor(Predictor):
+    """
+    `Predictor` on an ONNX Runtime session of the ONNX export of the model. The exported
+    graph takes one image, so a batch runs image by image. Runs in float32 (`mixed_precision`
+    is ignored).
+    """
+    def _forward(self, images: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+        return onnx_forward(self.model, images)
+
+
+PREDICTORS = {"eager": Predictor, "torchscript": TorchScriptPredictor, "onnx": OnnxPredictor}
+
+
+def load_predictor(config_manager: ConfigurationManager, model_path: Optional[str] = None, backend: Optional[str] = None) -> Predictor:
+    """
+    Loads the trained model for the configured backend and wraps it in the matching `Predictor`:
+    "eager" builds the model configured for training and loads the trained weights,
+    "torchscript" and "onnx" load the files of the model export stage.
+
+    Args:
+        config_manager (ConfigurationManager): The configuration.
+        model_path (str, optional): Checkpoint or exported model to load instead of the configured one. Defaults to None.
+        backend (str, optional): One of `PREDICTORS`. Defaults to the configured backend.
+    """
+    config = config_manager.get_inference_config()
+    backend = backend or config.backend
+    if backend not in PREDICTORS:
+        raise ValueError(f"Invalid inference backend: {backend}. Must be one of {list(PREDICTORS)}.")
+    dataset_config = config_manager.get_dataset_config()
+    transformation_config = config_manager.get_data_transformation_config()
+    image_size = transformation_config.image_size if transformation_config.resize else None
+
+    if backend == "eager":
+        trainer_config = config_manager.get_model_trainer_config()
+        model = build_model(trainer_config.model_name, num_classes=len(dataset_config.class_map) + 1, image_size=image_size)
+        model_path = model_path or config.model_path
+        model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    elif backend == "torchscript":
+        model_path = model_path or config_manager.get_model_export_config().torchscript_path
+        model = load_torchscript(str(model_path))
+    else:
+        model_path = model_path or config_manager.get_model_export_config().onnx_path
+        # ONNX Runtime keeps its own thread pool, sized like the batcher's torch threads
+        threads = config.threads_per_worker or max(1, (os.cpu_count() or 1) // config.num_workers)
+        model = load_onnx_session(str(model_path), threads)
+    logger.info(f"Loaded the {backend} model from {model_path}")
+    return PREDICTORS[backend](config, model, dataset_config.class_map, get_decoder(config.decoder, image_size),
+                               config_manager.get_sliced_inference_config())
+
+
+class ServingMetrics:
+    """Latency percentiles over the most recent requests, batch sizes and throughput of the server."""
+    def __init__(self, max_batch_size: int, window: int = 10000):
+        self.max_batch_size = max_batch_size
+        self.latencies_ms = deque(maxlen=window)
+        self.queue_ms = deque(maxlen=window)
+        self.model_ms = deque(maxlen=window)
+        self.batch_sizes = Counter()
+        self.requests = 0
+        self.errors = 0
+        self.start = time.perf_counter()
+
+    def record_batch(self, size: int, queue_ms: List[float], model_ms: float) -> None:
+        self.batch_sizes[size] += 1
+        self.queue_ms.extend(queue_ms)
+        self.model_ms.append(model_ms)
+
+    def record_request(self, latency_ms: float, ok: bool = True) -> None:
+        self.requests += 1
+        self.errors += not ok
+        self.latencies_ms.append(latency_ms)
+
+    @staticmethod
+    def _percentiles(values) -> Dict[str, float]:
+        if not values:
+            return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "mean": 0.0}
+        p50, p95, p99 = np.percentile(np.fromiter(values, dtype=np.float64), [50, 95, 99])
+        return {"p50": float(p50), "p95": float(p95), "p99": float(p99), "mean": float(np.mean(values))}
+
+    def snapshot(self) -> Dict[str, Any]:
+        batches = sum(self.batch_sizes.values())
+        batched = sum(size * n for size, n in self.batch_sizes.items())
+        mean_batch = batched / batches if batches else 0.0
+        elapsed = time.perf_counter() - self.start
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput_rps": self.requests / elapsed if elapsed > 0 else 0.0,
+            "latency_ms": self._percentiles(self.latencies_ms),
+            "queue_ms": self._percentiles(self.queue_ms),
+            "model_ms_per_batch": self._percentiles(self.model_ms),
+            "batches": batches,
+            "mean_batch_size": mean_batch,
+            "batch_fill": mean_batch / self.max_batch_size if self.max_batch_size else 0.0,
+            "batch_size_histogram": {str(size): n for size, n in sorted(self.batch_sizes.items())},
+        }
+
+    def reset(self) -> None:
+        self.__init__(self.max_batch_size, self.latencies_ms.maxlen)
+
+
+class DynamicBatcher:
+    """
+    Coalesces concurrent requests into batches on an asyncio queue.
+
+    A batch is formed once one of `num_workers` model threads is free: it starts with the
+    oldest queued request and takes further requests until it holds `max_batch_size` or
+    `max_wait_ms` have passed since that first request arrived. Under load batches fill
+    up while the workers are busy; when idle, a lone request waits at most `max_wait_ms`.
+    """
+    def __init__(self, predictor: Predictor, max_batch_size: int, max_wait_ms: float, num_workers: int,
+                 threads_per_worker: int, metrics: ServingMetrics):
+        self.predictor = predictor
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.metrics = metrics
+        self.threads_per_worker = threads_per_worker or max(1, (os.cpu_count() or 1) // num_workers)
+        # Intra-op threads are set per thread (OpenMP keeps the setting thread-local)
+        self.executor = ThreadPoolExecutor(max_workers=num_workers, thread_name_prefix="model",
+                                           initializer=torch.set_num_threads, initargs=(self.threads_per_worker,))
+        self.free_workers = asyncio.Semaphore(num_workers)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._batch_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self.executor.shutdown(wait=True)
+
+    async def submit(self, item: Tuple[torch.Tensor, Tuple[int, int]]) -> Dict[str, Any]:
+        """Queues one preprocessed image and waits for its detections."""
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((item, future, time.perf_counter()))
+        return await future
+
+    async def _batch_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await self.free_workers.acquire()
+            batch = [await self.queue.get()]
+            deadline = batch[0][2] + self.max_wait_s
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                    continue
+                except asyncio.QueueEmpty:
+                    pass
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            loop.create_task(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List) -> None:
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            results = await loop.run_in_executor(self.executor, self.predictor.predict_batch, [item for item, _, _ in batch])
+            for (_, future, _), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+        except Exception as e:
+            logger.error(f"Batch of {len(batch)} failed: {e}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        finally:
+            self.free_workers.release()
+            self.metrics.record_batch(len(batch), [(start - queued) * 1000.0 for _, _, queued in batch],
+                                      (time.perf_counter() - start) * 1000.0)
+
+
+class InferenceServer:
+    """
+    Minimal HTTP/1.1 server on asyncio streams (keep-alive supported):
+
+    - POST /predict with an encoded image as body returns its detections as JSON
+    - POST /predict/sliced does the same for large images with sliced (tiled) inference
+    - GET /metrics returns `ServingMetrics.snapshot()`; POST /metrics/reset clears them
+    - GET /health
+    """
+    def __init__(self, config: InferenceConfig, predictor: Predictor):
+        self.config = config
+        self.predictor = predictor
+        self.metrics = ServingMetrics(config.max_batch_size)
+        self.decode_executor = ThreadPoolExecutor(max_workers=config.decode_workers, thread_name_prefix="decode")
+        self.batcher: Optional[DynamicBatcher] = None
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self.batcher = DynamicBatcher(self.predictor, self.config.max_batch_size, self.config.max_wait_ms,
+                                      self.config.num_workers, self.config.threads_per_worker, self.metrics)
+        self.batcher.start()
+        self.server = await asyncio.start_server(self._handle, self.config.host, self.config.port)
+        port = self.server.sockets[0].getsockname()[1]
+        logger.info(f"Serving on http://{self.config.host}:{port}: max_batch_size={self.config.max_batch_size} "
+                    f"max_wait_ms={self.config.max_wait_ms} workers={self.config.num_workers}x{self.batcher.threads_per_worker} threads")
+
+    @property
+    def port(self) -> int:
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self.server.close()
+        await self.server.wait_closed()
+        await self.batcher.stop()
+        self.decode_executor.shutdown(wait=True)
+
+    async def _predict(self, body: bytes) -> Tuple[int, Dict]:
+        start = time.perf_counter()
+        try:
+            item = await asyncio.get_running_loop().run_in_executor(self.decode_executor, self.predictor.preprocess, body)
+        except Exception as e:
+            self.metrics.record_request((time.perf_counter() - start) * 1000.0, ok=False)
+            return 400, {"error": f"Could not decode image: {e}"}
+        try:
+            result = await self.batcher.submit(item)
+        except Exception as e:
+            self.metrics.record_request((time.perf_counter() - start) * 1000.0, ok=False)
+            return 500, {"error": str(e)}
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        self.metrics.record_request(latency_ms)
+        return 200, dict(result, latency_ms=round(latency_ms, 2))
+
+    async def _predict_sliced(self, body: bytes) -> Tuple[int, Dict]:
+        """
+        Runs a whole sliced prediction on a model thread, queued on the batcher's executor
+        alongside its batches; the tiles are batched by `SlicedInference`.
+        """
+        start = time.perf_counter()
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(self.batcher.executor, self.predictor.predict_sliced, body)
+        except Exception as e:
+            self.metrics.record_request((time.perf_counter() - start) * 1000.0, ok=False)
+            return 500, {"error": str(e)}
+        latency_ms = (time.perf_counter() - start) * 1000.0
+        self.metrics.record_request(latency_ms)
+        return 200, dict(result, latency_ms=round(latency_ms, 2))
+
+    async def _route(self, method: str, path: str, body: bytes) -> Tuple[int, Dict]:
+        if method == "POST" and path == "/predict":
+            return await self._predict(body)
+        if method == "POST" and path == "/predict/sliced":
+            return await self._predict_sliced(body)
+        if method == "GET" and path == "/metrics":
+            return 200, self.metrics.snapshot()
+        if method == "POST" and path == "/metrics/reset":
+            self.metrics.reset()
+            return 200, {"reset": True}
+        if method == "GET" and path == "/health":
+            return 200, {"status": "ok"}
+        return 404, {"error": f"No route for {method} {path}"}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        reasons = {200: "OK", 400: "Bad Request", 404: "Not Found", 500: "Internal Server Error"}
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, payload = await self._route(method, path, body)
+                data = json.dumps(payload).encode()
+                keep_alive = headers.get("connection", "").lower() != "close"
+                writer.write(
+                    f"HTTP/1.1 {status} {reasons[status]}\r\nContent-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionResetError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+async def serve(config: InferenceConfig, predictor: Predictor, ready: Optional[threading.Event] = None) -> None:
+    """Runs the inference server until cancelled."""
+    server = InferenceServer(config, predictor)
+    await server.start()
+    if ready is not None:
+        ready.set()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await server.stop()
+
+
+if __name__ == '__main__':
+    try:
+        config_manager = ConfigurationManager()
+        asyncio.run(serve(config_manager.get_inference_config(), load_predictor(config_manager)))
+    except KeyboardInterrupt:
+        logger.info("Inference server stopped")
+    except Exception as e:
+        logger.error(f"Error in inference server: {e}")
+        raise e
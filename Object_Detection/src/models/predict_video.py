@@ -0,0 +1,29 @@
+import argparse
+from src.components.video_inference import VideoInference
+from src.config.configuration import ConfigurationManager
+from src.models.predict_model import load_predictor
+from src.utils.logging_setup import logger
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Detection on a video file, stream URL or camera index with pipelined "
+                                                 "decoding, inference and writing.")
+    parser.add_argument("source", help="Video file or stream URL, or a camera index.")
+    parser.add_argument("--max-frames", type=int, default=None, help="Stop after this many source frames.")
+    parser.add_argument("--backend", default=None, help="Inference backend, defaults to the configured one.")
+    args = parser.parse_args()
+
+    config_manager = ConfigurationManager()
+    predictor = load_predictor(config_manager, backend=args.backend)
+    video_inference = VideoInference(config_manager.get_video_inference_config(), predictor.predict_batch, predictor.decoder.target_size)
+    video_inference.run(int(args.source) if args.source.isdigit() else args.source, max_frames=args.max_frames)
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        logger.info("Video inference stopped")
+    except Exception as e:
+        logger.error(f"Error in video inference: {e}")
+        raise e
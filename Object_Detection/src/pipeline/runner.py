@@ -0,0 +1,263 @@
+import dataclasses
+import hashlib
+import importlib
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from src.config.configuration import ConfigurationManager
+from src.entity.config_entity import PipelineRunnerConfig
+from src.utils.distributed import is_main_process
+from src.utils.helpers import save_json
+from src.utils.logging_setup import logger
+
+
+@dataclass
+class Stage:
+    """
+    One node of the pipeline DAG.
+
+    `run(config_manager, *results)` receives the results of the stages in `depends_on`,
+    in that order. A stage that declares `outputs` is skipped when its fingerprint
+    (config slice, input files and upstream fingerprints) is unchanged and all outputs
+    exist; its result is then rebuilt with `load(config_manager, *results)`, if given.
+    Stages marked `parallel` run in the process pool, so `run`, its arguments and its
+    result must be picklable. `imports` lists the modules the stage needs; they are
+    imported only when the stage actually runs, in the main process before it is handed
+    to a worker, so forked workers do not import them again. `input_suffixes` restricts
+    which files below the `inputs` directories are fingerprinted, e.g. to ignore index
+    files written next to the data.
+    """
+    name: str
+    run: Callable[..., Any]
+    depends_on: Sequence[str] = ()
+    config: Optional[Callable[[ConfigurationManager], Any]] = None
+    inputs: Sequence[str] = ()
+    input_suffixes: Sequence[str] = ()
+    outputs: Sequence[str] = ()
+    load: Optional[Callable[..., Any]] = None
+    parallel: bool = False
+    imports: Sequence[str] = ()
+
+
+@dataclass
+class StageRecord:
+    status: str = "pending"  # pending | skipped | done
+    fingerprint: Optional[str] = None
+    duration_s: float = 0.0
+    result: Any = field(default=None, repr=False)
+
+
+def _jsonable(obj: Any) -> Any:
+    """JSON fallback for config slices: dataclasses (also nested) as dicts, anything else as str."""
+    if dataclasses.is_dataclass(obj):
+        return dataclasses.asdict(obj)
+    return str(obj)
+
+
+def _path_fingerprint(path: str, digest, suffixes: Sequence[str] = ()) -> None:
+    """Adds the (name, size, mtime) of `path`, and of every file below it ending in one of `suffixes`, to `digest`."""
+    if not os.path.exists(path):
+        digest.update(f"{path}:missing\n".encode())
+        return
+    if not os.path.isdir(path):
+        st = os.stat(path)
+        digest.update(f"{path}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+        return
+    stack = [path]
+    while stack:
+        current = stack.pop()
+        with os.scandir(current) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif not suffixes or entry.name.endswith(tuple(suffixes)):
+                st = entry.stat()
+                digest.update(f"{entry.path}:{st.st_size}:{st.st_mtime_ns}\n".encode())
+
+
+class PipelineRunner:
+    """
+    Runs `Stage`s in dependency order, skipping stages whose fingerprint is unchanged and
+    running ready `parallel` stages concurrently in a process pool while the main
+    process works through the others.
+    """
+    def __init__(self, config_manager: ConfigurationManager, stages: List[Stage], config: PipelineRunnerConfig):
+        """
+        Args:
+            config_manager (ConfigurationManager): Passed to every stage.
+            stages (List[Stage]): The stages; names must be unique and dependencies must exist.
+            config (PipelineRunnerConfig): Configuration for the runner.
+        """
+        self.config_manager = config_manager
+        self.config = config
+        self.stages = {stage.name: stage for stage in stages}
+        if len(self.stages) != len(stages):
+            raise ValueError("Stage names must be unique.")
+        for stage in stages:
+            missing = [name for name in stage.depends_on if name not in self.stages]
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages: {missing}")
+        self.records = {name: StageRecord() for name in self.stages}
+        self._check_acyclic()
+
+    def _check_acyclic(self) -> None:
+        visiting, visited = set(), set()
+
+        def visit(name: str) -> None:
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"Stage dependency cycle through {name}")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _load_state(self) -> Dict[str, str]:
+        if not os.path.exists(self.config.state_file):
+            return {}
+        try:
+            with open(self.config.state_file, 'r') as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warning(f"Could not read stage fingerprints {self.config.state_file}: {e}")
+            return {}
+
+    def fingerprint(self, stage: Stage) -> str:
+        """Hash of the stage's config slice, its input files and its upstream fingerprints."""
+        digest = hashlib.sha256(stage.name.encode())
+        if stage.config is not None:
+            config_slice = stage.config(self.config_manager)
+            digest.update(json.dumps(config_slice, sort_keys=True, default=_jsonable).encode())
+        for path in stage.inputs:
+            _path_fingerprint(str(path), digest, stage.input_suffixes)
+        for dep in stage.depends_on:
+            digest.update(f"{dep}:{self.records[dep].fingerprint}".encode())
+        return digest.hexdigest()
+
+    def _is_up_to_date(self, stage: Stage, fingerprint: str, state: Dict[str, str]) -> bool:
+        return bool(stage.outputs) and state.get(stage.name) == fingerprint \
+            and all(os.path.exists(path) for path in stage.outputs)
+
+    def _upstream_results(self, stage: Stage) -> List[Any]:
+        return [self.records[dep].result for dep in stage.depends_on]
+
+    def expand(self, names: Sequence[str]) -> List[str]:
+        """Stage names matching `names`; a name may also be a group prefix, e.g. "dataset" for "dataset_train"."""
+        expanded = []
+        for target in names:
+            matches = [name for name in self.stages if name == target or name.startswith(f"{target}_")]
+            if not matches:
+                raise ValueError(f"Unknown stage: {target}. Must be one of {list(self.stages)}.")
+            expanded.extend(matches)
+        return expanded
+
+    def select(self, targets: Sequence[str]) -> List[str]:
+        """Names of the `targets` and all stages they depend on, in declaration order."""
+        selected, stack = set(), self.expand(targets)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.stages[name].depends_on)
+        return [name for name in self.stages if name in selected]
+
+    def run(self, targets: Optional[Sequence[str]] = None, force: Sequence[str] = ()) -> Dict[str, Any]:
+        """
+        Runs the pipeline.
+
+        Args:
+            targets (Sequence[str], optional): Stages to run, together with their dependencies.
+                Defaults to None (all stages).
+            force (Sequence[str], optional): Stages to run even if they are up to date. Defaults to ().
+
+        Returns:
+            Dict[str, Any]: Result of every stage that ran or was skipped, by name.
+        """
+        state = self._load_state()
+        # Stages finished by an earlier call keep their results
+        pending = [name for name in (self.select(targets) if targets else self.stages) if self.records[name].status == "pending"]
+        force = self.expand(force)
+        running: Dict[Future, tuple] = {}
+        executor = ProcessPoolExecutor(max_workers=self.config.max_workers) if self.config.max_workers > 1 else None
+        pipeline_start = time.perf_counter()
+        try:
+            while pending or running:
+                ready = [name for name in pending
+                         if all(self.records[dep].status in ("skipped", "done") for dep in self.stages[name].depends_on)]
+                inline, skipped = [], False
+                for name in ready:
+                    pending.remove(name)
+                    stage, record = self.stages[name], self.records[name]
+                    record.fingerprint = self.fingerprint(stage)
+                    if name not in force and self._is_up_to_date(stage, record.fingerprint, state):
+                        logger.info(f">>>>>> stage {name} is up to date, skipping <<<<<<")
+                        if stage.load is not None:
+                            record.result = stage.load(self.config_manager, *self._upstream_results(stage))
+                        record.status = "skipped"
+                        skipped = True
+                    elif stage.parallel and executor is not None:
+                        self._import(stage)
+                        logger.info(f">>>>>> stage {name} started in worker process <<<<<<")
+                        future = executor.submit(stage.run, self.config_manager, *self._upstream_results(stage))
+                        running[future] = (name, time.perf_counter())
+                    else:
+                        inline.append(name)
+
+                if inline:
+                    # Parallel stages already submitted keep running meanwhile
+                    name = inline[0]
+                    pending[:0] = inline[1:]
+                    stage, record = self.stages[name], self.records[name]
+                    self._import(stage)
+                    logger.info(f">>>>>> stage {name} started <<<<<<")
+                    start = time.perf_counter()
+                    self._finish(name, stage.run(self.config_manager, *self._upstream_results(stage)), start, state)
+                    continue
+
+                if skipped:
+                    # Stages waiting on the skipped ones may be ready now
+                    continue
+                if not running:
+                    if pending:
+                        raise RuntimeError(f"Stages can never run: {pending}")
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name, start = running.pop(future)
+                    self._finish(name, future.result(), start, state)
+        except Exception as e:
+            logger.error(f"Pipeline failed: {e}")
+            raise e
+        finally:
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+
+        finished = {name: record for name, record in self.records.items() if record.status != "pending"}
+        skipped = [name for name, record in finished.items() if record.status == "skipped"]
+        logger.info(f"Pipeline completed in {time.perf_counter() - pipeline_start:.1f}s; skipped {len(skipped)} of {len(finished)} stages: {skipped}")
+        return {name: record.result for name, record in finished.items()}
+
+    def _import(self, stage: Stage) -> None:
+        for module in stage.imports:
+            importlib.import_module(module)
+
+    def _finish(self, name: str, result: Any, start: float, state: Dict[str, str]) -> None:
+        """Records a completed stage and persists its fingerprint right away."""
+        stage, record = self.stages[name], self.records[name]
+        record.result = result
+        record.status = "done"
+        record.duration_s = time.perf_counter() - start
+        logger.info(f">>>>>> stage {name} completed in {record.duration_s:.1f}s <<<<<<\n\nx==========x")
+        if stage.outputs and is_main_process():
+            # Under torchrun every rank runs the stages, but only rank 0 records them
+            state[name] = record.fingerprint
+            save_json(self.config.state_file, state)
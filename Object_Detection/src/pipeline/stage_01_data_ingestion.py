@@ -2,7 +2,6 @@ import os
 from src.components.data_ingestion import RoboflowDatasetDownloader
 from src.utils.logging_setup import logger
 from src.config.configuration import ConfigurationManager
-from src.entity.config_entity import DataIngestionConfig
 from dotenv import load_dotenv
 
 load_dotenv()  # Load environment variables from .env file
@@ -22,13 +21,12 @@ class DataIngestionPipeline:
         self.data_ingestion = RoboflowDatasetDownloader(config=self.config)
         
 
-    def run_pipeline(self) -> DataIngestionConfig:
+    def run_pipeline(self) -> str:
         """
         Executes the data ingestion pipeline.
 
         Returns:
-            DataIngestionConfig: The configuration used for data ingestion,
-                                 which contains paths to the ingested data.
+            str: Directory the dataset was extracted to.
         """
         API_KEY = os.getenv("ROBOLFLOW_API_KEY")
         if API_KEY is None:
@@ -46,7 +44,7 @@ class DataIngestionPipeline:
 if __name__ == '__main__':
     try:
         config_manager_ingestion = ConfigurationManager()
-        data_ingestion_pipeline = DataIngestionPipeline(config_manager=config_manager_ingestion)
+        data_ingestion_pipeline = DataIngestionPipeline(config=config_manager_ingestion)
         data_ingestion_pipeline.run_pipeline()
     except Exception as e:
         logger.error(f"Error in data ingestion pipeline: {e}")
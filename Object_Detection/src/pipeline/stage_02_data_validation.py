@@ -6,16 +6,17 @@ class DataValidationPipeline:
     """
     Pipeline stage for data validation.
     """
-    def __init__(self, config_manager: ConfigurationManager):
-        self.config = config_manager.get_data_validation_config()
+    def __init__(self, config: ConfigurationManager):
+        self.config = config.get_data_validation_config()
         
-    def run_pipeline(self):
+    def run_pipeline(self) -> bool:
         try:
             logger.info("Starting data validation pipeline")
             data_validation = DataValidation(config=self.config)
-            data_validation.validate_all_files_exist()
+            validation_status = data_validation.run()
             logger.info("Data validation pipeline completed")
+            return validation_status
             
         except Exception as e:
             logger.error(f"Error in data validation pipeline: {e}", exc_info=True)
-            raise e
\ No newline at end of file
+            raise e
@@ -1,6 +1,7 @@
 
-from typing import Tuple
-from src.components.data_transformation import MyTransform
+from typing import Optional, Tuple
+from src.components.data_transformation import MyBatchTransform, MyTransform
+from src.components.ssd_targets import SSDTargetEncoder, dense_targets_enabled
 from src.config.configuration import ConfigurationManager
 from src.utils.logging_setup import logger
 
@@ -12,11 +13,30 @@ class DataTransformationPipeline:
         logger.info("Initializing data transformation pipeline")
         self.config = config
 
+    def get_target_encoder(self) -> Optional[SSDTargetEncoder]:
+        """The encoder of dense training targets, if the configured model is an SSD and encoding is enabled."""
+        model_name = self.config.get_model_trainer_config().model_name
+        ssd_targets_config = self.config.get_ssd_targets_config()
+        if not dense_targets_enabled(ssd_targets_config, model_name):
+            return None
+        logger.info(f"Encoding dense SSD targets for {model_name} in the data pipeline")
+        return SSDTargetEncoder.from_config(ssd_targets_config, model_name)
+
     def run_pipeline(self) -> Tuple[MyTransform, MyTransform]:
         """Runs the data transformation pipeline."""
         logger.info("Running data transformation pipeline")
 
-        train_transforms = MyTransform(self.config.get_data_transformation_config(), train=True)
+        train_transforms = MyTransform(self.config.get_data_transformation_config(), train=True, target_encoder=self.get_target_encoder())
         valid_transforms = MyTransform(self.config.get_data_transformation_config(), train=False)
         logger.info("Data transformation pipeline completed")
         return train_transforms, valid_transforms
+
+    def get_batch_transforms(self) -> Tuple[Optional[MyBatchTransform], Optional[MyBatchTransform]]:
+        """Returns the train/valid batch transforms, or (None, None) when batch mode is off."""
+        transformation_config = self.config.get_data_transformation_config()
+        if not transformation_config.batch_mode:
+            return None, None
+
+        logger.info("Creating batch transforms")
+        train_batch_transforms = MyBatchTransform(transformation_config, train=True, target_encoder=self.get_target_encoder())
+        return train_batch_transforms, MyBatchTransform(transformation_config, train=False)
@@ -0,0 +1,39 @@
+
+from typing import Optional
+from src.components.dataset import MyDataset
+from src.components.image_store import PackedImageStore
+from src.components.preprocessing_cache import PreprocessingCache
+from src.config.configuration import ConfigurationManager
+from src.utils.logging_setup import logger
+
+class PreprocessingCachePipeline:
+    '''
+    Pipeline stage that materializes the deterministic part of the transformations
+    (decode and resize) to disk once, so only the random augmentations run online.
+    '''
+    def __init__(self, config: ConfigurationManager):
+        """Initializes the Preprocessing Cache Pipeline."""
+        logger.info("Initializing preprocessing cache pipeline")
+        self.config = config.get_preprocessing_cache_config()
+        self.dataset_config = config.get_dataset_config()
+        self.preprocessing_cache = PreprocessingCache(self.config, config.get_data_transformation_config())
+
+    def run_pipeline(self, subset: str = None) -> Optional[PackedImageStore]:
+        '''
+        Runs the preprocessing cache pipeline for a subset.
+
+        Args:
+            subset (str, optional): The subset of the dataset to cache. Defaults to None.
+
+        Returns:
+            PackedImageStore: The cached images of the subset, or None if the cache is disabled.
+        '''
+        if not self.config.enabled:
+            logger.info("Preprocessing cache disabled, skipping")
+            return None
+
+        logger.info(f"Running preprocessing cache pipeline for subset: {subset}")
+        dataset = MyDataset(self.dataset_config, subset)
+        image_store = self.preprocessing_cache.materialize(dataset.root_dir, dataset.ids)
+        logger.info("Preprocessing cache pipeline completed")
+        return image_store
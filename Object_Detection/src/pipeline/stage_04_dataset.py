@@ -1,6 +1,10 @@
 
 
+import os
+from typing import Optional, Union
 from src.components.dataset import MyDataset
+from src.components.image_store import PackedImageStore
+from src.components.shards import ShardedVOCDataset, get_sharded_dataset
 from src.config.configuration import ConfigurationManager
 from src.utils.logging_setup import logger
 
@@ -10,21 +14,69 @@ class DatasetPipeline:
     '''
     def __init__(self, config: ConfigurationManager,):
         self.config = config.get_dataset_config()
+        self.transformation_config = config.get_data_transformation_config()
 
 
-    def run_pipeline(self, subset: str = None, transforms=None) -> MyDataset:
+    def run_pipeline(self, subset: str = None, transforms=None, image_store: Optional[PackedImageStore] = None,
+                     mode: Optional[str] = None) -> Union[MyDataset, ShardedVOCDataset]:
         '''
         Runs the dataset pipeline.
 
         Args:
             subset (str, optional): The subset of the dataset to load. Defaults to None.
             transforms (callable, optional): The transformation to apply to the dataset. Defaults to None.
+            image_store (PackedImageStore, optional): Pre-resized images to serve instead of the
+                configured image backend, e.g. from the preprocessing cache. Defaults to None.
+            mode (str, optional): "map" for the random-access `MyDataset` or "shards" for the
+                streaming `ShardedVOCDataset`. Defaults to the configured mode.
 
         Returns:
-            MyDataset: The dataset object.
+            Union[MyDataset, ShardedVOCDataset]: The dataset object.
         '''
         logger.info("Running dataset pipeline")
-        dataset = MyDataset(self.config, subset, transforms)
+        mode = mode or self.config.mode
+        if mode not in ("map", "shards"):
+            raise ValueError(f"Invalid dataset mode: {mode}. Must be one of 'map' or 'shards'.")
+
+        # Reduced-resolution decoders only need to reach the size the transforms resize to
+        decode_size = self.transformation_config.image_size if self.transformation_config.resize else None
+        dataset = MyDataset(self.config, subset, transforms, decode_size=decode_size)
+
+        if mode == "shards":
+            # Shards hold the original JPEGs; the image store does not apply
+            sharded_dataset = get_sharded_dataset(
+                root_dir=dataset.root_dir,
+                ids=dataset.ids,
+                shard_dir=os.path.join(self.config.shard_dir, subset),
+                class_map=self.config.class_map,
+                samples_per_shard=self.config.samples_per_shard,
+                transforms=transforms,
+                shuffle=subset == "train",
+                shuffle_buffer=self.config.shuffle_buffer,
+                decoder=dataset.decoder
+            )
+            logger.info("Dataset pipeline completed")
+            return sharded_dataset
+
+        if image_store is not None:
+            dataset.use_image_store(image_store)
+        elif self.config.image_backend == "packed":
+            dataset.use_image_store(self._get_image_store(subset, dataset))
+        elif self.config.image_backend != "jpeg":
+            raise ValueError(f"Invalid image backend: {self.config.image_backend}. Must be one of 'jpeg' or 'packed'.")
+
         logger.info("Dataset pipeline completed")
 
-        return dataset
\ No newline at end of file
+        return dataset
+
+    def _get_image_store(self, subset: str, dataset: MyDataset) -> PackedImageStore:
+        '''
+        Opens the packed image store of a subset, packing it first if it is missing
+        or was written for a different image size.
+        '''
+        image_size = self.transformation_config.image_size if self.transformation_config.resize else None
+        store_prefix = os.path.join(self.config.packed_dir, subset)
+        if PackedImageStore.is_valid(store_prefix, dataset.ids, image_size):
+            logger.info(f"Using packed image store: {store_prefix}")
+            return PackedImageStore(store_prefix)
+        return PackedImageStore.build(dataset.root_dir, dataset.ids, store_prefix, image_size)
@@ -0,0 +1,47 @@
+from src.components.data_loader import MyDataloader
+from src.components.model_trainer import ModelTrainer, build_model
+from src.components.ssd_targets import dense_targets_enabled
+from src.config.configuration import ConfigurationManager
+from src.utils.logging_setup import logger
+
+class ModelTrainerPipeline:
+    '''
+    Pipeline stage that builds the configured detector and trains it.
+    '''
+    def __init__(self, config: ConfigurationManager):
+        """Initializes the Model Trainer Pipeline."""
+        logger.info("Initializing model trainer pipeline")
+        self.config = config.get_model_trainer_config()
+        self.dataset_config = config.get_dataset_config()
+        self.transformation_config = config.get_data_transformation_config()
+        self.distributed_config = config.get_distributed_config()
+        self.ssd_targets_config = config.get_ssd_targets_config()
+
+    def run_pipeline(self, train_loader: MyDataloader = None) -> str:
+        '''
+        Runs the model trainer pipeline.
+
+        Args:
+            train_loader (MyDataloader, optional): The training data loader. Defaults to None.
+
+        Returns:
+            str: Path of the trained model weights.
+        '''
+        try:
+            logger.info("Running model trainer pipeline")
+            model = build_model(
+                self.config.model_name,
+                num_classes=len(self.dataset_config.class_map) + 1,
+                weights=self.config.weights,
+                weights_backbone=self.config.weights_backbone,
+                image_size=self.transformation_config.image_size if self.transformation_config.resize else None
+            )
+            # The train transforms encode the dense targets under the same condition
+            dense_targets = dense_targets_enabled(self.ssd_targets_config, self.config.model_name)
+            model_trainer = ModelTrainer(self.config, model, self.distributed_config, dense_targets=dense_targets)
+            model_path = model_trainer.train(train_loader.get_loader())
+            logger.info("Model trainer pipeline completed")
+            return model_path
+        except Exception as e:
+            logger.error(f"Error in model trainer pipeline: {e}", exc_info=True)
+            raise e
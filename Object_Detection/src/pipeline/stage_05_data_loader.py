@@ -1,5 +1,7 @@
 
-from Object_Detection.src.components.dataset import MyDataset
+from typing import Optional
+from src.components.data_transformation import MyBatchTransform
+from src.components.dataset import MyDataset
 from src.components.data_loader import MyDataloader
 from src.config.configuration import ConfigurationManager
 from src.utils.logging_setup import logger
@@ -9,12 +11,12 @@ class DataLoaderPipeline:
         self.config = config
         self.data_loader_config = self.config.get_data_loader_config()
 
-    def run_pipeline(self, dataset: MyDataset = None, shuffle: bool = True):
+    def run_pipeline(self, dataset: MyDataset = None, shuffle: bool = True, batch_transform: Optional[MyBatchTransform] = None):
        '''
        Runs the data loader pipeline.
        '''
        logger.info("Running data loader pipeline")
-       data_loader = MyDataloader(config=self.data_loader_config, dataset=dataset, shuffle=shuffle)
+       data_loader = MyDataloader(config=self.data_loader_config, dataset=dataset, shuffle=shuffle, batch_transform=batch_transform)
        logger.info("Data loader pipeline completed")
 
        return data_loader
\ No newline at end of file
@@ -0,0 +1,46 @@
+from typing import Dict
+import torch
+from src.components.data_loader import MyDataloader
+from src.components.model_evaluation import ModelEvaluation
+from src.components.model_trainer import build_model
+from src.config.configuration import ConfigurationManager
+from src.utils.logging_setup import logger
+
+class ModelEvaluationPipeline:
+    '''
+    Pipeline stage that scores the trained detector on the validation set.
+    '''
+    def __init__(self, config: ConfigurationManager):
+        """Initializes the Model Evaluation Pipeline."""
+        logger.info("Initializing model evaluation pipeline")
+        self.config = config.get_model_evaluation_config()
+        self.trainer_config = config.get_model_trainer_config()
+        self.dataset_config = config.get_dataset_config()
+        self.transformation_config = config.get_data_transformation_config()
+
+    def run_pipeline(self, model_path: str = None, valid_loader: MyDataloader = None) -> Dict:
+        '''
+        Runs the model evaluation pipeline.
+
+        Args:
+            model_path (str, optional): Trained weights. Defaults to the model trainer's model path.
+            valid_loader (MyDataloader, optional): The validation data loader. Defaults to None.
+
+        Returns:
+            Dict: The evaluation metrics.
+        '''
+        try:
+            logger.info("Running model evaluation pipeline")
+            model = build_model(
+                self.trainer_config.model_name,
+                num_classes=len(self.dataset_config.class_map) + 1,
+                image_size=self.transformation_config.image_size if self.transformation_config.resize else None
+            )
+            model.load_state_dict(torch.load(model_path or self.trainer_config.model_path, map_location="cpu"))
+            model_evaluation = ModelEvaluation(self.config, model, self.dataset_config.class_map)
+            metrics = model_evaluation.evaluate(valid_loader.get_loader())
+            logger.info("Model evaluation pipeline completed")
+            return metrics
+        except Exception as e:
+            logger.error(f"Error in model evaluation pipeline: {e}", exc_info=True)
+            raise e
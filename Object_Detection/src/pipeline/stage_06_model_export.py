@@ -0,0 +1,55 @@
+from typing import Dict
+import torch
+from src.components.data_loader import MyDataloader
+from src.components.model_export import ModelExporter
+from src.components.model_trainer import build_model, to_model_inputs
+from src.config.configuration import ConfigurationManager
+from src.utils.distributed import is_main_process
+from src.utils.logging_setup import logger
+
+class ModelExportPipeline:
+    '''
+    Pipeline stage that exports the trained detector to TorchScript and ONNX.
+    '''
+    def __init__(self, config: ConfigurationManager):
+        """Initializes the Model Export Pipeline."""
+        logger.info("Initializing model export pipeline")
+        self.config = config.get_model_export_config()
+        self.trainer_config = config.get_model_trainer_config()
+        self.dataset_config = config.get_dataset_config()
+        self.transformation_config = config.get_data_transformation_config()
+
+    def run_pipeline(self, model_path: str = None, valid_loader: MyDataloader = None) -> Dict:
+        '''
+        Runs the model export pipeline.
+
+        Args:
+            model_path (str, optional): Trained weights. Defaults to the model trainer's model path.
+            valid_loader (MyDataloader, optional): The validation data loader, whose first
+                images the exports are checked on. Defaults to None.
+
+        Returns:
+            Dict: The export report (empty on all but the main process under distributed training).
+        '''
+        try:
+            logger.info("Running model export pipeline")
+            if not is_main_process():
+                return {}
+            model = build_model(
+                self.trainer_config.model_name,
+                num_classes=len(self.dataset_config.class_map) + 1,
+                image_size=self.transformation_config.image_size if self.transformation_config.resize else None
+            )
+            model.load_state_dict(torch.load(model_path or self.trainer_config.model_path, map_location="cpu"))
+
+            images = []
+            for batch in valid_loader.get_loader(sharded=False):
+                images += to_model_inputs(batch, torch.device("cpu"))[0]
+                if len(images) >= self.config.sample_images:
+                    break
+            report = ModelExporter(self.config, model).export(images)
+            logger.info("Model export pipeline completed")
+            return report
+        except Exception as e:
+            logger.error(f"Error in model export pipeline: {e}", exc_info=True)
+            raise e
@@ -0,0 +1,50 @@
+from typing import Dict
+import torch
+from src.components.data_loader import MyDataloader
+from src.components.model_trainer import build_model
+from src.components.quantization import ModelQuantization
+from src.config.configuration import ConfigurationManager
+from src.utils.distributed import is_main_process
+from src.utils.logging_setup import logger
+
+class QuantizationPipeline:
+    '''
+    Pipeline stage that quantizes the trained detector to int8 for CPU inference.
+    '''
+    def __init__(self, config: ConfigurationManager):
+        """Initializes the Quantization Pipeline."""
+        logger.info("Initializing quantization pipeline")
+        self.config = config.get_quantization_config()
+        self.trainer_config = config.get_model_trainer_config()
+        self.dataset_config = config.get_dataset_config()
+        self.transformation_config = config.get_data_transformation_config()
+
+    def run_pipeline(self, model_path: str = None, valid_loader: MyDataloader = None) -> Dict:
+        '''
+        Runs the quantization pipeline.
+
+        Args:
+            model_path (str, optional): Trained weights. Defaults to the model trainer's model path.
+            valid_loader (MyDataloader, optional): The validation data loader, used for
+                calibration and for the comparison. Defaults to None.
+
+        Returns:
+            Dict: The quantization report (empty on all but the main process under distributed training).
+        '''
+        try:
+            logger.info("Running quantization pipeline")
+            if not is_main_process():
+                return {}
+            model = build_model(
+                self.trainer_config.model_name,
+                num_classes=len(self.dataset_config.class_map) + 1,
+                image_size=self.transformation_config.image_size if self.transformation_config.resize else None
+            )
+            model.load_state_dict(torch.load(model_path or self.trainer_config.model_path, map_location="cpu"))
+            quantization = ModelQuantization(self.config, model, self.trainer_config.model_name, self.dataset_config.class_map)
+            report = quantization.quantize(valid_loader.get_loader(sharded=False))
+            logger.info("Quantization pipeline completed")
+            return report
+        except Exception as e:
+            logger.error(f"Error in quantization pipeline: {e}", exc_info=True)
+            raise e
@@ -0,0 +1,108 @@
+#src/utils/distributed.py
+import os
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Any, List
+from src.entity.config_entity import DistributedConfig
+from src.utils.logging_setup import logger
+
+# Rank and world size are read from the environment torchrun sets, so callers such as the
+# pipeline runner can check them without importing torch.distributed.
+
+
+def get_rank() -> int:
+    return int(os.environ.get("RANK", 0))
+
+
+def get_world_size() -> int:
+    return int(os.environ.get("WORLD_SIZE", 1))
+
+
+def get_local_world_size() -> int:
+    return int(os.environ.get("LOCAL_WORLD_SIZE", get_world_size()))
+
+
+def is_main_process() -> bool:
+    return get_rank() == 0
+
+
+def is_distributed() -> bool:
+    """Whether a process group with more than one rank is initialized."""
+    if get_world_size() <= 1:
+        return False
+    import torch.distributed as dist
+
+    return dist.is_available() and dist.is_initialized()
+
+
+def get_distributed_world_size() -> int:
+    """Number of ranks that train together: the world size if a process group is initialized, else 1."""
+    return get_world_size() if is_distributed() else 1
+
+
+def get_distributed_rank() -> int:
+    """Rank within the initialized process group, 0 when training is not distributed."""
+    return get_rank() if is_distributed() else 0
+
+
+def init_distributed(config: DistributedConfig) -> bool:
+    """
+    Joins the process group when launched by torchrun with more than one process and
+    limits the intra-op threads of every rank, so local ranks do not oversubscribe the cores.
+
+    Args:
+        config (DistributedConfig): Configuration for distributed training.
+
+    Returns:
+        bool: Whether training is distributed.
+    """
+    if get_world_size() <= 1:
+        return False
+    if not config.enabled:
+        logger.warning(f"Launched with {get_world_size()} processes but distributed training is disabled: "
+                       f"every process trains on the full dataset on its own")
+        return False
+    import torch
+    import torch.distributed as dist
+
+    if not dist.is_initialized():
+        threads = config.threads_per_rank or max(1, (os.cpu_count() or 1) // get_local_world_size())
+        torch.set_num_threads(threads)
+        dist.init_process_group(backend=config.backend, timeout=timedelta(seconds=config.timeout_s))
+        logger.info(f"Joined process group: rank {get_rank()} of {get_world_size()}, backend {config.backend}, {threads} threads")
+    return True
+
+
+def barrier() -> None:
+    if is_distributed():
+        import torch.distributed as dist
+
+        dist.barrier()
+
+
+@contextmanager
+def main_process_first():
+    """Runs the block on rank 0 first and on the other ranks once rank 0 is done, e.g. to build caches once."""
+    if not is_main_process():
+        barrier()
+    yield
+    if is_main_process():
+        barrier()
+
+
+def all_gather_object(obj: Any) -> List[Any]:
+    """`obj` of every rank, by rank; just `[obj]` when not distributed."""
+    if not is_distributed():
+        return [obj]
+    import torch.distributed as dist
+
+    gathered = [None] * get_world_size()
+    dist.all_gather_object(gathered, obj)
+    return gathered
+
+
+def cleanup() -> None:
+    if is_distributed():
+        import torch.distributed as dist
+
+        dist.destroy_process_group()
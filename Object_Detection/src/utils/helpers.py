@@ -1,17 +1,26 @@
 #src/utils/helpers.py
+from __future__ import annotations
 import json
+import math
 import os
-from typing import List
+import shutil
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Dict, List, NamedTuple, Optional, Sequence, Tuple
 import zipfile
-from aiohttp_retry import Dict, Tuple
-from box import ConfigBox
-import requests
-import torch
-import yaml
+import zlib
 from src.utils.logging_setup import logger
 
+# torch, requests, box and yaml are imported where they are used: this module is imported
+# by every entry point and DataLoader worker, most of which need none of them
+if TYPE_CHECKING:
+    import torch
+    from box import ConfigBox
+
 def read_yaml_file(file_path: str)-> ConfigBox:
     """Read a YAML file and return its content as a ConfigBox object"""
+    import yaml
+    from box import ConfigBox
+
     try:
         logger.info(f"Reading YAML file: {file_path}")
         with open(file_path, 'r') as file:
@@ -42,22 +51,106 @@ def save_json(file_path: str, content: dict)-> None:
         logger.error(f"Error saving JSON file to {file_path}: {e}")
         raise e
 
-def download_file(url: str, filename: str) -> bool:
+def _probe_download(url: str) -> Tuple[Optional[int], bool]:
+    """
+    Returns the size of the remote file (None if unknown) and whether the server
+    honours Range requests. A one-byte GET is used since signed URLs often reject HEAD.
+    """
+    import requests
+
+    with requests.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        if r.status_code == 206 and "/" in r.headers.get("Content-Range", ""):
+            total = r.headers["Content-Range"].rsplit("/", 1)[1]
+            return (int(total) if total.isdigit() else None), True
+        length = r.headers.get("Content-Length")
+        return (int(length) if length and length.isdigit() else None), False
+
+
+def _download_range(url: str, part_path: str, start: int, end: int, chunk_size: int) -> None:
+    """Downloads bytes [start, end] of `url` into `part_path`, resuming from what it already holds."""
+    import requests
+
+    length = end - start + 1
+    done = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    if done > length:
+        # Leftover from a different part layout; start this part over
+        os.remove(part_path)
+        done = 0
+    if done == length:
+        return
+    with requests.get(url, headers={"Range": f"bytes={start + done}-{end}"}, stream=True, timeout=60) as r:
+        r.raise_for_status()
+        if r.status_code != 206:
+            raise IOError(f"Server ignored range request for bytes {start + done}-{end}")
+        with open(part_path, 'ab') as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                f.write(chunk)
+    if os.path.getsize(part_path) != length:
+        raise IOError(f"Incomplete range {start}-{end}: got {os.path.getsize(part_path)} of {length} bytes")
+
+
+def download_file(url: str, filename: str, chunk_size: int = 1 << 20, num_connections: int = 4) -> bool:
     """
     Downloads a file from a given URL.
+
+    When the server supports Range requests, the file is fetched as `num_connections`
+    parallel byte ranges, each written to its own `.part` file. Interrupted downloads
+    resume from the bytes already on disk; a complete `filename` of the right size is
+    not downloaded again.
+
     Args:
         url (str): The URL of the file to download.
         filename (str): The local filename to save the downloaded content.
+        chunk_size (int, optional): Read size of the response stream. Defaults to 1 MB.
+        num_connections (int, optional): Maximum number of parallel range requests. Defaults to 4.
     Returns:
         bool: True if download is successful, False otherwise.
     """
+    import requests
+
     logger.info(f"Downloading {filename} from {url}...")
     try:
-        with requests.get(url, stream=True) as r:
-            r.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
-            with open(filename, 'wb') as f:
-                for chunk in r.iter_content(chunk_size=8192):
-                    f.write(chunk)
+        size, supports_ranges = _probe_download(url)
+        if size is not None and os.path.exists(filename) and os.path.getsize(filename) == size:
+            logger.info(f"{filename} is already complete ({size} bytes), skipping download.")
+            return True
+
+        tmp_path = f"{filename}.tmp"
+        if not supports_ranges or size is None:
+            # No resume possible: stream the whole file again
+            with requests.get(url, stream=True, timeout=60) as r:
+                r.raise_for_status() # Raise HTTPError for bad responses (4xx or 5xx)
+                with open(tmp_path, 'wb') as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+        else:
+            # Parts of at least 8 chunks each; the layout is part of the name so a resume with
+            # a different connection count does not pick up mismatched parts
+            num_parts = max(1, min(num_connections, math.ceil(size / (8 * chunk_size))))
+            part_size = math.ceil(size / num_parts) if size else 0
+            parts = [
+                (f"{filename}.part{i}of{num_parts}", i * part_size, min(size, (i + 1) * part_size) - 1)
+                for i in range(num_parts)
+            ]
+            resumed = sum(os.path.getsize(path) for path, _, _ in parts if os.path.exists(path))
+            if resumed:
+                logger.info(f"Resuming {filename} at {resumed} of {size} bytes")
+            with ThreadPoolExecutor(max_workers=num_parts) as executor:
+                futures = [executor.submit(_download_range, url, path, start, end, chunk_size) for path, start, end in parts]
+                for future in futures:
+                    future.result()
+
+            with open(tmp_path, 'wb') as f:
+                for path, _, _ in parts:
+                    with open(path, 'rb') as part:
+                        shutil.copyfileobj(part, f, chunk_size)
+            for path, _, _ in parts:
+                os.remove(path)
+
+        if size is not None and os.path.getsize(tmp_path) != size:
+            raise IOError(f"Downloaded {os.path.getsize(tmp_path)} bytes, expected {size}")
+        os.replace(tmp_path, filename)
         logger.info(f"Successfully downloaded {filename}.")
         return True
     except requests.exceptions.RequestException as e:
@@ -66,25 +159,94 @@ def download_file(url: str, filename: str) -> bool:
     except Exception as e:
         logger.error(f"An unexpected error occurred while downloading {filename}: {e}")
         return False
-    
 
-def extract_zip(zip_path: str, extract_to: str) -> bool:
+
+def file_crc32(path: str, chunk_size: int = 1 << 20) -> int:
+    """CRC-32 of a file, comparable to the CRC stored for a zip member."""
+    crc = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
+def _member_path(extract_to: str, name: str) -> str:
+    """Target path of a zip member, refusing absolute paths and parent-directory components."""
+    parts = [part for part in name.replace("\\", "/").split("/") if part not in ("", ".")]
+    if name.startswith("/") or ".." in parts:
+        raise ValueError(f"Unsafe path in archive: {name}")
+    return os.path.join(extract_to, *parts)
+
+
+def _member_is_current(info: zipfile.ZipInfo, path: str, entry: Optional[Dict]) -> bool:
+    """Whether `path` already holds the content of zip member `info`, according to the manifest entry."""
+    if entry is None or entry["crc32"] != info.CRC or entry["size"] != info.file_size or not os.path.exists(path):
+        return False
+    stat = os.stat(path)
+    if stat.st_size != info.file_size:
+        return False
+    # Unchanged since it was extracted; otherwise fall back to comparing the checksum
+    return stat.st_mtime_ns == entry["mtime_ns"] or file_crc32(path) == info.CRC
+
+
+def _extract_members(zip_path: str, extract_to: str, members: List[zipfile.ZipInfo]) -> Dict[str, Dict]:
+    """Extracts `members` with a private ZipFile handle and returns their manifest entries."""
+    entries = {}
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        for info in members:
+            path = _member_path(extract_to, info.filename)
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            # Reading the member to the end verifies its CRC
+            with zip_ref.open(info) as src, open(tmp_path, 'wb') as dst:
+                shutil.copyfileobj(src, dst, 1 << 20)
+            os.replace(tmp_path, path)
+            entries[info.filename] = {"size": info.file_size, "crc32": info.CRC, "mtime_ns": os.stat(path).st_mtime_ns}
+    return entries
+
+
+def extract_zip(zip_path: str, extract_to: str, manifest: Optional[Dict[str, Dict]] = None, num_workers: int = 8) -> bool:
         """
         Extracts a zip file to a specified directory.
+
+        Members are extracted by `num_workers` threads. When a `manifest` (member name ->
+        size, CRC-32 and mtime of the extracted file) is given, members whose file on disk
+        still matches are skipped, and the manifest is updated in place.
+
         Args:
             zip_path (str): Path to the zip file.
             extract_to (str): Directory where contents will be extracted.
+            manifest (Dict[str, Dict], optional): Manifest of previously extracted files. Defaults to None.
+            num_workers (int, optional): Number of extraction threads. Defaults to 8.
         Returns:
             bool: True if extraction is successful, False otherwise.
         """
         logger.info(f"Extracting {zip_path} to {extract_to}...")
+        manifest = manifest if manifest is not None else {}
         try:
             with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_to)
+                infos = zip_ref.infolist()
+
+            pending = []
+            for info in infos:
+                path = _member_path(extract_to, info.filename)
+                if info.is_dir():
+                    os.makedirs(path, exist_ok=True)
+                    continue
+                # Parent directories are created up front, never concurrently by the workers
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                if not _member_is_current(info, path, manifest.get(info.filename)):
+                    pending.append(info)
+
+            logger.info(f"Extracting {len(pending)} of {sum(not info.is_dir() for info in infos)} files ({len(infos)} members)")
+            num_workers = max(1, min(num_workers, len(pending)))
+            with ThreadPoolExecutor(max_workers=num_workers) as executor:
+                futures = [executor.submit(_extract_members, zip_path, extract_to, pending[i::num_workers]) for i in range(num_workers)]
+                for future in futures:
+                    manifest.update(future.result())
             logger.info(f"Successfully extracted {zip_path}.")
             return True
-        except zipfile.BadZipFile:
-            logger.error(f"Error: {zip_path} is not a valid zip file.")
+        except zipfile.BadZipFile as e:
+            logger.error(f"Error: {zip_path} is not a valid zip file: {e}")
             return False
         except Exception as e:
             logger.error(f"Error extracting {zip_path}: {e}")
@@ -100,4 +262,126 @@ def collate_fn(batch: List[Tuple[torch.Tensor, Dict[str, torch.Tensor]]]) -> Tup
     due to different numbers of objects in each image.
     """
     # Unzips the list of (image, target) tuples into two separate tuples
-    return tuple(zip(*batch))
\ No newline at end of file
+    return tuple(zip(*batch))
+
+
+class PackedBatch(NamedTuple):
+    """
+    Contiguous form of a detection batch produced by `padded_collate_fn`.
+    Per-image targets are concatenated; image i owns rows offsets[i]:offsets[i + 1].
+    """
+    images: torch.Tensor       # (N, C, H_max, W_max), zero padded
+    image_sizes: torch.Tensor  # (N, 2) unpadded (height, width)
+    boxes: torch.Tensor        # (M, 4) boxes of all images
+    labels: torch.Tensor       # (M,) labels of all images
+    offsets: torch.Tensor      # (N + 1,) start of each image in boxes/labels
+    image_ids: torch.Tensor    # (N,) image_id of each image
+    cls_targets: Optional[torch.Tensor] = None  # (N, A) dense SSD class targets, if encoded
+    box_targets: Optional[torch.Tensor] = None  # (N, A, 4) dense SSD box targets, if encoded
+    difficult: Optional[torch.Tensor] = None    # (M,) VOC difficult flags, if the targets have them
+
+
+def _new_batch_tensor(like: torch.Tensor, shape: Tuple[int, ...]) -> torch.Tensor:
+    """
+    Allocates a zeroed batch tensor. Inside a DataLoader worker the storage is allocated
+    directly in shared memory, so sending the batch to the main process does not copy it.
+    """
+    import torch
+
+    if torch.utils.data.get_worker_info() is not None:
+        numel = 1
+        for dim in shape:
+            numel *= dim
+        storage = like._typed_storage()._new_shared(numel, device=like.device)
+        return like.new(storage).resize_(*shape).zero_()
+    return like.new_zeros(shape)
+
+
+def pad_images(images: Sequence[torch.Tensor]) -> Tuple[torch.Tensor, torch.Tensor]:
+    """
+    Copies CHW images of varying sizes into one zero-padded NCHW tensor.
+
+    Returns:
+        The padded batch and the (N, 2) tensor of unpadded (height, width).
+    """
+    import torch
+
+    if isinstance(images, torch.Tensor):
+        n, _, h, w = images.shape
+        return images, torch.tensor([[h, w]], dtype=torch.int64).expand(n, 2).contiguous()
+
+    image_sizes = torch.tensor([image.shape[-2:] for image in images], dtype=torch.int64)
+    max_h, max_w = image_sizes.max(dim=0).values.tolist()
+    batch = _new_batch_tensor(images[0], (len(images), images[0].shape[0], max_h, max_w))
+    for i, image in enumerate(images):
+        batch[i, :, :image.shape[-2], :image.shape[-1]].copy_(image)
+    return batch, image_sizes
+
+
+def _stack(tensors: Sequence[torch.Tensor]) -> torch.Tensor:
+    """`torch.stack` into a tensor from `_new_batch_tensor`."""
+    import torch
+
+    out = _new_batch_tensor(tensors[0], (len(tensors), *tensors[0].shape))
+    return torch.stack(list(tensors), out=out)
+
+
+def pack_batch(images: Sequence[torch.Tensor], targets: Sequence[Dict[str, torch.Tensor]]) -> PackedBatch:
+    """
+    Pads the images and concatenates the boxes/labels (and difficult flags) of all targets into a `PackedBatch`.
+    Dense per-image targets (equal shapes for all images) are stacked.
+    """
+    import torch
+
+    batch, image_sizes = pad_images(images)
+    counts = torch.tensor([len(target["boxes"]) for target in targets], dtype=torch.int64)
+    offsets = torch.zeros(len(targets) + 1, dtype=torch.int64)
+    torch.cumsum(counts, dim=0, out=offsets[1:])
+    dense = {key: _stack([target[key] for target in targets]) for key in ("cls_targets", "box_targets") if key in targets[0]}
+    return PackedBatch(
+        images=batch,
+        image_sizes=image_sizes,
+        boxes=torch.cat([target["boxes"] for target in targets]),
+        labels=torch.cat([target["labels"] for target in targets]),
+        offsets=offsets,
+        image_ids=torch.cat([target["image_id"].reshape(-1) for target in targets]),
+        difficult=torch.cat([target["difficult"] for target in targets]) if "difficult" in targets[0] else None,
+        **dense,
+    )
+
+
+def padded_collate_fn(batch: List[Tuple[torch.Tensor, Dict[str, torch.Tensor]]]) -> PackedBatch:
+    """
+    Collation function producing a single padded image tensor and packed targets.
+    A batch crosses the worker boundary as six tensors instead of several per image;
+    use `unpack_targets` / `unpad_images` to get the form torchvision models expect.
+    """
+    images, targets = zip(*batch)
+    return pack_batch(images, targets)
+
+
+def unpack_targets(packed: PackedBatch) -> List[Dict[str, torch.Tensor]]:
+    """Splits packed targets back into torchvision's list-of-dicts form (as views)."""
+    import torch
+    from src.core.box_ops import box_area
+
+    counts = (packed.offsets[1:] - packed.offsets[:-1]).tolist()
+    boxes = packed.boxes
+    areas = box_area(boxes)
+    iscrowd = torch.zeros(len(boxes), dtype=torch.int64)
+    targets = [
+        {"boxes": b, "labels": l, "image_id": packed.image_ids[i:i + 1], "area": a, "iscrowd": c}
+        for i, (b, l, a, c) in enumerate(zip(boxes.split(counts), packed.labels.split(counts), areas.split(counts), iscrowd.split(counts)))
+    ]
+    if packed.cls_targets is not None:
+        for target, cls_targets, box_targets in zip(targets, packed.cls_targets, packed.box_targets):
+            target["cls_targets"], target["box_targets"] = cls_targets, box_targets
+    if packed.difficult is not None:
+        for target, difficult in zip(targets, packed.difficult.split(counts)):
+            target["difficult"] = difficult
+    return targets
+
+
+def unpad_images(packed: PackedBatch) -> List[torch.Tensor]:
+    """Returns views of the unpadded images of a packed batch."""
+    return [image[:, :h, :w] for image, (h, w) in zip(packed.images, packed.image_sizes.tolist())]
@@ -0,0 +1,166 @@
+#src/utils/instrumentation.py
+import random
+import time
+from contextlib import contextmanager
+from typing import Dict, NamedTuple, Optional, Tuple
+from src.core.singleton import SingletonMeta
+from src.entity.config_entity import InstrumentationConfig
+from src.utils.logging_setup import logger
+
+
+class StageStats:
+    """
+    Count, total time and log2-bucketed latency histogram of one data-path stage.
+    Bucket b holds durations in [2^(b-1), 2^b) microseconds.
+    """
+    NUM_BUCKETS = 32
+    __slots__ = ("count", "total_ns", "max_ns", "buckets")
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * self.NUM_BUCKETS
+
+    def add(self, duration_ns: int) -> None:
+        self.count += 1
+        self.total_ns += duration_ns
+        self.max_ns = max(self.max_ns, duration_ns)
+        self.buckets[min((duration_ns // 1000).bit_length(), self.NUM_BUCKETS - 1)] += 1
+
+    def merge(self, other: "StageStats") -> None:
+        self.count += other.count
+        self.total_ns += other.total_ns
+        self.max_ns = max(self.max_ns, other.max_ns)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+
+    def percentile(self, q: float) -> float:
+        """Upper bound, in milliseconds, of the bucket containing the q-th percentile."""
+        rank = q / 100.0 * self.count
+        seen = 0
+        for bucket, n in enumerate(self.buckets):
+            seen += n
+            if n and seen >= rank:
+                return min(2 ** bucket / 1000.0, self.max_ns / 1e6)
+        return self.max_ns / 1e6
+
+    def __getstate__(self):
+        return (self.count, self.total_ns, self.max_ns, self.buckets)
+
+    def __setstate__(self, state):
+        self.count, self.total_ns, self.max_ns, self.buckets = state
+
+
+class Instrumentation(metaclass=SingletonMeta):
+    """
+    Per-process timers, counters and sampled debug logging for the data path.
+
+    Stages (decode, parse, transform, collate, ...) are aggregated into histograms instead
+    of being logged per sample. DataLoader workers return their aggregates together with
+    every batch (see `InstrumentedBatch`), and the main process merges them into a
+    per-epoch summary, so no metrics are in flight when the workers shut down.
+    """
+    def __init__(self):
+        self.enabled = True
+        self.debug_sample_rate = 0.0
+        self.stages: Dict[str, StageStats] = {}
+        self.counters: Dict[str, int] = {}
+        self.in_worker = False
+        self._rng = random.Random()
+
+    def configure(self, config: InstrumentationConfig) -> None:
+        """Applies the instrumentation config. Sampled debug logging is off at rate 0."""
+        self.enabled = config.enabled
+        self.debug_sample_rate = config.debug_sample_rate
+        if self.debug_sample_rate > 0:
+            logger.setLevel("DEBUG")
+        logger.info(f"Data path instrumentation enabled={self.enabled}, debug sample rate={self.debug_sample_rate}")
+
+    def record(self, stage: str, duration_ns: int) -> None:
+        """Adds one duration to a stage's histogram."""
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats()
+        stats.add(duration_ns)
+
+    @contextmanager
+    def timer(self, stage: str):
+        """Times the enclosed block as one occurrence of `stage`."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter_ns() - start)
+
+    def count(self, name: str, n: int = 1) -> None:
+        if self.enabled:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def debug_sample(self, msg: str) -> None:
+        """Logs `msg` at debug level for a random `debug_sample_rate` fraction of calls."""
+        if self.debug_sample_rate and self._rng.random() < self.debug_sample_rate:
+            logger.debug(msg)
+
+    def reset(self) -> None:
+        self.stages = {}
+        self.counters = {}
+
+    def attach_worker(self, enabled: bool, debug_sample_rate: float) -> None:
+        """Marks this process as a DataLoader worker with the main process's settings (worker side)."""
+        self.reset()
+        self.enabled = enabled
+        self.debug_sample_rate = debug_sample_rate
+        self.in_worker = True
+
+    def take(self) -> Tuple[Dict[str, StageStats], Dict[str, int]]:
+        """Returns and resets the aggregates (worker side)."""
+        metrics = (self.stages, self.counters)
+        self.reset()
+        return metrics
+
+    def merge(self, metrics: Tuple[Dict[str, StageStats], Dict[str, int]]) -> None:
+        """Adds aggregates returned by `take` in a worker (main side)."""
+        stages, counters = metrics
+        for stage, stats in stages.items():
+            self.stages.setdefault(stage, StageStats()).merge(stats)
+        for name, n in counters.items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def summary(self, wall_time_s: Optional[float] = None) -> str:
+        """One-line summary of all stages: count, mean, p50/p95/p99 and max in milliseconds."""
+        parts = []
+        for stage, stats in sorted(self.stages.items()):
+            mean_ms = stats.total_ns / max(stats.count, 1) / 1e6
+            parts.append(
+                f"{stage}: n={stats.count} mean={mean_ms:.2f}ms p50<={stats.percentile(50):.2f}ms "
+                f"p95<={stats.percentile(95):.2f}ms p99<={stats.percentile(99):.2f}ms max={stats.max_ns / 1e6:.2f}ms"
+            )
+        parts.extend(f"{name}={n}" for name, n in sorted(self.counters.items()))
+        if wall_time_s and self.counters.get("samples"):
+            parts.append(f"throughput={self.counters['samples'] / wall_time_s:.1f} samples/s")
+        return " | ".join(parts)
+
+
+class InstrumentedBatch(NamedTuple):
+    """A batch collated in a DataLoader worker, with the worker's aggregates since its previous batch."""
+    batch: object
+    metrics: Tuple[Dict[str, StageStats], Dict[str, int]]
+
+
+class WorkerInstrumentationInit:
+    """`worker_init_fn` giving a DataLoader worker the main process's instrumentation settings."""
+    def __init__(self, enabled: bool, debug_sample_rate: float, worker_init_fn=None):
+        self.enabled = enabled
+        self.debug_sample_rate = debug_sample_rate
+        self.worker_init_fn = worker_init_fn
+
+    def __call__(self, worker_id: int) -> None:
+        Instrumentation().attach_worker(self.enabled, self.debug_sample_rate)
+        if self.worker_init_fn is not None:
+            self.worker_init_fn(worker_id)
+
+
+instrumentation = Instrumentation()
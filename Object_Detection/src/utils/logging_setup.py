@@ -1,5 +1,8 @@
 #src/utils/logging_setup.py
 import logging
+import logging.handlers
+import multiprocessing
+import multiprocessing.util
 import os
 import sys
 from src.core.singleton import SingletonMeta
@@ -8,6 +11,10 @@ class Logger(metaclass=SingletonMeta):
     """
     A singleton class for managing application-wide logging.
     It configures and provides a pre-configured logger instance.
+
+    Records are put on a multiprocessing queue and written to the file and stdout by a
+    `QueueListener` thread, so neither the main process nor forked DataLoader workers
+    ever block on file I/O.
     """
     def __init__(self, logger_name="Object_Detection", log_dir="logs", log_file_name="running_logs.log"):
         """
@@ -20,6 +27,7 @@ class Logger(metaclass=SingletonMeta):
             log_file_name (str): The name of the log file.
         """
         self._logger = None
+        self._listener = None
         self._logger_name = logger_name
         self._log_dir = log_dir
         self._log_file_name = log_file_name
@@ -35,13 +43,28 @@ class Logger(metaclass=SingletonMeta):
 
         # Basic configuration applied only once
         if not self._logger: # Check if logger is already set up (important for potential re-init calls if not truly singleton)
+            formatter = logging.Formatter(logging_str)
+            handlers = [
+                logging.FileHandler(log_filepath),
+                logging.StreamHandler(sys.stdout)
+            ]
+            for handler in handlers:
+                handler.setFormatter(formatter)
+
+            # Shared with forked worker processes, whose records end up in this listener
+            log_queue = multiprocessing.Queue(-1)
+            self._listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+            self._listener.start()
+            # Runs at exit also in spawned child processes, which skip atexit handlers, and
+            # before the queue's own finalizer closes the pipe under the listener
+            multiprocessing.util.Finalize(self._listener, self._listener.stop, exitpriority=100)
+
+            queue_handler = logging.handlers.QueueHandler(log_queue)
+            # The listener's handlers apply the real format; only merge args into the message here
+            queue_handler.setFormatter(logging.Formatter("%(message)s"))
             logging.basicConfig(
                 level=logging.INFO,
-                format=logging_str,
-                handlers=[
-                    logging.FileHandler(log_filepath),
-                    logging.StreamHandler(sys.stdout)
-                ]
+                handlers=[queue_handler]
             )
             self._logger = logging.getLogger(self._logger_name)
             self._logger.info("Logging initialized successfully.")
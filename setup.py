@@ -41,6 +41,8 @@ setup(
         "transformers>=4.20",
         "pytesseract>=0.3.9",
         "easyocr>=1.4.1",
+        "onnx>=1.12",
+        "onnxruntime>=1.12",
     ],
     python_requires=">=3.7",
 )